@@ -5,6 +5,7 @@ from flask_migrate import Migrate
 from flask_session import Session  
 from datetime import timedelta
 import os
+import click
 
 db = SQLAlchemy()
 migrate = Migrate()
@@ -14,11 +15,15 @@ def create_app():
     
     app.config['SECRET_KEY'] = 'Globalmindsindia@1439'
     
-    # Use absolute path for database in production
+    # Use absolute path for database in production (DATABASE_URL overrides it)
     basedir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
     db_path = os.path.join(basedir, 'instance', 'unified_database.db')
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', f'sqlite:///{db_path}')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # SQLite settings applied to every connection (see app/sqlite_profile.py):
+    # "production" (WAL, busy timeout, memory map) or "default"
+    app.config['SQLITE_PROFILE'] = os.environ.get('SQLITE_PROFILE', 'production')
     app.config['SESSION_USE_SIGNER'] = True
     app.config['SESSION_TYPE'] = 'filesystem'
     
@@ -29,6 +34,80 @@ def create_app():
     
     app.config['SESSION_PERMANENT'] = True
     app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(minutes=30)
+
+    # "compact" (smaller downloads) or "standard" (lossless logo, ASCII85 streams)
+    app.config['PDF_OUTPUT_PROFILE'] = os.environ.get('PDF_OUTPUT_PROFILE', 'compact')
+
+    # PDF rendering pool (0 workers renders inside the request thread)
+    app.config['PDF_RENDER_WORKERS'] = int(os.environ.get('PDF_RENDER_WORKERS', 2))
+    app.config['PDF_RENDER_QUEUE_SIZE'] = int(os.environ.get('PDF_RENDER_QUEUE_SIZE', 8))
+    app.config['PDF_RENDER_TIMEOUT'] = float(os.environ.get('PDF_RENDER_TIMEOUT', 30))
+    app.config['PDF_RENDER_RETRY_AFTER'] = int(os.environ.get('PDF_RENDER_RETRY_AFTER', 5))
+
+    # Finished async PDF jobs, shared by all workers (like the session files)
+    app.config['PDF_JOB_DIR'] = os.environ.get('PDF_JOB_DIR', '/tmp/pdf_jobs')
+    app.config['PDF_JOB_TTL'] = int(os.environ.get('PDF_JOB_TTL', 3600))
+
+    # Rendered PDFs by content hash: a per-worker LRU in front of a shared
+    # directory (a TTL of 0 turns the cache off)
+    app.config['PDF_CACHE_DIR'] = os.environ.get('PDF_CACHE_DIR', '/tmp/pdf_cache')
+    app.config['PDF_CACHE_MEMORY_BYTES'] = int(os.environ.get('PDF_CACHE_MEMORY_BYTES', 32 * 1024 * 1024))
+    app.config['PDF_CACHE_TTL'] = int(os.environ.get('PDF_CACHE_TTL', 86400))
+
+    # Renders larger than this are spooled to disk and streamed, not kept in memory
+    app.config['PDF_SPOOL_MAX_MEMORY'] = int(os.environ.get('PDF_SPOOL_MAX_MEMORY', 256 * 1024))
+    app.config['PDF_SPOOL_DIR'] = os.environ.get('PDF_SPOOL_DIR', '/tmp/pdf_spool')
+    os.makedirs(app.config['PDF_SPOOL_DIR'], exist_ok=True)
+
+    # Most grades converted by one calculate-batch request
+    app.config['GRADE_BATCH_MAX_ROWS'] = int(os.environ.get('GRADE_BATCH_MAX_ROWS', 10000))
+
+    # Most bucket selections priced by one evaluate request
+    app.config['EVALUATE_MAX_SCENARIOS'] = int(os.environ.get('EVALUATE_MAX_SCENARIOS', 100))
+
+    # Most bucket combinations returned by one optimize request
+    app.config['OPTIMIZE_MAX_RESULTS'] = int(os.environ.get('OPTIMIZE_MAX_RESULTS', 50))
+    # and most branches its search explores before answering 400
+    app.config['OPTIMIZE_MAX_NODES'] = int(os.environ.get('OPTIMIZE_MAX_NODES', 100000))
+
+    # Most cities compared by one living-costs request
+    app.config['LIVING_COST_MAX_LOCATIONS'] = int(os.environ.get('LIVING_COST_MAX_LOCATIONS', 20))
+
+    # Whether the living-costs endpoint is served and cost report PDFs print
+    # its figures instead of the client's; off until living_costs.json holds
+    # a sourced dataset and the frontend sends its answer keys
+    app.config['LIVING_COSTS_ENABLED'] = os.environ.get('LIVING_COSTS_ENABLED', '0') == '1'
+
+    # Rows read, converted and written at a time by the transcript endpoint
+    app.config['TRANSCRIPT_CHUNK_ROWS'] = int(os.environ.get('TRANSCRIPT_CHUNK_ROWS', 10000))
+
+    # Largest cohort accepted by the batch certificate endpoint, and the
+    # largest upload it reads (a 1000-row CSV is about 100 KB)
+    app.config['PDF_BATCH_MAX_ROWS'] = int(os.environ.get('PDF_BATCH_MAX_ROWS', 1000))
+    app.config['PDF_BATCH_MAX_BYTES'] = int(os.environ.get('PDF_BATCH_MAX_BYTES', 1024 * 1024))
+
+    # Caps on client-supplied custom package details, so one request cannot
+    # ask for an arbitrarily long render
+    app.config['PDF_MAX_PACKAGES'] = int(os.environ.get('PDF_MAX_PACKAGES', 20))
+    app.config['PDF_MAX_PACKAGE_FEATURES'] = int(os.environ.get('PDF_MAX_PACKAGE_FEATURES', 500))
+    app.config['PDF_MAX_TEXT_LENGTH'] = int(os.environ.get('PDF_MAX_TEXT_LENGTH', 500))
+
+    # Leads are appended to a local buffer and written to the database in
+    # batches (an interval of 0 stores each lead inside its request)
+    app.config['LEAD_BUFFER_DIR'] = os.environ.get('LEAD_BUFFER_DIR', os.path.join(basedir, 'instance', 'lead_buffer'))
+    app.config['LEAD_FLUSH_INTERVAL_MS'] = int(os.environ.get('LEAD_FLUSH_INTERVAL_MS', 200))
+    app.config['LEAD_FLUSH_ROWS'] = int(os.environ.get('LEAD_FLUSH_ROWS', 500))
+
+    # Bearer token for /api/leads/export (unset disables the export), and
+    # rows read per keyset page
+    app.config['LEAD_EXPORT_TOKEN'] = os.environ.get('LEAD_EXPORT_TOKEN')
+    app.config['LEAD_EXPORT_PAGE_ROWS'] = int(os.environ.get('LEAD_EXPORT_PAGE_ROWS', 5000))
+
+    # Bucket prices (JSON, or an Excel sheet laid out like app/services.xlsx),
+    # reloaded when the file changes or on SIGHUP
+    app.config['PRICING_CATALOG_PATH'] = os.environ.get(
+        'PRICING_CATALOG_PATH', os.path.join(os.path.dirname(__file__), 'bucket_data.json')
+    )
     
     # PDF configuration
     try:
@@ -58,7 +137,43 @@ def create_app():
     from .routes import main
     app.register_blueprint(main)
 
+    from .models import missing_columns
+    from .sqlite_profile import use_sqlite_profile
     with app.app_context():
+        use_sqlite_profile(db.engine, app.config['SQLITE_PROFILE'])
         db.create_all()
+        missing = missing_columns(db.engine)
+
+    # Code deployed before `flask db upgrade` would fail on every lead insert,
+    # so it refuses to start. The flask command (which runs the upgrade) only
+    # warns.
+    if missing:
+        message = (f"Database schema is behind the code (missing {', '.join(missing)}); "
+                   f"run `flask --app run db upgrade` before starting the app")
+        if click.get_current_context(silent=True) is None:
+            raise RuntimeError(message)
+        print(f"WARNING: {message}")
+
+    # Leads buffered by a process that died before flushing them
+    from .lead_buffer import recover_leads
+    recover_leads(app)
+
+    from .pricing import configure_catalog, install_reload_signal
+    configure_catalog(app.config['PRICING_CATALOG_PATH'])
+    install_reload_signal()
+
+    # The web process renders inline (PDF_RENDER_WORKERS=0) and computes cache
+    # keys, so it needs the profile too; pool workers set their own
+    from .pdf_profiles import set_pdf_profile
+    set_pdf_profile(app.config['PDF_OUTPUT_PROFILE'])
+
+    # Pre-render the invariant PDF backgrounds (before gunicorn forks with --preload);
+    # pool workers warm up their own copy when they start
+    if not app.config['PDF_RENDER_WORKERS']:
+        try:
+            from .pdf_generator import warm_pdf_templates
+            warm_pdf_templates()
+        except Exception as e:
+            print(f"PDF template warm-up failed: {str(e)}")
 
     return app
@@ -0,0 +1,106 @@
+from reportlab.platypus import Image
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from PIL import Image as PILImage
+import io
+import os
+import threading
+
+from .pdf_profiles import pdf_profile, pdf_profile_settings
+from .pdf_styles import HERO_BLUE
+
+
+LOGO_PATH = os.path.join(os.path.dirname(__file__), "..", "static", "GMI_Logo.jpeg")
+
+# Printed size of the logo in each template, in points
+LOGO_VARIANTS = {
+    "header": (2 * inch, 1 * inch),
+    "certificate": (2.5 * inch, 1.25 * inch),
+}
+# Colour behind the logo in each template, for profiles that drop its alpha
+LOGO_MATTES = {
+    "header": (255, 255, 255),
+    "certificate": tuple(round(c * 255) for c in HERO_BLUE.rgb()),
+}
+LOGO_JPEG_QUALITY = 90
+
+_logo = {"version": None, "variants": {}}
+_logo_lock = threading.Lock()
+
+
+class LogoImage(Image):
+    """Image flowable that draws an already decoded, shared ImageReader"""
+
+    def __init__(self, reader, width, height):
+        # Image only opens its own reader when ``_img`` is not set yet
+        self._img = reader
+        Image.__init__(self, reader.fp, width=width, height=height)
+
+
+def _scaled_variant(source, width, height, matte, settings):
+    # Never upscale: keep the source resolution on an axis that is already
+    # below the profile's DPI at the printed size
+    dpi = settings["logo_dpi"]
+    size = (
+        min(source.width, round(width / 72 * dpi)),
+        min(source.height, round(height / 72 * dpi)),
+    )
+    # Resize with premultiplied alpha so the transparent edges stay clean
+    scaled = source.convert("RGBa").resize(size, PILImage.LANCZOS).convert("RGBA")
+    encoded = io.BytesIO()
+    if settings["logo_format"] == "JPEG":
+        # Compositing here gives the same pixels the viewer would produce,
+        # and reportlab embeds JPEG data as is (DCTDecode, no soft mask)
+        flat = PILImage.new("RGB", size, matte)
+        flat.paste(scaled, mask=scaled.getchannel("A"))
+        flat.save(encoded, format="JPEG", quality=LOGO_JPEG_QUALITY, subsampling=0, optimize=True)
+    else:
+        scaled.save(encoded, format="PNG", optimize=True)
+    encoded.seek(0)
+    reader = ImageReader(encoded)
+    # Decode once here so renders only ever read the cached pixel data
+    reader.getRGBData()
+    if reader._dataA is not None:
+        reader._dataA.getRGBData()
+    return reader
+
+
+def _load_logo(version):
+    settings = pdf_profile_settings()
+    with PILImage.open(LOGO_PATH) as source:
+        source = source.convert("RGBA")
+        variants = {
+            name: _scaled_variant(source, width, height, LOGO_MATTES[name], settings)
+            for name, (width, height) in LOGO_VARIANTS.items()
+        }
+    _logo["variants"] = variants
+    _logo["version"] = version
+
+
+def logo_version():
+    """mtime of the logo file and the output profile, or None when the logo is missing"""
+    try:
+        return f"{os.stat(LOGO_PATH).st_mtime_ns}-{pdf_profile()}"
+    except OSError:
+        return None
+
+
+def get_logo(variant):
+    """Shared ImageReader for a logo variant, reloaded when the file or profile changes"""
+    version = logo_version()
+    if version is None:
+        return None
+    if version != _logo["version"]:
+        with _logo_lock:
+            if version != _logo["version"]:
+                _load_logo(version)
+    return _logo["variants"][variant]
+
+
+def logo_image(variant):
+    """Logo flowable sized for a template, or None when the logo is missing"""
+    reader = get_logo(variant)
+    if reader is None:
+        return None
+    width, height = LOGO_VARIANTS[variant]
+    return LogoImage(reader, width, height)
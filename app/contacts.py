@@ -0,0 +1,102 @@
+"""One contact per person across the lead tables.
+
+Every lead row gets a contact key: the last ten digits of its phone number,
+so "+91 98765 43210", "098765 43210" and "9876543210" match, or else its
+lower-cased email. Rows with the same key are upserted into one Contact,
+with a LeadEvent per submission. Someone who downloads three PDFs is then
+one contact with three events, not three unrelated rows. Every upsert gives
+the contact the next change_seq, which the lead export pages on.
+"""
+import re
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from . import db
+from .models import Contact, LeadEvent, utc_now
+
+
+# Digits that identify a number once country and trunk prefixes are dropped
+PHONE_DIGITS = 10
+# Shorter runs of digits are not a phone number
+MIN_PHONE_DIGITS = 7
+
+# Contact ids are looked up this many keys at a time (SQLite's variable limit)
+KEY_CHUNK = 500
+
+
+def contact_key(phone, email):
+    """The key a lead is deduplicated on, or None when it has neither a
+    usable phone number nor an email"""
+    digits = re.sub(r"\D", "", str(phone or ""))
+    if len(digits) >= MIN_PHONE_DIGITS:
+        return f"phone:{digits[-PHONE_DIGITS:]}"
+    email = str(email or "").strip().lower()
+    if "@" in email:
+        return f"email:{email}"
+    return None
+
+
+def _email(row):
+    # The lead tables call the column email or emailid
+    return row.get("email") or row.get("emailid")
+
+
+def insert_leads(model, rows):
+    """Insert lead rows and upsert their contacts and events.
+
+    Runs in the caller's transaction, with one executemany per table and
+    one contact id lookup per 500 keys, however many rows there are.
+    """
+    for row in rows:
+        row["contact_key"] = contact_key(row.get("phone"), _email(row))
+        if row.get("created_at") is None:
+            row["created_at"] = utc_now()
+    db.session.execute(db.insert(model), rows)
+
+    leads = [row for row in rows if row["contact_key"]]
+    if not leads:
+        return
+    # Evaluated for each row of the executemany; SQLite runs one writer at a
+    # time, so the numbers follow commit order
+    next_change = select(func.coalesce(func.max(Contact.change_seq), 0) + 1).scalar_subquery()
+    upsert = sqlite_insert(Contact).values(change_seq=next_change)
+    excluded = upsert.excluded
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[Contact.contact_key],
+        set_={
+            "name": excluded.name,
+            "phone": excluded.phone,
+            "email": func.coalesce(excluded.email, Contact.email),
+            "first_seen_at": func.coalesce(Contact.first_seen_at, excluded.first_seen_at),
+            "last_seen_at": excluded.last_seen_at,
+            "change_seq": excluded.change_seq,
+        },
+    )
+    db.session.execute(upsert, [
+        {
+            "contact_key": row["contact_key"],
+            "name": row.get("name"),
+            "phone": row.get("phone"),
+            "email": _email(row),
+            "first_seen_at": row["created_at"],
+            "last_seen_at": row["created_at"],
+        }
+        for row in leads
+    ])
+
+    keys = list({row["contact_key"] for row in leads})
+    ids = {}
+    for start in range(0, len(keys), KEY_CHUNK):
+        ids.update(db.session.execute(
+            select(Contact.contact_key, Contact.id).where(Contact.contact_key.in_(keys[start:start + KEY_CHUNK]))
+        ).all())
+    db.session.execute(db.insert(LeadEvent), [
+        {
+            "contact_id": ids[row["contact_key"]],
+            "source": model.__tablename__,
+            "intent": row.get("intent"),
+            "created_at": row["created_at"],
+        }
+        for row in leads
+    ])
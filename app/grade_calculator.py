@@ -1,3 +1,8 @@
+import math
+
+import numpy as np
+
+
 def calculate_german_grade(best_grade, min_passing_grade, your_grade):
     try:
         best_grade = float(best_grade)
@@ -5,10 +10,194 @@ def calculate_german_grade(best_grade, min_passing_grade, your_grade):
         your_grade = float(your_grade)
     except ValueError:
         return "Invalid input: Please enter numeric values."
+    # "nan" and "inf" parse as floats but are not grades
+    if not all(math.isfinite(grade) for grade in (best_grade, min_passing_grade, your_grade)):
+        return "Invalid input: Please enter numeric values."
  
     if best_grade <= min_passing_grade:
         return "Invalid input: Best grade must be greater than minimum passing grade."
  
+    # The common scales are precomputed; everything else uses the formula
+    scale = SCALES_BY_BOUNDS.get((best_grade, min_passing_grade))
+    if scale is not None:
+        german_grade = scale.lookup(your_grade)
+        if german_grade is not None:
+            return german_grade
+
     german_grade = 1 + 3 * ((best_grade - your_grade) / (best_grade - min_passing_grade))
     german_grade = round(min(german_grade, 4.0), 2)
-    return german_grade
\ No newline at end of file
+    return german_grade
+
+
+NUMERIC_ERROR = "Invalid input: Please enter numeric values."
+SCALE_ERROR = "Invalid input: Best grade must be greater than minimum passing grade."
+
+
+def _parse_grades(values, count):
+    """Float array of ``count`` grades, NaN for values that are not numbers.
+    A single value (a shared scale) is broadcast to every row."""
+    if not isinstance(values, (list, tuple)):
+        values = [values]
+    try:
+        grades = np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        # Only a request with a bad value pays for parsing one at a time
+        grades = np.empty(len(values))
+        for index, value in enumerate(values):
+            try:
+                grades[index] = float(value)
+            except (TypeError, ValueError):
+                grades[index] = np.nan
+    return np.broadcast_to(grades, count)
+
+
+def convert_grade_arrays(best, min_passing, yours):
+    """calculate_german_grade over float arrays (NaN for values that are not
+    numbers). Returns the German grades, NaN where a row fails, and each
+    row's error string, None where it succeeds."""
+    invalid = ~(np.isfinite(best) & np.isfinite(min_passing) & np.isfinite(yours))
+    bad_scale = ~invalid & (best <= min_passing)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        german = np.minimum(1 + 3 * ((best - yours) / (best - min_passing)), 4.0)
+
+    # Rounded in Python so every row matches calculate_german_grade exactly
+    german = np.array([round(grade, 2) for grade in german.tolist()], dtype=float)
+    german[invalid | bad_scale] = np.nan
+    errors = np.full(len(german), None, dtype=object)
+    errors[bad_scale] = SCALE_ERROR
+    errors[invalid] = NUMERIC_ERROR
+    return german, errors
+
+
+def calculate_german_grades(best_grades, min_passing_grades, your_grades):
+    """Vectorized calculate_german_grade. Each argument is a list with one value
+    per row or a single value shared by all rows. Returns one German grade or
+    error string per row, the same values calculate_german_grade returns."""
+    count = max(len(v) if isinstance(v, (list, tuple)) else 1
+                for v in (best_grades, min_passing_grades, your_grades))
+    german, errors = convert_grade_arrays(
+        _parse_grades(best_grades, count),
+        _parse_grades(min_passing_grades, count),
+        _parse_grades(your_grades, count),
+    )
+    return [error or grade for grade, error in zip(german.tolist(), errors.tolist())]
+
+
+
+# German grade bands as (best, worst, label), printed on the certificate
+GERMAN_BANDS = [
+    (1.0, 1.5, "Very Good (Sehr gut)"),
+    (1.6, 2.5, "Good (Gut)"),
+    (2.6, 3.5, "Satisfactory (Befriedigend)"),
+    (3.6, 4.0, "Sufficient (Ausreichend)"),
+]
+
+
+def _band_limit(worst):
+    """Worst two-decimal German grade still in a band. Grades are truncated to
+    one decimal for the band, as German transcripts do, so 1.59 is Sehr gut."""
+    return min(round(worst + 0.09, 2), 4.0)
+
+
+def german_band(german_grade):
+    """Label of the band a German grade falls in"""
+    for _, worst, label in GERMAN_BANDS:
+        if german_grade <= _band_limit(worst):
+            return label
+    return GERMAN_BANDS[-1][2]
+
+
+def required_grade(best_grade, min_passing_grade, german_grade, decimals=2):
+    """Lowest local grade, at ``decimals`` precision, that converts to
+    ``german_grade`` or better. Never below the minimum passing grade."""
+    step = 10 ** -decimals
+    # Where the unrounded formula crosses the rounding boundary of the target;
+    # the loops below settle the last step either way
+    bound = best_grade - (german_grade + 0.005 - 1) * (best_grade - min_passing_grade) / 3
+    candidate = max(math.floor(bound / step) * step, min_passing_grade)
+    while calculate_german_grade(best_grade, min_passing_grade, round(candidate, decimals)) > german_grade:
+        candidate += step
+    while (candidate - step >= min_passing_grade
+           and calculate_german_grade(best_grade, min_passing_grade, round(candidate - step, decimals)) <= german_grade):
+        candidate -= step
+    return round(candidate, decimals)
+
+
+class GradeScale:
+    """A named source scale with every conversion precomputed.
+
+    German grades are tabulated for each local grade from 0 to the best grade
+    at ``decimals`` precision, so a conversion is one list index. The reverse
+    table holds the lowest local grade needed for each German grade from 1.0
+    to 4.0 in steps of 0.01.
+    """
+
+    def __init__(self, name, label, best_grade, min_passing_grade, decimals=2):
+        self.name = name
+        self.label = label
+        self.best_grade = float(best_grade)
+        self.min_passing_grade = float(min_passing_grade)
+        self.decimals = decimals
+        self._factor = 10 ** decimals
+
+        # Division, not multiplication by the step, so each local grade is
+        # exactly the float a client's "8.37" parses to
+        local = np.arange(round(self.best_grade * self._factor) + 1) / self._factor
+        german, _ = convert_grade_arrays(self.best_grade, self.min_passing_grade, local)
+        self._german = german.tolist()
+
+        targets = np.arange(100, 401) / 100
+        # German grades fall as local grades rise: first local grade at or below each target
+        first = np.searchsorted(-german, -targets, side="left")
+        lowest = round(self.min_passing_grade * self._factor)
+        self._required = [local[max(index, lowest)].item() for index in first]
+
+    def lookup(self, your_grade):
+        """German grade from the table, or None if the grade is off the table"""
+        index = round(your_grade * self._factor)
+        if 0 <= index < len(self._german) and abs(index / self._factor - your_grade) < 1e-9:
+            return self._german[index]
+        return None
+
+    def german_grade(self, your_grade):
+        german_grade = self.lookup(your_grade)
+        if german_grade is None:
+            german_grade = calculate_german_grade(self.best_grade, self.min_passing_grade, your_grade)
+        return german_grade
+
+    def required_grade(self, german_grade):
+        """Lowest local grade that converts to ``german_grade`` (1.0 to 4.0) or better"""
+        index = math.floor(round(german_grade * 100, 6)) - 100
+        return self._required[min(max(index, 0), len(self._required) - 1)]
+
+    def describe(self):
+        """The scale and the local grades that fall in each German band"""
+        bands = []
+        max_local_grade = self.best_grade
+        for best, worst, label in GERMAN_BANDS:
+            min_local_grade = self.required_grade(_band_limit(worst))
+            bands.append({
+                "german_grades": f"{best} - {worst}",
+                "label": label,
+                "min_local_grade": min_local_grade,
+                "max_local_grade": max_local_grade,
+            })
+            max_local_grade = round(min_local_grade - 1 / self._factor, self.decimals)
+        return {
+            "name": self.name,
+            "label": self.label,
+            "best_grade": self.best_grade,
+            "min_passing_grade": self.min_passing_grade,
+            "bands": bands,
+        }
+
+
+GRADE_SCALES = {
+    scale.name: scale
+    for scale in (
+        GradeScale("cgpa_10", "10-point CGPA", 10, 4),
+        GradeScale("gpa_4", "4.0 GPA", 4, 1),
+        GradeScale("percentage", "Percentage", 100, 40),
+    )
+}
+SCALES_BY_BOUNDS = {(scale.best_grade, scale.min_passing_grade): scale for scale in GRADE_SCALES.values()}
@@ -0,0 +1,288 @@
+"""Write-behind storage for leads.
+
+A lead endpoint appends its row to this process's segment file in
+LEAD_BUFFER_DIR (one JSON line, with no database lock and no fsync) and
+returns. A flusher thread moves the waiting rows into the lead tables every
+LEAD_FLUSH_INTERVAL_MS, or sooner once LEAD_FLUSH_ROWS are waiting. It uses
+one executemany INSERT per table and a single commit, so SQLite sees one
+short write transaction per interval per worker instead of one per request.
+
+A segment is deleted only after its rows are committed, and its name is
+committed with them (LeadBatch), so replaying a segment never inserts it
+twice. The process that writes a segment holds an flock on it until the
+segment is ingested. recover_leads() ingests the segments nobody holds,
+which were left behind by a worker that died. Appended rows are already in
+the page cache, so they survive a crashed process; a power failure can lose
+the last interval, much like SQLite's synchronous=NORMAL.
+
+With LEAD_FLUSH_INTERVAL_MS=0, or without fcntl (Windows), every lead is
+stored inside its request, which keeps tests deterministic.
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from flask import current_app
+from sqlalchemy.exc import OperationalError
+
+from . import db
+from .contacts import insert_leads
+from .models import GradeUserSubmission, LeadBatch, ReportSubmission, RequestCallBack, UserSubmission, utc_now
+
+
+LEAD_MODELS = {
+    model.__name__: model
+    for model in (UserSubmission, ReportSubmission, RequestCallBack, GradeUserSubmission)
+}
+# Written to the segments as ISO strings
+DATETIME_COLUMNS = {
+    model: {column.name for column in model.__table__.columns if isinstance(column.type, db.DateTime)}
+    for model in LEAD_MODELS.values()
+}
+
+
+class InvalidLead(ValueError):
+    """A lead its table would reject; refused before it is buffered"""
+
+
+def lead_row(model, values):
+    """``values`` checked against the columns of ``model``, ready to insert.
+
+    The checks stand in for the constraints a buffered row only meets at
+    flush time, when one bad row would hold up the whole batch.
+    """
+    row = {}
+    for column in model.__table__.columns:
+        if column.primary_key:
+            continue
+        value = values.get(column.name)
+        if value is None:
+            if column.default is not None or column.server_default is not None:
+                continue
+            if not column.nullable:
+                raise InvalidLead(f"{column.name} is required")
+        elif isinstance(value, (dict, list)):
+            raise InvalidLead(f"{column.name} must be text")
+        elif not isinstance(value, (str, datetime)):
+            value = str(value)
+        row[column.name] = value
+    return row
+
+
+def _open_segment(directory):
+    # O_APPEND writes go straight to the kernel, so a crash loses nothing appended
+    path = os.path.join(directory, f"{os.getpid()}-{uuid.uuid4().hex}.jsonl")
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o644)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    return path, fd
+
+
+def _claim_segment(path):
+    """A locked fd for a segment no live process holds, or None"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    # Ingested and deleted between our open and our lock
+    if os.fstat(fd).st_nlink == 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def ingest_segment(path, forget=()):
+    """Insert the rows of one segment, once, then delete it.
+
+    Returns False when the database is busy and the segment should be tried
+    again later. ``forget`` names earlier segments whose LeadBatch rows are
+    no longer needed, since their files are gone.
+    """
+    name = os.path.basename(path)
+    try:
+        rows = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Cut short by a crash in the middle of an append
+                    continue
+                model = LEAD_MODELS[entry["model"]]
+                row = {
+                    key: datetime.fromisoformat(value) if key in DATETIME_COLUMNS[model] and value else value
+                    for key, value in entry["row"].items()
+                }
+                # One executemany per table and set of columns
+                rows.setdefault((model, tuple(sorted(row))), []).append(row)
+
+        if forget:
+            db.session.execute(db.delete(LeadBatch).where(LeadBatch.segment.in_(forget)))
+        if db.session.get(LeadBatch, name) is None:
+            for (model, _), model_rows in rows.items():
+                insert_leads(model, model_rows)
+            db.session.add(LeadBatch(segment=name))
+        db.session.commit()
+    except OperationalError as e:
+        db.session.rollback()
+        print(f"Lead segment {name} not ingested, retrying: {str(e)}")
+        return False
+    except Exception as e:
+        # Kept for inspection instead of blocking every later flush
+        db.session.rollback()
+        print(f"Lead segment {name} rejected: {str(e)}")
+        os.replace(path, f"{path}.rejected")
+        return True
+    os.remove(path)
+    return True
+
+
+def recover_leads(app):
+    """Ingest the segments of processes that died; returns how many were ingested"""
+    directory = app.config.get("LEAD_BUFFER_DIR")
+    if fcntl is None or not directory or not os.path.isdir(directory):
+        return 0
+    recovered = 0
+    with app.app_context():
+        for path in sorted(glob.glob(os.path.join(directory, "*.jsonl"))):
+            fd = _claim_segment(path)
+            if fd is None:
+                continue
+            try:
+                if ingest_segment(path):
+                    recovered += 1
+            finally:
+                os.close(fd)
+    if recovered:
+        print(f"Recovered {recovered} lead segment(s) from {directory}")
+    return recovered
+
+
+class LeadBuffer:
+    """The segment this process appends to and the thread that flushes it"""
+
+    def __init__(self, app, directory, interval, batch_rows):
+        self.app = app
+        self.directory = directory
+        self.interval = interval
+        self.batch_rows = batch_rows
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._segment = None
+        self._rows = 0
+        # Closed segments, still locked, and the names of ingested ones
+        self._ready = []
+        self._ingested = []
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="lead-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def append(self, model, rows):
+        data = "".join(
+            json.dumps({"model": model.__name__, "row": row}, default=datetime.isoformat) + "\n"
+            for row in rows
+        ).encode("utf-8")
+        with self._lock:
+            if self._segment is None:
+                self._segment = _open_segment(self.directory)
+            view = memoryview(data)
+            while view:
+                view = view[os.write(self._segment[1], view):]
+            self._rows += len(rows)
+            full = self._rows >= self.batch_rows
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Ingest everything appended so far"""
+        with self._flush_lock:
+            with self._lock:
+                # Appends from here on start a new segment
+                if self._segment is not None:
+                    self._ready.append(self._segment)
+                    self._segment, self._rows = None, 0
+            if not self._ready:
+                return
+            with self.app.app_context():
+                waiting = []
+                for path, fd in self._ready:
+                    if ingest_segment(path, forget=self._ingested):
+                        os.close(fd)
+                        self._ingested = [os.path.basename(path)]
+                    else:
+                        waiting.append((path, fd))
+                self._ready = waiting
+
+    def _run(self):
+        # A worker that replaced a dead one picks up what it left behind
+        recover_leads(self.app)
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Lead flush failed: {str(e)}")
+
+
+_buffer = {"pid": None, "buffer": None}
+_buffer_lock = threading.Lock()
+
+
+def get_lead_buffer(app):
+    """The lead buffer of this process, created on first use.
+
+    Keyed on the pid like the render pool, so a buffer created before
+    gunicorn forks is never shared. Returns None when leads are stored
+    synchronously.
+    """
+    config = app.config
+    if not config.get("LEAD_FLUSH_INTERVAL_MS") or fcntl is None:
+        return None
+    pid = os.getpid()
+    if _buffer["pid"] != pid:
+        with _buffer_lock:
+            if _buffer["pid"] != pid:
+                _buffer["buffer"] = LeadBuffer(
+                    app,
+                    config["LEAD_BUFFER_DIR"],
+                    config["LEAD_FLUSH_INTERVAL_MS"] / 1000,
+                    config.get("LEAD_FLUSH_ROWS", 500),
+                )
+                _buffer["pid"] = pid
+    return _buffer["buffer"]
+
+
+def store_leads(model, leads):
+    """Store lead rows (dicts of column values) through the buffer, or right away"""
+    rows = [lead_row(model, values) for values in leads]
+    # Stamped here, so a buffered lead keeps the time it was submitted
+    now = utc_now()
+    for row in rows:
+        row["created_at"] = now
+    app = current_app._get_current_object()
+    buffer = get_lead_buffer(app)
+    if buffer is not None:
+        buffer.append(model, rows)
+        return
+    insert_leads(model, rows)
+    db.session.commit()
+
+
+def store_lead(model, **values):
+    store_leads(model, [values])
@@ -0,0 +1,146 @@
+"""Stream the lead tables out as CSV or NDJSON.
+
+Rows are read in keyset pages (``position > last position ORDER BY position
+LIMIT n``). Each page is read whole on its own short-lived connection, and
+the connection goes back to the pool before the first row of the page is
+sent. The export therefore never runs an OFFSET scan, never holds more than
+a page in memory, and never keeps a read transaction open while a slow
+client downloads.
+
+The position is the row id, not created_at. Leads and lead events are
+append-only, and SQLite hands out ids in commit order, so ``id > cursor``
+is exactly the rows committed since. created_at is stamped when a lead is
+submitted, before the lead buffer writes it, so a row can land behind a
+timestamp cursor. Contacts are updated in place, so their position is
+change_seq, which every insert and update moves past all others.
+
+Each export stops at the largest position that existed when it started.
+The cursor it returns holds that position along with the export's table
+and from/to, so the next incremental export applies the same filters.
+"""
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from . import db
+from .models import Contact, GradeUserSubmission, LeadEvent, ReportSubmission, RequestCallBack, UserSubmission
+
+
+EXPORT_TABLES = {
+    model.__tablename__: model.__table__
+    for model in (UserSubmission, ReportSubmission, RequestCallBack, GradeUserSubmission, Contact, LeadEvent)
+}
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+# The column the from/to filters apply to
+TIME_COLUMNS = {name: "last_seen_at" if name == "contact" else "created_at" for name in EXPORT_TABLES}
+# The column rows are exported in order of, and the cursor points into
+POSITION_COLUMNS = {name: "change_seq" if name == "contact" else "id" for name in EXPORT_TABLES}
+
+
+class InvalidExport(ValueError):
+    """Export parameters that cannot be served"""
+
+
+def encode_cursor(table_name, after, start=None, end=None):
+    """The opaque X-Next-Cursor for rows past ``after`` in ``table_name``"""
+    state = {
+        "table": table_name,
+        "after": after,
+        "from": start.isoformat() if start else None,
+        "to": end.isoformat() if end else None,
+    }
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(table name, position, start, end) saved in a cursor"""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        table_name, after = state["table"], state["after"]
+        if table_name not in EXPORT_TABLES or not isinstance(after, int) or isinstance(after, bool):
+            raise ValueError(cursor)
+        start, end = (datetime.fromisoformat(state[name]) if state[name] else None for name in ("from", "to"))
+    except (ValueError, TypeError, KeyError):
+        raise InvalidExport("cursor must be one returned in X-Next-Cursor")
+    return table_name, after, start, end
+
+
+def resume_export(cursor, table_name=None, start=None, end=None):
+    """(table name, position, start, end) of an export, continuing ``cursor`` if one is given.
+
+    The cursor's table and from/to are kept, so an incremental export sees
+    the rows the first one would have, had they existed; different ones
+    are refused.
+    """
+    if not cursor:
+        table_name = table_name or "user_submission"
+        if table_name not in EXPORT_TABLES:
+            raise InvalidExport(f"table must be one of {', '.join(EXPORT_TABLES)}")
+        return table_name, 0, start, end
+    saved = decode_cursor(cursor)
+    for name, given, kept in (("table", table_name, saved[0]), ("from", start, saved[2]), ("to", end, saved[3])):
+        if given is not None and given != kept:
+            raise InvalidExport(f"{name} differs from the cursor's; leave it out to keep the cursor's")
+    return saved
+
+
+def export_bounds(table_name):
+    """(table, largest position now), the snapshot an export stops at"""
+    table = EXPORT_TABLES[table_name]
+    with db.engine.connect() as connection:
+        last = connection.execute(select(func.max(table.c[POSITION_COLUMNS[table_name]]))).scalar() or 0
+    return table, last
+
+
+def export_rows(table, after, last, start=None, end=None, page_rows=5000):
+    """Rows with after < position <= last (and a time column in [start, end)), in position order"""
+    position = table.c[POSITION_COLUMNS[table.name]]
+    time_column = table.c[TIME_COLUMNS[table.name]]
+    while after < last:
+        query = (
+            select(table)
+            .where(position > after, position <= last)
+            .order_by(position)
+            .limit(page_rows)
+        )
+        if start is not None:
+            query = query.where(time_column >= start)
+        if end is not None:
+            query = query.where(time_column < end)
+        with db.engine.connect() as connection:
+            rows = connection.execute(query).all()
+        yield from rows
+        if len(rows) < page_rows:
+            break
+        after = getattr(rows[-1], position.name)
+
+
+def csv_lines(table, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(table.c.keys())
+    for row in rows:
+        writer.writerow(["" if value is None else value for value in row])
+        # Sent in blocks of about 64 KB rather than line by line
+        if buffer.tell() >= 65536:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def ndjson_lines(table, rows):
+    names = table.c.keys()
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(names, row)), default=lambda value: value.isoformat()))
+        if len(lines) >= 1000:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
@@ -0,0 +1,129 @@
+"""Monthly living costs per country and city, computed on the server.
+
+The dataset (living_costs.json) is loaded once into a read-only NumPy table
+with one row per city, plus one per country holding the mean of its cities,
+and a dict from (country, city) to row number. Each answer from the
+calculator's questionnaire is a vector of multipliers over the cost
+categories. A quote is therefore a row lookup, one vector product and one
+sum, and comparing several cities is the same few operations over several
+rows.
+
+Every country names the source of its figures, e.g.
+``"Germany": {"source": "<publication, year>", "cities": {"Berlin": [...]}}``,
+and a dataset with an unsourced country is refused at load. No sourced
+figures have been added yet, so the dataset is empty; the endpoint and the
+cost reports leave it alone until LIVING_COSTS_ENABLED is turned on.
+"""
+import json
+import os
+
+import numpy as np
+
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "living_costs.json")
+
+
+class InvalidCostQuery(ValueError):
+    """A country, city or answer the dataset does not know"""
+
+
+class LivingCostIndex:
+    """Living-cost table with its (country, city) index and answer multipliers"""
+
+    def __init__(self, data):
+        self.currency = data["currency"]
+        self.categories = tuple(data["categories"])
+        rows, self._locations, self._index = [], [], {}
+        self._cities, self._sources = {}, {}
+        for country, entry in data["countries"].items():
+            if not entry.get("source"):
+                raise ValueError(f"{country}: the dataset must name the source of its figures")
+            self._sources[country] = entry["source"]
+            cities = entry["cities"]
+            first = len(rows)
+            for city, amounts in cities.items():
+                if len(amounts) != len(self.categories):
+                    raise ValueError(f"{city}, {country}: expected {len(self.categories)} amounts")
+                self._index[(country.lower(), city.lower())] = len(rows)
+                self._locations.append((country, city))
+                rows.append(amounts)
+            # No city given: the average over the country's cities
+            self._index[(country.lower(), None)] = len(rows)
+            self._locations.append((country, None))
+            rows.append(np.mean(rows[first:], axis=0))
+            self._cities[country] = list(cities)
+        self._table = np.array(rows, dtype=float)
+        self._table.flags.writeable = False
+
+        self._answers = {}
+        for question, options in data["answers"].items():
+            self._answers[question] = {}
+            for option, factors in options.items():
+                vector = np.ones(len(self.categories))
+                for category, factor in factors.items():
+                    vector[self.categories.index(category)] = factor
+                self._answers[question][option] = vector
+
+    @classmethod
+    def from_file(cls, path=DATA_PATH):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def row(self, country, city=None):
+        """Table row of a city, or of the country average without a city"""
+        if not isinstance(country, str) or (country.lower(), None) not in self._index:
+            raise InvalidCostQuery(f"Unknown country: {country}")
+        key = (country.lower(), city.lower() if isinstance(city, str) and city else None)
+        if key not in self._index:
+            raise InvalidCostQuery(f"Unknown city for {self._locations[self._index[(country.lower(), None)]][0]}: {city}")
+        return self._index[key]
+
+    def multipliers(self, answers):
+        """Per-category multipliers for questionnaire answers. Questions the
+        dataset does not price are ignored; unknown options are errors."""
+        if answers is None:
+            answers = {}
+        if not isinstance(answers, dict):
+            raise InvalidCostQuery("answers must be an object")
+        vector = np.ones(len(self.categories))
+        for question, options in self._answers.items():
+            option = answers.get(question)
+            if option in (None, ""):
+                continue
+            if not isinstance(option, str) or option not in options:
+                raise InvalidCostQuery(f"Unknown {question} answer: {option}; expected one of {', '.join(options)}")
+            vector *= options[option]
+        return vector
+
+    def quote_rows(self, rows, answers=None):
+        """Quotes for several table rows with the same answers"""
+        amounts = np.rint(self._table[rows] * self.multipliers(answers)).astype(int)
+        totals = amounts.sum(axis=1)
+        quotes = []
+        for row, row_amounts, total in zip(rows, amounts.tolist(), totals.tolist()):
+            country, city = self._locations[row]
+            expenses = dict(zip(self.categories, row_amounts))
+            expenses["total"] = total
+            quotes.append({"country": country, "city": city, "currency": self.currency, "expenses": expenses})
+        return quotes
+
+    def quote(self, country, city=None, answers=None):
+        """Monthly expenses for one location: {"country", "city", "currency",
+        "expenses": {category: amount, ..., "total": sum}}"""
+        return self.quote_rows([self.row(country, city)], answers)[0]
+
+    def compare(self, locations, answers=None):
+        """Quotes for (country, city) pairs, all in one vectorized pass"""
+        return self.quote_rows([self.row(country, city) for country, city in locations], answers)
+
+    def describe(self):
+        return {
+            "currency": self.currency,
+            "categories": list(self.categories),
+            "countries": {country: list(cities) for country, cities in self._cities.items()},
+            "sources": dict(self._sources),
+            "answers": {question: list(options) for question, options in self._answers.items()},
+        }
+
+
+LIVING_COSTS = LivingCostIndex.from_file()
@@ -1,26 +1,87 @@
-from . import db 
+from datetime import datetime, timezone
+
+from sqlalchemy import inspect
+
+from . import db
+
+
+def utc_now():
+    # Naive UTC, the way SQLite stores DateTime columns
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def missing_columns(engine):
+    """"table.column" for every model column the database does not have.
+
+    db.create_all() creates missing tables but never alters existing ones,
+    so these are columns a migration adds that has not been run yet.
+    """
+    inspector = inspect(engine)
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        missing.extend(f"{table.name}.{column.name}" for column in table.columns if column.name not in existing)
+    return missing
 
 class UserSubmission(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
-    phone = db.Column(db.String(20), nullable=False)
-    emailid = db.Column(db.String(255), nullable=True)
+    phone = db.Column(db.String(20), nullable=False, index=True)
+    emailid = db.Column(db.String(255), nullable=True, index=True)
     intent = db.Column(db.String(200), nullable=False)
+    contact_key = db.Column(db.String(255), nullable=True, index=True)
+    created_at = db.Column(db.DateTime, nullable=True, default=utc_now, index=True)
 
 class ReportSubmission(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
-    phone = db.Column(db.String(20), nullable=False)
-    emailid = db.Column(db.String(200), nullable=True)
+    phone = db.Column(db.String(20), nullable=False, index=True)
+    emailid = db.Column(db.String(200), nullable=True, index=True)
     intent = db.Column(db.String(200), nullable=True)
+    contact_key = db.Column(db.String(255), nullable=True, index=True)
+    created_at = db.Column(db.DateTime, nullable=True, default=utc_now, index=True)
 
 class RequestCallBack(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
-    phone = db.Column(db.String(200), nullable=False)
+    phone = db.Column(db.String(200), nullable=False, index=True)
+    contact_key = db.Column(db.String(255), nullable=True, index=True)
+    created_at = db.Column(db.DateTime, nullable=True, default=utc_now, index=True)
 
 class GradeUserSubmission(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
-    email = db.Column(db.String(255), nullable=False)
-    phone = db.Column(db.String(20), nullable=False)
\ No newline at end of file
+    email = db.Column(db.String(255), nullable=False, index=True)
+    phone = db.Column(db.String(20), nullable=False, index=True)
+    contact_key = db.Column(db.String(255), nullable=True, index=True)
+    created_at = db.Column(db.DateTime, nullable=True, default=utc_now, index=True)
+
+# One row per person, whichever form they filled in and however often
+# (see app/contacts.py); the rows above stay as submitted
+class Contact(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    contact_key = db.Column(db.String(255), nullable=False, unique=True)
+    name = db.Column(db.String(200), nullable=True)
+    phone = db.Column(db.String(200), nullable=True, index=True)
+    email = db.Column(db.String(255), nullable=True, index=True)
+    first_seen_at = db.Column(db.DateTime, nullable=True)
+    last_seen_at = db.Column(db.DateTime, nullable=True, index=True)
+    # Renumbered, above every other contact, on each insert and update, so
+    # an export can pick up contacts changed since its cursor
+    change_seq = db.Column(db.Integer, nullable=True, unique=True, index=True)
+    events = db.relationship('LeadEvent', backref='contact', lazy='dynamic')
+
+# Every submission of a contact: the table it went to and its intent
+class LeadEvent(db.Model):
+    __table_args__ = (db.Index('ix_lead_event_contact_id_created_at', 'contact_id', 'created_at'),)
+    id = db.Column(db.Integer, primary_key=True)
+    contact_id = db.Column(db.Integer, db.ForeignKey('contact.id'), nullable=False)
+    source = db.Column(db.String(50), nullable=False)
+    intent = db.Column(db.String(200), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=True, default=utc_now, index=True)
+
+# Lead buffer segments whose rows are already in the tables above
+class LeadBatch(db.Model):
+    segment = db.Column(db.String(100), primary_key=True)
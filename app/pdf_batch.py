@@ -0,0 +1,101 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+import time
+import zipfile
+
+from .pdf_cache import get_pdf_cache, pdf_cache_key
+from .render_pool import PDFFile, RenderPoolBusy, discard_result, submit_pdf
+
+
+ZIP_CHUNK_SIZE = 64 * 1024
+
+
+class BatchTooLarge(ValueError):
+    """A batch upload over the configured row or byte limit"""
+
+
+def iter_renders(config, kind, render_args_list):
+    """Render many PDFs in parallel; yields (index, PDF or exception) as they finish.
+
+    At most PDF_RENDER_WORKERS renders are in flight, so a batch keeps every
+    core busy without taking the queue slots interactive downloads rely on.
+    Cached PDFs are yielded without a render.
+    """
+    cache = get_pdf_cache(config)
+    window = max(1, config.get("PDF_RENDER_WORKERS") or 1)
+    queue = deque(enumerate(render_args_list))
+    in_flight = {}
+    try:
+        while queue or in_flight:
+            while queue and len(in_flight) < window:
+                index, render_args = queue[0]
+                key = pdf_cache_key(kind, render_args) if cache is not None else None
+                pdf = cache.get(key) if cache is not None else None
+                if pdf is not None:
+                    queue.popleft()
+                    yield index, pdf
+                    continue
+                try:
+                    future, _ = submit_pdf(config, kind, **render_args)
+                except RenderPoolBusy:
+                    # Other requests hold the free slots; wait for one of ours
+                    if not in_flight:
+                        time.sleep(0.1)
+                    break
+                queue.popleft()
+                in_flight[future] = (index, key)
+            if not in_flight:
+                continue
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, key = in_flight.pop(future)
+                try:
+                    pdf = future.result()
+                except Exception as e:
+                    yield index, e
+                    continue
+                yield index, cache.put(key, pdf) if cache is not None else pdf
+    finally:
+        # The client went away: nobody will read the renders still running
+        for future in in_flight:
+            future.add_done_callback(discard_result)
+
+
+class _ZipSink:
+    """Write-only file that collects zipfile's output until it is taken"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(entries):
+    """Yield a ZIP archive of (name, PDF) entries piece by piece.
+
+    zipfile writes data descriptors to the unseekable sink, so no entry has
+    to be held back once it is written.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        for name, pdf in entries:
+            if isinstance(pdf, PDFFile):
+                with open(pdf.path, "rb") as src, archive.open(name, "w") as dest:
+                    for block in iter(lambda: src.read(ZIP_CHUNK_SIZE), b""):
+                        dest.write(block)
+                        yield sink.take()
+                pdf.discard()
+            else:
+                archive.writestr(name, pdf)
+            yield sink.take()
+    yield sink.take()
@@ -0,0 +1,229 @@
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+import time
+
+from .assets import logo_version
+from .pdf_fonts import fonts_version
+from .pdf_generator import render_inputs
+from .pdf_profiles import pdf_profile
+from .render_pool import PDFFile, render_pdf
+
+
+# Bump whenever a template's layout changes so old disk entries stop matching
+CACHE_VERSION = 2
+
+
+def pdf_cache_key(kind, render_args):
+    """Content address of a render: sha256 of its canonical, normalized inputs"""
+    payload = {
+        "kind": kind,
+        "version": CACHE_VERSION,
+        "logo": logo_version(),
+        "fonts": fonts_version(),
+        "profile": pdf_profile(),
+        "inputs": render_inputs(kind, **render_args),
+    }
+    canonical = json.dumps(
+        payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class PDFCache:
+    """Two-tier cache of rendered PDFs keyed by ``pdf_cache_key``.
+
+    The memory tier is an LRU bounded to ``memory_bytes`` per process. The
+    disk tier is a directory shared by every worker; the first render stored
+    under a key wins, so all workers serve the same bytes for the same ETag.
+    Disk entries older than ``ttl`` seconds are ignored and swept; entries
+    over ``stream_threshold`` bytes are handed out as files, never read whole.
+    """
+
+    def __init__(self, directory, memory_bytes, ttl, stream_threshold):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.ttl = ttl
+        self.stream_threshold = stream_threshold
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+        self._counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._last_cleanup = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _remember(self, key, pdf_bytes):
+        if len(pdf_bytes) > self.memory_bytes:
+            return
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            self._memory[key] = pdf_bytes
+            self._memory_size += len(pdf_bytes)
+            while self._memory_size > self.memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted)
+
+    def _read_disk(self, key):
+        # Small entries are read into memory, large ones are streamed from disk
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            if time.time() - stat.st_mtime > self.ttl:
+                return None
+            if stat.st_size > self.stream_threshold:
+                return PDFFile(path, stat.st_size, temporary=False)
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _served(self, key, pdf):
+        if not isinstance(pdf, PDFFile):
+            self._remember(key, pdf)
+        return pdf
+
+    def get(self, key):
+        """Cached PDF for a key (bytes, or a PDFFile for large ones), or None"""
+        with self._lock:
+            pdf_bytes = self._memory.get(key)
+            if pdf_bytes is not None:
+                self._memory.move_to_end(key)
+                self._counts["memory_hits"] += 1
+                return pdf_bytes
+        pdf = self._read_disk(key)
+        if pdf is None:
+            self._count("misses")
+            return None
+        self._count("disk_hits")
+        return self._served(key, pdf)
+
+    def put(self, key, pdf):
+        """Store a render and return what to serve: the same PDF, or another
+        worker's if it stored this key first.
+
+        A spooled PDFFile is moved into the cache rather than copied.
+        """
+        path = self._path(key)
+        spooled = isinstance(pdf, PDFFile)
+        tmp_path = pdf.path if spooled else f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if not spooled:
+                with open(tmp_path, "wb") as f:
+                    f.write(pdf)
+            # link() fails if the key exists, unlike rename(), and never
+            # exposes a partly written file
+            os.link(tmp_path, path)
+        except FileExistsError:
+            existing = self._read_disk(key)
+            if existing is not None:
+                _remove(tmp_path)
+                return self._served(key, existing)
+            # An expired entry the sweep has not removed yet
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"PDF cache write failed: {str(e)}")
+            if spooled:
+                # Still the caller's file to serve and delete
+                return pdf
+            _remove(tmp_path)
+            return self._served(key, pdf)
+        _remove(tmp_path)
+        if spooled:
+            return PDFFile(path, pdf.size, temporary=False)
+        return self._served(key, pdf)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counts)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_size
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((lookups - stats["misses"]) / lookups, 4) if lookups else None
+        stats["memory_limit_bytes"] = self.memory_bytes
+        disk_entries = disk_bytes = 0
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".pdf"):
+                        disk_entries += 1
+                        disk_bytes += entry.stat().st_size
+        except OSError:
+            pass
+        stats["disk_entries"] = disk_entries
+        stats["disk_bytes"] = disk_bytes
+        stats["pid"] = os.getpid()
+        return stats
+
+    def cleanup(self, interval=300):
+        """Delete expired disk entries; runs at most once per ``interval`` seconds"""
+        now = time.time()
+        if now - self._last_cleanup < interval:
+            return
+        self._last_cleanup = now
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if now - os.stat(path).st_mtime > self.ttl:
+                    os.remove(path)
+            except OSError:
+                # Another worker removed it first
+                pass
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_pdf_cache(config):
+    """The PDF cache of this process, or None when PDF_CACHE_TTL is 0"""
+    if not config.get("PDF_CACHE_TTL"):
+        return None
+    directory = config["PDF_CACHE_DIR"]
+    cache = _caches.get(directory)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(directory)
+            if cache is None:
+                cache = PDFCache(
+                    directory,
+                    config["PDF_CACHE_MEMORY_BYTES"],
+                    config["PDF_CACHE_TTL"],
+                    config.get("PDF_SPOOL_MAX_MEMORY", 256 * 1024),
+                )
+                _caches[directory] = cache
+    return cache
+
+
+def cached_pdf(config, kind, render_args, key=None):
+    """The PDF for a render (bytes or a PDFFile), from the cache when it was made before"""
+    cache = get_pdf_cache(config)
+    if cache is None:
+        return render_pdf(config, kind, **render_args)
+    key = key or pdf_cache_key(kind, render_args)
+    pdf = cache.get(key)
+    if pdf is None:
+        cache.cleanup()
+        pdf = cache.put(key, render_pdf(config, kind, **render_args))
+    return pdf
@@ -0,0 +1,228 @@
+"""Unicode fonts for user text the built-in PDF fonts cannot show.
+
+The templates are set in Helvetica, whose encoding only covers Western
+European characters, so names in Devanagari, Tamil or many accented Latin
+letters used to come out as boxes. Text that needs more is split into runs
+by script and each run is set in a bundled Noto font (static/fonts, SIL Open
+Font License). Fonts are registered once per process and the font subsets
+embedded in PDFs are cached, so text Helvetica can show costs one
+``str.isascii`` check and everything else a few dictionary lookups.
+
+A script whose font file is missing keeps Helvetica, as before. Scripts
+without a bundled bold face use their regular face for bold text.
+"""
+from bisect import bisect_right
+from collections import OrderedDict
+from xml.sax.saxutils import escape
+import os
+import re
+import threading
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+
+FONT_DIR = os.path.join(os.path.dirname(__file__), "..", "static", "fonts")
+
+# Noto font files per script: (regular, bold or None)
+SCRIPT_FONTS = {
+    "latin": ("NotoSans-Regular.ttf", "NotoSans-Bold.ttf"),
+    "devanagari": ("NotoSansDevanagari-Regular.ttf", None),
+    "bengali": ("NotoSerifBengali-Regular.ttf", None),
+    "gurmukhi": ("NotoSerifGurmukhi-Regular.ttf", None),
+    "gujarati": ("NotoSerifGujarati-Regular.ttf", None),
+    "tamil": ("NotoSansTamil-Regular.ttf", None),
+    "telugu": ("NotoSerifTelugu-Regular.ttf", None),
+    "kannada": ("NotoSansKannada-Regular.ttf", None),
+    "malayalam": ("NotoSerifMalayalam-Regular.ttf", None),
+}
+
+# Unicode blocks per script, as (first, last, script). Characters outside
+# these blocks use the "latin" font, which also covers Greek and Cyrillic.
+SCRIPT_BLOCKS = [
+    (0x0900, 0x097F, "devanagari"),
+    (0x0980, 0x09FF, "bengali"),
+    (0x0A00, 0x0A7F, "gurmukhi"),
+    (0x0A80, 0x0AFF, "gujarati"),
+    (0x0B80, 0x0BFF, "tamil"),
+    (0x0C00, 0x0C7F, "telugu"),
+    (0x0C80, 0x0CFF, "kannada"),
+    (0x0D00, 0x0D7F, "malayalam"),
+    (0x1CD0, 0x1CFF, "devanagari"),  # Vedic extensions
+    (0xA8E0, 0xA8FF, "devanagari"),  # Devanagari extended
+]
+_block_starts = [first for first, _, _ in SCRIPT_BLOCKS]
+_WORDS = re.compile(r"(\s+)")
+
+# Subsets kept per font; a subset is the set of characters one PDF uses
+SUBSET_CACHE_SIZE = 256
+
+_fonts = {}
+_fonts_lock = threading.Lock()
+_version = {}
+
+
+def needs_unicode_fonts(text):
+    """Whether ``text`` has characters Helvetica (WinAnsi encoding) cannot show"""
+    if text.isascii():
+        return False
+    try:
+        text.encode("cp1252")
+    except UnicodeEncodeError:
+        return True
+    return False
+
+
+def _script(char):
+    """Script of a character Helvetica cannot show"""
+    code = ord(char)
+    index = bisect_right(_block_starts, code) - 1
+    if index >= 0 and code <= SCRIPT_BLOCKS[index][1]:
+        return SCRIPT_BLOCKS[index][2]
+    return "latin"
+
+
+class _SubsetCache:
+    """LRU in front of a font face's makeSubset.
+
+    reportlab builds a new TrueType subset for every PDF. The characters of
+    a subset are numbered in order of first use, so the same name rendered
+    again asks for the same subset and can reuse its bytes.
+    """
+
+    def __init__(self, make_subset, size):
+        self._make_subset = make_subset
+        self._size = size
+        self._subsets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, subset):
+        key = tuple(subset)
+        with self._lock:
+            data = self._subsets.get(key)
+            if data is not None:
+                self._subsets.move_to_end(key)
+                return data
+        data = self._make_subset(subset)
+        with self._lock:
+            self._subsets[key] = data
+            if len(self._subsets) > self._size:
+                self._subsets.popitem(last=False)
+        return data
+
+
+def _register(script, bold):
+    path = os.path.join(FONT_DIR, SCRIPT_FONTS[script][1 if bold else 0])
+    if not os.path.exists(path):
+        return None
+    name = f"Noto-{script}-{'Bold' if bold else 'Regular'}"
+    try:
+        font = TTFont(name, path)
+    except Exception as e:
+        print(f"Font {path} could not be loaded: {str(e)}")
+        return None
+    font.face.makeSubset = _SubsetCache(font.face.makeSubset, SUBSET_CACHE_SIZE)
+    pdfmetrics.registerFont(font)
+    return name
+
+
+def font_for(script, bold=False):
+    """Registered font name for a script, or None if its font is not bundled"""
+    if bold and SCRIPT_FONTS[script][1] is None:
+        # No bold face bundled; the regular one still beats Helvetica's boxes
+        bold = False
+    key = (script, bold)
+    if key in _fonts:
+        return _fonts[key]
+    with _fonts_lock:
+        if key not in _fonts:
+            _fonts[key] = _register(script, bold)
+    return _fonts[key]
+
+
+def load_fonts():
+    """Register every bundled font now instead of at its first use"""
+    for script in SCRIPT_FONTS:
+        font_for(script)
+        font_for(script, bold=True)
+
+
+def fonts_version():
+    """Identifies the bundled font files, for cache keys; read once per process
+    like the fonts themselves"""
+    if "version" not in _version:
+        files = sorted(name for pair in SCRIPT_FONTS.values() for name in pair if name)
+        present = [
+            f"{name}:{os.stat(os.path.join(FONT_DIR, name)).st_mtime_ns}"
+            for name in files
+            if os.path.exists(os.path.join(FONT_DIR, name))
+        ]
+        _version["version"] = ",".join(present)
+    return _version["version"]
+
+
+def _is_base(char):
+    if char.isascii():
+        return True
+    try:
+        char.encode("cp1252")
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def _word_runs(word, bold):
+    # Letters Helvetica could show stay with the rest of their word, so a
+    # name is never set in two typefaces
+    font = None
+    for char in word:
+        if not _is_base(char):
+            font = font_for(_script(char), bold)
+            break
+    runs = []
+    start = 0
+    for index, char in enumerate(word):
+        if _is_base(char):
+            continue
+        char_font = font_for(_script(char), bold)
+        if char_font != font:
+            runs.append((font, word[start:index]))
+            font = char_font
+            start = index
+    runs.append((font, word[start:]))
+    return runs
+
+
+def script_runs(text, bold=False):
+    """Split text into (font name or None, text) runs; None keeps the base font"""
+    runs = []
+    for word in _WORDS.split(text):
+        if not word:
+            continue
+        if word.isspace():
+            # Spaces go with the run before them
+            word_runs = [(runs[-1][0] if runs else None, word)]
+        elif not needs_unicode_fonts(word):
+            word_runs = [(None, word)]
+        else:
+            word_runs = _word_runs(word, bold)
+        for font, run in word_runs:
+            if runs and runs[-1][0] == font:
+                runs[-1] = (font, runs[-1][1] + run)
+            elif run:
+                runs.append((font, run))
+    return runs
+
+
+def has_unicode_fonts(text, bold=False):
+    """Whether a bundled font can show some of the characters Helvetica cannot"""
+    return any(font is not None for font, _ in script_runs(text, bold))
+
+
+def unicode_markup(text, bold=False):
+    """Paragraph markup for plain text, with a font tag around every run that needs one"""
+    parts = []
+    for font, run in script_runs(text, bold):
+        run = escape(run).replace("\n", "<br/>")
+        parts.append(run if font is None else f'<font face="{font}">{run}</font>')
+    return "".join(parts)
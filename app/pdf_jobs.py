@@ -0,0 +1,166 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from .pdf_cache import get_pdf_cache, pdf_cache_key
+from .render_pool import PDFFile, submit_pdf
+
+
+class PDFJobStore:
+    """Filesystem store for asynchronous PDF jobs.
+
+    Every job is a ``<id>.json`` status file plus a ``<id>.pdf`` once it is
+    rendered. Files are written to a temporary name and renamed into place,
+    so any gunicorn worker can answer a poll for a job another worker
+    submitted. Jobs older than ``ttl`` seconds are deleted.
+    """
+
+    def __init__(self, directory, ttl):
+        self.directory = directory
+        self.ttl = ttl
+        self._last_cleanup = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id, extension):
+        return os.path.join(self.directory, f"{job_id}.{extension}")
+
+    def _write(self, path, data):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _write_meta(self, job_id, meta):
+        self._write(self._path(job_id, "json"), json.dumps(meta).encode())
+
+    def create(self, kind, filename, deadline, etag=None):
+        job_id = uuid.uuid4().hex
+        self._write_meta(job_id, {
+            "status": "pending",
+            "kind": kind,
+            "filename": filename,
+            "created": time.time(),
+            "deadline": deadline,
+            "etag": etag,
+        })
+        return job_id
+
+    def complete(self, job_id, pdf):
+        """Attach the rendered PDF: bytes, or a PDFFile that is moved (spooled)
+        or copied (a cache entry) into the store"""
+        meta = self.get(job_id)
+        if meta is None:
+            if isinstance(pdf, PDFFile):
+                pdf.discard()
+            return
+        # The PDF goes in first so a "done" status always has a file behind it
+        path = self._path(job_id, "pdf")
+        if isinstance(pdf, PDFFile):
+            if pdf.temporary:
+                shutil.move(pdf.path, path)
+            else:
+                shutil.copyfile(pdf.path, path)
+            meta["size"] = pdf.size
+        else:
+            self._write(path, pdf)
+            meta["size"] = len(pdf)
+        meta["status"] = "done"
+        self._write_meta(job_id, meta)
+
+    def fail(self, job_id, error):
+        meta = self.get(job_id)
+        if meta is None:
+            return
+        meta["status"] = "failed"
+        meta["error"] = error
+        self._write_meta(job_id, meta)
+
+    def get(self, job_id):
+        """Status of a job, or None when it is unknown or expired"""
+        # Job ids are uuid4 hex; anything else must not reach the filesystem
+        if len(job_id) != 32 or not all(c in "0123456789abcdef" for c in job_id):
+            return None
+        try:
+            with open(self._path(job_id, "json"), "rb") as f:
+                meta = json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        if time.time() - meta["created"] > self.ttl:
+            return None
+        # The worker that owned the job may have died before it finished
+        if meta["status"] == "pending" and time.time() > meta["deadline"]:
+            meta["status"] = "failed"
+            meta["error"] = "PDF generation timed out"
+        return meta
+
+    def pdf_path(self, job_id):
+        return self._path(job_id, "pdf")
+
+    def cleanup(self, interval=60):
+        """Delete expired jobs; runs at most once per ``interval`` seconds"""
+        now = time.time()
+        if now - self._last_cleanup < interval:
+            return
+        self._last_cleanup = now
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if now - os.stat(path).st_mtime > self.ttl:
+                    os.remove(path)
+            except OSError:
+                # Another worker removed it first
+                pass
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_job_store(config):
+    directory = config["PDF_JOB_DIR"]
+    store = _stores.get(directory)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(directory)
+            if store is None:
+                store = PDFJobStore(directory, config["PDF_JOB_TTL"])
+                _stores[directory] = store
+    return store
+
+
+def start_pdf_job(config, kind, filename, **kwargs):
+    """Queue a render and return its job id without waiting for the PDF"""
+    store = get_job_store(config)
+    store.cleanup()
+    cache = get_pdf_cache(config)
+    etag = pdf_cache_key(kind, kwargs) if cache is not None else None
+
+    # A PDF rendered before needs no render slot at all
+    pdf = cache.get(etag) if cache is not None else None
+    if pdf is not None:
+        job_id = store.create(kind, filename, time.time(), etag)
+        store.complete(job_id, pdf)
+        return job_id
+
+    future, deadline = submit_pdf(config, kind, **kwargs)
+    job_id = store.create(kind, filename, deadline, etag)
+
+    def on_done(future):
+        if future.cancelled():
+            store.fail(job_id, "PDF generation was cancelled")
+        elif future.exception() is not None:
+            store.fail(job_id, f"Failed to generate PDF: {str(future.exception())}")
+        elif cache is not None:
+            store.complete(job_id, cache.put(etag, future.result()))
+        else:
+            store.complete(job_id, future.result())
+
+    future.add_done_callback(on_done)
+    return job_id
@@ -0,0 +1,508 @@
+"""Declarative report layouts.
+
+A report is a spec: page settings plus a list of elements (strips, tables,
+paragraphs, repeated blocks) whose text may name fields of a context dict,
+e.g. ``strip("Total: {total:,}", "TotalCost")``. ``compile_report`` turns a
+spec into flowable factories once, resolving styles and splitting the text
+templates up front, so a request only binds its context and lays it out.
+"""
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import (
+    BaseDocTemplate,
+    Frame,
+    KeepTogether,
+    PageTemplate,
+    Paragraph,
+    SimpleDocTemplate,
+    Spacer,
+    Table,
+)
+from string import Formatter
+from xml.sax.saxutils import escape
+import io
+
+from .assets import logo_image
+from .pdf_fonts import has_unicode_fonts, needs_unicode_fonts, unicode_markup
+from .pdf_styles import PARAGRAPH_STYLES, TABLE_STYLES
+from .pdf_template import per_user
+
+
+FULL_WIDTH = 7 * inch
+
+
+# Spec elements
+
+def spacer(height):
+    return {"type": "spacer", "height": height}
+
+
+def gap(height):
+    """Vertical space that is dropped at a page break instead of opening the next page"""
+    return {"type": "gap", "height": height}
+
+
+def paragraph(text, style, per_user=False):
+    return {"type": "paragraph", "text": text, "style": style, "per_user": per_user}
+
+
+def strip(text, style, per_user=False):
+    """Full-width single-cell table, used for titles, totals and footers"""
+    return table([[text]], style, [FULL_WIDTH], per_user)
+
+
+def table(rows, style, col_widths, per_user=False):
+    """Table of text templates; an ``each_row`` entry expands to one row per item"""
+    return {"type": "table", "rows": rows, "style": style, "col_widths": col_widths, "per_user": per_user}
+
+
+def each_row(field, row):
+    return {"type": "each_row", "field": field, "row": row}
+
+
+def report_header():
+    """Logo on the left, office addresses on the right"""
+    return {"type": "report_header"}
+
+
+def logo_table(variant, placeholder_style, rows, style):
+    """Single-column table with the logo in the first row"""
+    return {"type": "logo_table", "variant": variant, "placeholder_style": placeholder_style,
+            "rows": rows, "style": style}
+
+
+def each(field, elements, name="item"):
+    """Repeat ``elements`` for every item of a list field, binding ``name`` and ``index``"""
+    return {"type": "each", "field": field, "elements": elements, "name": name}
+
+
+def section(elements, per_user=False):
+    """Group elements; ``per_user`` marks all of them for the overlay layer"""
+    return {"type": "section", "elements": elements, "per_user": per_user}
+
+
+def keep_together(elements, per_user=False):
+    """Group elements that move to the next page as a whole rather than split"""
+    return {"type": "keep_together", "elements": elements, "per_user": per_user}
+
+
+def continuation(header, footer, header_height, footer_height):
+    """Running header and footer for every page after the first.
+
+    Their text may use ``{page}`` besides the report's fields. The first page
+    is laid out exactly as without a continuation.
+    """
+    return {"header": header, "footer": footer, "header_height": header_height,
+            "footer_height": footer_height}
+
+
+def report(elements, top_margin, bottom_margin, footer=None, footer_height=0, continuation=None, subject=None):
+    """A whole report; ``footer`` elements are drawn in a fixed frame at the
+    bottom of every page instead of flowing with the story. ``subject`` is a
+    text template for the PDF's Subject entry, which is never printed"""
+    return {"elements": elements, "top_margin": top_margin, "bottom_margin": bottom_margin,
+            "footer": footer, "footer_height": footer_height, "continuation": continuation,
+            "subject": subject}
+
+
+class _Gap(Spacer):
+    def split(self, availWidth, availHeight):
+        # Too little room left on this page: end it here, without the space
+        return [Spacer(self.width, 0)]
+
+
+# Compilation
+
+def _lookup(ctx, field):
+    value = ctx
+    for part in field.split("."):
+        value = value[part]
+    return value
+
+
+def _compile_text(template):
+    if all(name is None for _, name, _, _ in Formatter().parse(template)):
+        return lambda ctx: template
+    return lambda ctx: template.format_map(ctx)
+
+
+class _FontRunFormatter(Formatter):
+    """Formats paragraph templates with every value escaped, and values
+    Helvetica cannot show set in Unicode fonts"""
+
+    def __init__(self, bold):
+        self.bold = bold
+
+    def format_field(self, value, format_spec):
+        text = format(value, format_spec)
+        return unicode_markup(text, self.bold) if needs_unicode_fonts(text) else escape(text)
+
+
+def _compile_markup(template, bold):
+    parts = list(Formatter().parse(template))
+    if all(name is None for _, name, _, _ in parts):
+        return lambda ctx: template
+    formatter = _FontRunFormatter(bold)
+
+    def render(ctx):
+        # The template itself is markup, so only the values are escaped and
+        # get font runs; a name such as "A<B" or "R&D" is text, not a tag or
+        # an entity. The template was split once above, not on every render.
+        result = []
+        for literal, name, format_spec, conversion in parts:
+            result.append(literal)
+            if name is not None:
+                value = formatter.convert_field(formatter.get_field(name, (), ctx)[0], conversion)
+                result.append(formatter.format_field(value, format_spec))
+        return "".join(result)
+
+    return render
+
+
+_CELL_ALIGNMENTS = {"LEFT": TA_LEFT, "CENTER": TA_CENTER, "CENTRE": TA_CENTER, "RIGHT": TA_RIGHT}
+
+
+def _cell_paragraph(text, cell_style):
+    """A table cell's text as a paragraph in the cell's style, with font runs"""
+    style = ParagraphStyle(
+        "UnicodeCell",
+        fontName=cell_style.fontname,
+        fontSize=cell_style.fontsize,
+        leading=cell_style.leading,
+        textColor=cell_style.color,
+        alignment=_CELL_ALIGNMENTS.get(cell_style.alignment, TA_LEFT),
+    )
+    return Paragraph(unicode_markup(text, "Bold" in cell_style.fontname), style)
+
+
+def _styled_table(rows, style, col_widths):
+    data_table = Table(rows, colWidths=col_widths)
+    data_table.setStyle(style)
+    if not any(isinstance(cell, str) and needs_unicode_fonts(cell) for row in rows for cell in row):
+        return data_table
+
+    # A plain cell has a single font, so cells with other scripts become
+    # paragraphs that can switch fonts mid-line. Without a bundled font for
+    # them a paragraph would show the same boxes, so the cell stays plain.
+    cell_styles = data_table._cellStyles
+    converted = False
+    paragraph_rows = []
+    for r, row in enumerate(rows):
+        cells = []
+        for c, cell in enumerate(row):
+            if isinstance(cell, str) and needs_unicode_fonts(cell):
+                bold = "Bold" in cell_styles[r][c].fontname
+                if has_unicode_fonts(cell, bold):
+                    cell = _cell_paragraph(cell, cell_styles[r][c])
+                    converted = True
+            cells.append(cell)
+        paragraph_rows.append(cells)
+    if not converted:
+        return data_table
+    data_table = Table(paragraph_rows, colWidths=col_widths)
+    data_table.setStyle(style)
+    return data_table
+
+
+def _compile_rows(rows):
+    compiled = []
+    for row in rows:
+        if isinstance(row, dict):
+            cells = [_compile_text(cell) for cell in row["row"]]
+            compiled.append((row["field"], cells))
+        else:
+            compiled.append((None, [_compile_text(cell) for cell in row]))
+
+    def make_rows(ctx):
+        data = []
+        for field, cells in compiled:
+            if field is None:
+                data.append([cell(ctx) for cell in cells])
+                continue
+            for item in _lookup(ctx, field):
+                item_ctx = {**ctx, **item}
+                data.append([cell(item_ctx) for cell in cells])
+        return data
+
+    return make_rows
+
+
+def _marked(make):
+    def make_per_user(ctx):
+        return [per_user(flowable) for flowable in make(ctx)]
+    return make_per_user
+
+
+def _logo(variant, placeholder):
+    try:
+        logo = logo_image(variant)
+        if logo is None:
+            logo = Paragraph("GMI LOGO", placeholder)
+    except:
+        logo = Paragraph("GMI LOGO", placeholder)
+    return logo
+
+
+def _compile_report_header(element):
+    placeholder = PARAGRAPH_STYLES["LogoPlaceholder"]
+    office_style = PARAGRAPH_STYLES["OfficeStyle"]
+    address_style = PARAGRAPH_STYLES["AddressStyle"]
+    style = TABLE_STYLES["ReportHeader"]
+
+    def make(ctx):
+        addresses = [
+            Paragraph("Corporate Office - India", office_style),
+            Paragraph("23, CJ VenkataDas road", address_style),
+            Paragraph(" Padmanabhanagar, Bangalore", address_style),
+            Spacer(1, 3),
+            Paragraph("Overseas Office - Germany", office_style),
+            Paragraph("Koenigsheideweg Berlin, Germany", address_style),
+        ]
+        header_table = Table([[_logo("header", placeholder), addresses]], colWidths=[3 * inch, 4 * inch])
+        header_table.setStyle(style)
+        return [header_table]
+
+    return make
+
+
+def _compile_logo_table(element):
+    placeholder = PARAGRAPH_STYLES[element["placeholder_style"]]
+    make_rows = _compile_rows(element["rows"])
+    style = TABLE_STYLES[element["style"]]
+
+    def make(ctx):
+        rows = [[_logo(element["variant"], placeholder)]] + make_rows(ctx)
+        return [_styled_table(rows, style, [FULL_WIDTH])]
+
+    return make
+
+
+def _compile_spacer(element):
+    height = element["height"]
+    return lambda ctx: [Spacer(1, height)]
+
+
+def _compile_gap(element):
+    height = element["height"]
+    return lambda ctx: [_Gap(1, height)]
+
+
+def _compile_paragraph(element):
+    style = PARAGRAPH_STYLES[element["style"]]
+    text = _compile_markup(element["text"], "Bold" in style.fontName)
+    return lambda ctx: [Paragraph(text(ctx), style)]
+
+
+def _compile_table(element):
+    make_rows = _compile_rows(element["rows"])
+    style = TABLE_STYLES[element["style"]]
+    col_widths = element["col_widths"]
+
+    def make(ctx):
+        return [_styled_table(make_rows(ctx), style, col_widths)]
+
+    return make
+
+
+def _compile_each(element):
+    field = element["field"]
+    name = element["name"]
+    make_children = _compile_elements(element["elements"])
+
+    def make(ctx):
+        flowables = []
+        for index, item in enumerate(_lookup(ctx, field), 1):
+            flowables.extend(make_children({**ctx, name: item, "index": index}))
+        return flowables
+
+    return make
+
+
+def _compile_section(element):
+    return _compile_elements(element["elements"])
+
+
+def _compile_keep_together(element):
+    make_children = _compile_elements(element["elements"])
+    return lambda ctx: [KeepTogether(make_children(ctx))]
+
+
+COMPILERS = {
+    "spacer": _compile_spacer,
+    "gap": _compile_gap,
+    "paragraph": _compile_paragraph,
+    "table": _compile_table,
+    "report_header": _compile_report_header,
+    "logo_table": _compile_logo_table,
+    "each": _compile_each,
+    "section": _compile_section,
+    "keep_together": _compile_keep_together,
+}
+
+
+def _compile_elements(elements):
+    makers = []
+    for element in elements:
+        make = COMPILERS[element["type"]](element)
+        makers.append(_marked(make) if element.get("per_user") else make)
+
+    def make_all(ctx):
+        flowables = []
+        for make in makers:
+            flowables.extend(make(ctx))
+        return flowables
+
+    return make_all
+
+
+def _draw_fixed(canvas, flowables, x, y, width, height):
+    frame = Frame(
+        x,
+        y,
+        width,
+        height,
+        leftPadding=0,
+        bottomPadding=0,
+        rightPadding=0,
+        topPadding=0,
+        showBoundary=0,
+    )
+    frame.addFromList(flowables, canvas)
+
+
+class _ContinuedDocTemplate(BaseDocTemplate):
+    """SimpleDocTemplate's page handling: the first page uses the "First"
+    template, every later one the "Later" template"""
+
+    def handle_pageBegin(self):
+        self._handle_pageBegin()
+        self._handle_nextPageTemplate("Later")
+
+
+class CompiledReport:
+    """A report spec compiled into flowable factories; ``build`` renders one PDF"""
+
+    def __init__(self, spec):
+        self.top_margin = spec["top_margin"]
+        self.bottom_margin = spec["bottom_margin"]
+        self.footer_height = spec["footer_height"]
+        self.make_story = _compile_elements(spec["elements"])
+        self.make_footer = _compile_elements(spec["footer"]) if spec["footer"] else None
+        self.continuation = spec["continuation"]
+        self.make_subject = _compile_text(spec["subject"]) if spec.get("subject") else None
+        if self.continuation is not None:
+            self.make_running_header = _compile_elements(self.continuation["header"])
+            self.make_running_footer = _compile_elements(self.continuation["footer"])
+
+    def build(self, ctx, layer=None, output=None):
+        """Render the report for a bound context.
+
+        With a template ``layer`` only that layer's flowables are drawn (see
+        pdf_template); the fixed footer belongs to the background.
+        """
+        buffer = output if output is not None else io.BytesIO()
+        story = self.make_story(ctx)
+        if self.make_footer is not None:
+            doc = self._footer_doc(buffer, ctx, layer)
+            if self.make_subject is not None:
+                doc.subject = self.make_subject(ctx)
+            if layer is not None:
+                story = layer.apply(story, doc.width, doc.height - self.footer_height)
+            doc.build(story)
+        else:
+            if self.continuation is not None:
+                doc = self._continued_doc(buffer, ctx)
+            else:
+                doc = SimpleDocTemplate(
+                    buffer, pagesize=A4, topMargin=self.top_margin, bottomMargin=self.bottom_margin
+                )
+            if self.make_subject is not None:
+                doc.subject = self.make_subject(ctx)
+            if layer is not None:
+                # SimpleDocTemplate's frame has 6pt padding on each side
+                story = layer.apply(story, doc.width - 12, doc.height - 12)
+            doc.build(story)
+        buffer.seek(0)
+        return buffer
+
+    def _continued_doc(self, buffer, ctx):
+        doc = _ContinuedDocTemplate(
+            buffer, pagesize=A4, topMargin=self.top_margin, bottomMargin=self.bottom_margin
+        )
+        header_height = self.continuation["header_height"]
+        footer_height = self.continuation["footer_height"]
+
+        # Later pages only ever come from the overlay layer or a full render,
+        # so the running header and footer may show per-user fields
+        def draw_running(canvas, doc_):
+            page_ctx = {**ctx, "page": doc_.page}
+            canvas.saveState()
+            _draw_fixed(
+                canvas,
+                self.make_running_header(page_ctx),
+                doc_.leftMargin,
+                doc_.bottomMargin + doc_.height - header_height,
+                doc_.width,
+                header_height,
+            )
+            _draw_fixed(
+                canvas,
+                self.make_running_footer(page_ctx),
+                doc_.leftMargin,
+                doc_.bottomMargin,
+                doc_.width,
+                footer_height,
+            )
+            canvas.restoreState()
+
+        first_frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id="normal")
+        later_frame = Frame(
+            doc.leftMargin,
+            doc.bottomMargin + footer_height,
+            doc.width,
+            doc.height - header_height - footer_height,
+            id="continued",
+        )
+        doc.addPageTemplates([
+            PageTemplate(id="First", frames=[first_frame], pagesize=A4),
+            PageTemplate(id="Later", frames=[later_frame], onPage=draw_running, pagesize=A4),
+        ])
+        return doc
+
+    def _footer_doc(self, buffer, ctx, layer):
+        doc = BaseDocTemplate(
+            buffer, pagesize=A4, topMargin=self.top_margin, bottomMargin=self.bottom_margin
+        )
+        footer = self.make_footer(ctx)
+        footer_height = self.footer_height
+
+        def draw_footer(canvas, doc_):
+            canvas.saveState()
+            _draw_fixed(canvas, list(footer), doc_.leftMargin, doc_.bottomMargin, doc_.width, footer_height)
+            canvas.restoreState()
+
+        # Main frame for the story, above the space kept for the footer
+        main_frame = Frame(
+            doc.leftMargin,
+            doc.bottomMargin + footer_height,
+            doc.width,
+            doc.height - footer_height,
+            leftPadding=0,
+            bottomPadding=0,
+            rightPadding=0,
+            topPadding=0,
+            showBoundary=0,
+        )
+        # The footer is invariant, so the overlay layer of a template render skips it
+        if layer is None or layer.background:
+            page_template = PageTemplate(id="FirstPage", frames=[main_frame], onPage=draw_footer)
+        else:
+            page_template = PageTemplate(id="FirstPage", frames=[main_frame])
+        doc.addPageTemplates([page_template])
+        return doc
+
+
+def compile_report(spec):
+    return CompiledReport(spec)
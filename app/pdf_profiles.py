@@ -0,0 +1,40 @@
+from reportlab import rl_config
+
+
+# "standard" keeps the logo's alpha channel at print quality and reportlab's
+# ASCII85 streams. "compact" is sized for mobile data: the logo is flattened
+# onto the colour it is printed over and embedded as a JPEG at phone-screen
+# resolution, and streams are written as binary.
+#
+# "template" stamps the per-user overlay onto a cached background. That only
+# pays off when the background is expensive (the PNG logo with its soft
+# mask): about 8 ms instead of 34 ms per report. A compact background is
+# as quick to draw as to stamp over, so stamping makes compact PDFs slower
+# (grade certificate 6.2 ms vs 4.7 ms) and about 0.5 KB bigger.
+PDF_PROFILES = {
+    "standard": {"logo_dpi": 200, "logo_format": "PNG", "ascii85": True, "template": True},
+    "compact": {"logo_dpi": 150, "logo_format": "JPEG", "ascii85": False, "template": False},
+}
+
+_profile = {"name": "standard"}
+
+
+def set_pdf_profile(name):
+    """Select the output profile for every render in this process.
+
+    A process-wide setting because reportlab only reads ``useA85`` from its
+    global config; pool workers and the web process each call this once.
+    """
+    if name not in PDF_PROFILES:
+        raise ValueError(f"Unknown PDF profile {name!r}; expected one of {', '.join(PDF_PROFILES)}")
+    _profile["name"] = name
+    rl_config.useA85 = int(PDF_PROFILES[name]["ascii85"])
+
+
+def pdf_profile():
+    """Name of the active output profile"""
+    return _profile["name"]
+
+
+def pdf_profile_settings():
+    return PDF_PROFILES[_profile["name"]]
@@ -0,0 +1,331 @@
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import TableStyle
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+from types import MappingProxyType
+
+
+# Shared, import-time style registry for all PDF templates. The mappings are
+# read-only and the styles are never modified after this module is imported,
+# so every render can hand the same objects to reportlab.
+
+# Colors matching original design
+HERO_BLUE = colors.HexColor("#e0f2fe")  # Hero gradient color
+BRAND_BLUE = colors.HexColor("#223877")  # Primary blue
+DARK_GRAY = colors.HexColor("#2f4f4f")
+LIGHT_GRAY = colors.HexColor("#808080")
+MUTED_GRAY = colors.HexColor("#6b7280")
+BORDER_GRAY = colors.HexColor("#e5e7eb")
+CARD_BACKGROUND = colors.HexColor("#f8fafc")
+FOOTER_BACKGROUND = colors.HexColor("#f9fafb")
+SCALE_YELLOW = colors.HexColor("#fef3c7")
+
+_sample = getSampleStyleSheet()
+
+
+PARAGRAPH_STYLES = MappingProxyType(
+    {
+        style.name: style
+        for style in [
+            ParagraphStyle("LogoPlaceholder", fontSize=12, textColor=HERO_BLUE),
+            ParagraphStyle("CertificateLogoPlaceholder", fontSize=12, textColor=colors.white),
+            ParagraphStyle(
+                "OfficeStyle",
+                fontSize=9,
+                textColor=BRAND_BLUE,
+                fontName="Helvetica-Bold",
+                alignment=TA_RIGHT,
+            ),
+            ParagraphStyle(
+                "AddressStyle",
+                fontSize=8,
+                textColor=BRAND_BLUE,
+                fontName="Helvetica",
+                alignment=TA_RIGHT,
+            ),
+            ParagraphStyle(
+                "SectionTitle",
+                parent=_sample["Heading2"],
+                fontSize=16,
+                textColor=DARK_GRAY,
+                spaceAfter=10,
+            ),
+            # Custom package details
+            ParagraphStyle(
+                "PackageHeader",
+                fontSize=12,
+                textColor=DARK_GRAY,
+                fontName="Helvetica-Bold",
+                leftIndent=10,
+                rightIndent=10,
+                spaceAfter=8,
+                backColor=BORDER_GRAY,
+                borderPadding=8,
+            ),
+            ParagraphStyle(
+                "PackageDesc",
+                fontSize=10,
+                textColor=LIGHT_GRAY,
+                fontName="Helvetica-Oblique",
+                leftIndent=10,
+                rightIndent=10,
+                spaceAfter=6,
+            ),
+            ParagraphStyle(
+                "FeaturesHeader",
+                fontSize=10,
+                textColor=DARK_GRAY,
+                fontName="Helvetica-Bold",
+                leftIndent=10,
+                spaceAfter=4,
+            ),
+            ParagraphStyle(
+                "FeatureItem",
+                fontSize=9,
+                textColor=LIGHT_GRAY,
+                fontName="Helvetica",
+                leftIndent=20,
+                rightIndent=10,
+                spaceAfter=3,
+            ),
+            # Grade certificate
+            ParagraphStyle(
+                "GradeResult",
+                fontSize=24,
+                fontName="Helvetica-Bold",
+                textColor=BRAND_BLUE,
+                alignment=TA_CENTER,
+                spaceAfter=30,
+            ),
+            ParagraphStyle(
+                "Subtitle",
+                fontSize=12,
+                textColor=MUTED_GRAY,
+                alignment=TA_CENTER,
+                spaceAfter=30,
+            ),
+            ParagraphStyle(
+                "DetailsTitle",
+                fontSize=16,
+                fontName="Helvetica-Bold",
+                alignment=TA_CENTER,
+                spaceAfter=15,
+            ),
+            ParagraphStyle(
+                "CertificateHeading",
+                fontSize=14,
+                fontName="Helvetica-Bold",
+                alignment=TA_CENTER,
+                spaceAfter=10,
+            ),
+            ParagraphStyle(
+                "AboutText",
+                fontSize=10,
+                textColor=MUTED_GRAY,
+                alignment=TA_CENTER,
+                spaceAfter=30,
+            ),
+            ParagraphStyle(
+                "ContactFooter",
+                fontSize=10,
+                fontName="Helvetica-Bold",
+                textColor=BRAND_BLUE,
+                alignment=TA_CENTER,
+            ),
+        ]
+    }
+)
+
+
+TABLE_STYLES = MappingProxyType(
+    {
+        # Logo left, addresses right
+        "ReportHeader": TableStyle(
+            [
+                ("VALIGN", (0, 0), (-1, -1), "TOP"),
+                ("ALIGN", (0, 0), (0, 0), "LEFT"),
+                ("ALIGN", (1, 0), (1, 0), "RIGHT"),
+            ]
+        ),
+        "TitleStrip": TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, -1), HERO_BLUE),
+                ("TEXTCOLOR", (0, 0), (-1, -1), BRAND_BLUE),
+                ("FONTNAME", (0, 0), (-1, -1), "Helvetica-Bold"),
+                ("FONTSIZE", (0, 0), (-1, -1), 24),
+                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+                ("TOPPADDING", (0, 0), (-1, -1), 15),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 15),
+            ]
+        ),
+        "SubtitleStrip": TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, -1), HERO_BLUE),
+                ("TEXTCOLOR", (0, 0), (-1, -1), BRAND_BLUE),
+                ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
+                ("FONTSIZE", (0, 0), (-1, -1), 14),
+                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+                ("TOPPADDING", (0, 0), (-1, -1), 5),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 15),
+            ]
+        ),
+        "UserDetails": TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, -1), CARD_BACKGROUND),
+                ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
+                ("FONTSIZE", (0, 0), (-1, -1), 10),
+                ("TEXTCOLOR", (0, 0), (-1, -1), DARK_GRAY),
+                ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+                ("TOPPADDING", (0, 0), (-1, -1), 5),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 10),
+                ("LEFTPADDING", (0, 0), (-1, -1), 10),
+                ("GRID", (0, 0), (-1, -1), 1, BORDER_GRAY),
+            ]
+        ),
+        "TotalCost": TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, -1), HERO_BLUE),
+                ("TEXTCOLOR", (0, 0), (-1, -1), BRAND_BLUE),
+                ("FONTNAME", (0, 0), (-1, -1), "Helvetica-Bold"),
+                ("FONTSIZE", (0, 0), (-1, -1), 18),
+                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+                ("TOPPADDING", (0, 0), (-1, -1), 15),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 15),
+            ]
+        ),
+        "ExpenseBreakdown": TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, 0), HERO_BLUE),
+                ("TEXTCOLOR", (0, 0), (-1, 0), BRAND_BLUE),
+                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+                ("FONTSIZE", (0, 0), (-1, 0), 12),
+                ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
+                ("FONTSIZE", (0, 1), (-1, -1), 11),
+                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+                ("GRID", (0, 0), (-1, -1), 1, colors.black),
+                ("TOPPADDING", (0, 0), (-1, -1), 8),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
+            ]
+        ),
+        # The cost report footer sits in its own frame and is roomier than
+        # the custom package footer, which flows after the package list
+        "CostDisclaimer": TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, -1), FOOTER_BACKGROUND),
+                ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
+                ("FONTSIZE", (0, 0), (-1, -1), 8),
+                ("TEXTCOLOR", (0, 0), (-1, -1), LIGHT_GRAY),
+                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+                ("TOPPADDING", (0, 0), (-1, -1), 15),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 15),
+                ("GRID", (0, 0), (-1, -1), 1, BORDER_GRAY),
+            ]
+        ),
+        "CostContact": TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, -1), FOOTER_BACKGROUND),
+                ("FONTNAME", (0, 0), (-1, -1), "Helvetica-Bold"),
+                ("FONTSIZE", (0, 0), (-1, -1), 9),
+                ("TEXTCOLOR", (0, 0), (-1, -1), BRAND_BLUE),
+                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+                ("TOPPADDING", (0, 0), (-1, -1), 10),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 10),
+                ("GRID", (0, 0), (-1, -1), 1, BORDER_GRAY),
+            ]
+        ),
+        "PackageDisclaimer": TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, -1), FOOTER_BACKGROUND),
+                ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
+                ("FONTSIZE", (0, 0), (-1, -1), 8),
+                ("TEXTCOLOR", (0, 0), (-1, -1), LIGHT_GRAY),
+                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+                ("TOPPADDING", (0, 0), (-1, -1), 12),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 12),
+                ("GRID", (0, 0), (-1, -1), 1, BORDER_GRAY),
+            ]
+        ),
+        "PackageContact": TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, -1), FOOTER_BACKGROUND),
+                ("FONTNAME", (0, 0), (-1, -1), "Helvetica-Bold"),
+                ("FONTSIZE", (0, 0), (-1, -1), 9),
+                ("TEXTCOLOR", (0, 0), (-1, -1), BRAND_BLUE),
+                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+                ("TOPPADDING", (0, 0), (-1, -1), 8),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
+                ("GRID", (0, 0), (-1, -1), 1, BORDER_GRAY),
+            ]
+        ),
+        # Running header and footer on continuation pages of long reports
+        "ContinuationHeader": TableStyle(
+            [
+                ("FONTNAME", (0, 0), (-1, -1), "Helvetica-Bold"),
+                ("FONTSIZE", (0, 0), (-1, -1), 9),
+                ("TEXTCOLOR", (0, 0), (-1, -1), BRAND_BLUE),
+                ("ALIGN", (0, 0), (0, 0), "LEFT"),
+                ("ALIGN", (1, 0), (1, 0), "RIGHT"),
+                ("LEFTPADDING", (0, 0), (-1, -1), 0),
+                ("RIGHTPADDING", (0, 0), (-1, -1), 0),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+                ("LINEBELOW", (0, 0), (-1, 0), 1, BRAND_BLUE),
+            ]
+        ),
+        "ContinuationFooter": TableStyle(
+            [
+                ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
+                ("FONTSIZE", (0, 0), (-1, -1), 8),
+                ("TEXTCOLOR", (0, 0), (-1, -1), LIGHT_GRAY),
+                ("ALIGN", (0, 0), (0, 0), "LEFT"),
+                ("ALIGN", (1, 0), (1, 0), "RIGHT"),
+                ("LEFTPADDING", (0, 0), (-1, -1), 0),
+                ("RIGHTPADDING", (0, 0), (-1, -1), 0),
+                ("TOPPADDING", (0, 0), (-1, -1), 6),
+                ("LINEABOVE", (0, 0), (-1, 0), 1, BORDER_GRAY),
+            ]
+        ),
+        # Header with gradient background (matching Hero.tsx)
+        "CertificateHeader": TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, -1), HERO_BLUE),
+                ("TEXTCOLOR", (0, 0), (-1, -1), BRAND_BLUE),
+                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+                ("FONTNAME", (0, 1), (0, 1), "Helvetica-Bold"),
+                ("FONTSIZE", (0, 1), (0, 1), 20),
+                ("FONTNAME", (0, 2), (0, 2), "Helvetica"),
+                ("FONTSIZE", (0, 2), (0, 2), 12),
+                ("TOPPADDING", (0, 0), (-1, -1), 15),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 15),
+            ]
+        ),
+        "GradeDetails": TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (1, 0), colors.white),
+                ("BACKGROUND", (0, 1), (0, 1), colors.white),
+                ("BACKGROUND", (1, 1), (1, 1), HERO_BLUE),  # Light blue for German grade
+                ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
+                ("FONTSIZE", (0, 0), (-1, -1), 10),
+                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+                ("TOPPADDING", (0, 0), (-1, -1), 15),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 15),
+                ("GRID", (0, 0), (-1, -1), 1, BORDER_GRAY),
+            ]
+        ),
+        "GradeScale": TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, -1), SCALE_YELLOW),  # Light yellow
+                ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
+                ("FONTSIZE", (0, 0), (-1, -1), 10),
+                ("ALIGN", (0, 0), (0, -1), "LEFT"),
+                ("ALIGN", (1, 0), (1, -1), "LEFT"),
+                ("TOPPADDING", (0, 0), (-1, -1), 8),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
+                ("LEFTPADDING", (0, 0), (-1, -1), 10),
+                ("GRID", (0, 0), (-1, -1), 1, BORDER_GRAY),
+            ]
+        ),
+    }
+)
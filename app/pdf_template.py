@@ -0,0 +1,182 @@
+from reportlab.platypus import Flowable
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    NameObject,
+)
+import io
+import threading
+
+
+# Rendered backgrounds, keyed by template name: (version, pdf_bytes, reference sizes)
+_backgrounds = {}
+_backgrounds_lock = threading.Lock()
+
+OVERLAY_NAME = "/GMIOverlay"
+
+
+class LayoutMismatch(Exception):
+    """Raised when per-user content would not line up with the cached background."""
+
+
+def per_user(flowable):
+    """Mark a flowable as per-user content that belongs on the overlay layer"""
+    flowable._per_user = True
+    return flowable
+
+
+def is_per_user(flowable):
+    return getattr(flowable, "_per_user", False)
+
+
+class _Phantom(Flowable):
+    """Takes up exactly the space of the wrapped flowable but draws nothing"""
+
+    def __init__(self, flowable):
+        Flowable.__init__(self)
+        self._flowable = flowable
+
+    # The frame sets self.canv; containers such as KeepTogether need it too
+    def wrap(self, availWidth, availHeight):
+        self.width, self.height = self._flowable.wrapOn(self.canv, availWidth, availHeight)
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        return [_Phantom(part) for part in self._flowable.splitOn(self.canv, availWidth, availHeight)]
+
+    def getSpaceBefore(self):
+        return self._flowable.getSpaceBefore()
+
+    def getSpaceAfter(self):
+        return self._flowable.getSpaceAfter()
+
+    def draw(self):
+        pass
+
+
+class Layer:
+    """One pass of a template render: the invariant background or the per-user overlay"""
+
+    def __init__(self, background, expected=None):
+        self.background = background
+        self.expected = expected
+        self.sizes = []
+
+    def apply(self, story, avail_width, avail_height):
+        # Only per-user flowables placed before the last invariant one decide
+        # where the background content ends up, so only those must match.
+        last_static = max(
+            (i for i, f in enumerate(story) if not is_per_user(f)), default=-1
+        )
+        layered = []
+        for i, flowable in enumerate(story):
+            if is_per_user(flowable) and i < last_static:
+                width, height = flowable.wrap(avail_width, avail_height)
+                self.sizes.append(
+                    (width, height, flowable.getSpaceBefore(), flowable.getSpaceAfter())
+                )
+            if is_per_user(flowable) == self.background:
+                layered.append(_Phantom(flowable))
+            else:
+                layered.append(flowable)
+
+        if self.expected is not None and self.sizes != self.expected:
+            raise LayoutMismatch("per-user content does not fit the cached background")
+        return layered
+
+
+def prepare_background(name, build, version=None):
+    """Render (once per process) the invariant background of a template.
+
+    ``version`` identifies the assets drawn into the background (the logo
+    file's mtime); the background is re-rendered whenever it changes.
+    """
+    cached = _backgrounds.get(name)
+    if cached is None or cached[0] != version:
+        with _backgrounds_lock:
+            cached = _backgrounds.get(name)
+            if cached is None or cached[0] != version:
+                layer = Layer(background=True)
+                pdf_bytes = build(layer).getvalue()
+                cached = (version, pdf_bytes, layer.sizes)
+                _backgrounds[name] = cached
+    return cached[1], cached[2]
+
+
+def _stamp(background_pdf, overlay_pdf, output=None):
+    """Draw the first overlay page over the background page as a form XObject.
+
+    Wrapping the overlay in its own form keeps its fonts and images in a
+    separate resource dictionary, so nothing has to be parsed or renamed.
+    Further overlay pages (long custom packages) are appended as they are.
+    """
+    background = PdfReader(io.BytesIO(background_pdf))
+    overlay = PdfReader(io.BytesIO(overlay_pdf))
+    writer = PdfWriter()
+
+    page = writer.add_page(background.pages[0])
+    overlay_page = overlay.pages[0]
+
+    # PyPDF2 writes decoded streams as they are, so recompress the overlay.
+    # flate_encode() returns a new stream without the entries set so far,
+    # hence encoding first
+    content = DecodedStreamObject()
+    content.set_data(overlay_page.get_contents().get_data())
+    form = content.flate_encode()
+    form[NameObject("/Type")] = NameObject("/XObject")
+    form[NameObject("/Subtype")] = NameObject("/Form")
+    form[NameObject("/BBox")] = overlay_page.mediabox
+    form[NameObject("/Resources")] = overlay_page["/Resources"].clone(writer)
+    form_ref = writer._add_object(form)
+
+    resources = page["/Resources"]
+    if "/XObject" not in resources:
+        resources[NameObject("/XObject")] = DictionaryObject()
+    resources["/XObject"][NameObject(OVERLAY_NAME)] = form_ref
+
+    # Isolate the background graphics state, then paint the overlay on top
+    push = DecodedStreamObject()
+    push.set_data(b"q\n")
+    pop_and_draw = DecodedStreamObject()
+    pop_and_draw.set_data(f"Q\nq {OVERLAY_NAME} Do Q\n".encode())
+    contents = page["/Contents"].get_object()
+    if isinstance(contents, ArrayObject):
+        streams = list(contents)
+    else:
+        streams = [page.raw_get("/Contents")]
+    page[NameObject("/Contents")] = ArrayObject(
+        [writer._add_object(push)] + streams + [writer._add_object(pop_and_draw)]
+    )
+
+    for extra_page in overlay.pages[1:]:
+        writer.add_page(extra_page)
+
+    # The report's Subject is per-user, so it comes from the overlay
+    subject = (overlay.metadata or {}).get("/Subject")
+    if subject:
+        writer.add_metadata({"/Subject": subject})
+
+    buffer = output if output is not None else io.BytesIO()
+    writer.write(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def render_with_template(name, build, placeholder_build, version=None, output=None):
+    """Render a report by stamping per-user content over a cached background.
+
+    ``placeholder_build(layer)`` renders the template with placeholder data and
+    is only called once per process to produce the background.
+    ``build(layer, output)`` renders the real report; with ``layer=None`` it
+    draws everything, which is the fallback when the user's content would not
+    line up with the background (e.g. a value long enough to wrap).
+    The finished PDF is written to ``output`` (a new BytesIO by default).
+    """
+    background_pdf, sizes = prepare_background(name, placeholder_build, version)
+    try:
+        overlay_pdf = build(Layer(background=False, expected=sizes)).getvalue()
+    except LayoutMismatch:
+        return build(None, output)
+    return _stamp(background_pdf, overlay_pdf, output)
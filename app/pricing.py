@@ -0,0 +1,307 @@
+"""The bucket price catalog shared by the cost endpoints and the PDF reports.
+
+Each bucket gets a bit, so a selection is an integer mask. The buckets are
+split into groups of eight and the total of every selection within a group
+is computed once when the catalog is built (256 totals per group), so a
+total is one tuple index per eight buckets however large the catalog
+grows, and every endpoint and report gets the same number for the same
+selection.
+
+The catalog is read from a data file (JSON, or an Excel sheet laid out like
+services.xlsx) and reloaded when the file's mtime changes or the process gets
+SIGHUP. A reload builds a new immutable catalog and swaps one reference, so
+readers never take a lock; a file that fails to load leaves the previous
+catalog in place. Every catalog carries a version (a hash of the file) that
+quotes and PDFs record.
+"""
+from bisect import bisect_left, bisect_right, insort
+import hashlib
+import io
+import itertools
+import json
+import os
+import signal
+import threading
+from types import MappingProxyType
+
+import pandas as pd
+
+
+CATALOG_PATH = os.path.join(os.path.dirname(__file__), "bucket_data.json")
+
+# Column names of the Excel layout
+EXCEL_COLUMNS = {"bucket": "Buckets", "cost": "Prices", "name": "Bucket details"}
+
+# Buckets per precomputed group of totals
+GROUP_BITS = 8
+
+# Weights count to two decimal places; finer ones only make near-ties that
+# the search cannot prune
+WEIGHT_UNIT = 100
+
+# Branches optimize() explores before it gives up (about 0.2 s)
+MAX_SEARCH_NODES = 100000
+
+
+class SearchTooLarge(ValueError):
+    """An optimize() call that would explore more than its node limit"""
+
+
+def _score_unit(weights):
+    """The smallest power of ten (up to WEIGHT_UNIT) that makes every weight whole"""
+    unit = 1
+    for weight in weights:
+        while unit < WEIGHT_UNIT and abs(weight * unit - round(weight * unit)) > 1e-9 * unit:
+            unit *= 10
+    return unit
+
+
+class PricingCatalog:
+    """Immutable bucket prices with the totals of every selection within
+    each group of GROUP_BITS buckets"""
+
+    def __init__(self, buckets, version=None):
+        self._buckets = MappingProxyType({
+            bucket: MappingProxyType({"cost": int(entry["cost"]), "name": entry["name"]})
+            for bucket, entry in buckets.items()
+        })
+        self._bits = MappingProxyType({bucket: 1 << index for index, bucket in enumerate(self._buckets)})
+        costs = [entry["cost"] for entry in self._buckets.values()]
+
+        # Each total is a smaller total plus the cost of its lowest bucket
+        groups = []
+        for start in range(0, len(costs), GROUP_BITS):
+            group_costs = costs[start:start + GROUP_BITS]
+            totals = [0] * (1 << len(group_costs))
+            for mask in range(1, len(totals)):
+                lowest = mask & -mask
+                totals[mask] = totals[mask ^ lowest] + group_costs[lowest.bit_length() - 1]
+            groups.append(tuple(totals))
+        self._group_totals = tuple(groups)
+        self._group_mask = (1 << GROUP_BITS) - 1
+        self._version = version
+
+    @classmethod
+    def from_file(cls, path=CATALOG_PATH):
+        with open(path, "rb") as f:
+            data = f.read()
+        if path.lower().endswith((".xlsx", ".xls")):
+            sheet = pd.read_excel(io.BytesIO(data))
+            buckets = {
+                str(row[EXCEL_COLUMNS["bucket"]]).strip(): {
+                    "cost": row[EXCEL_COLUMNS["cost"]],
+                    "name": str(row[EXCEL_COLUMNS["name"]]).strip(),
+                }
+                for _, row in sheet.iterrows()
+            }
+        else:
+            buckets = json.loads(data)
+        return cls(buckets, version=hashlib.sha256(data).hexdigest()[:12])
+
+    @property
+    def version(self):
+        """Hash of the file the catalog was read from"""
+        return self._version
+
+    @property
+    def buckets(self):
+        """{bucket id: {"cost", "name"}}, read-only"""
+        return self._buckets
+
+    def mask(self, selected_buckets):
+        """Bit mask of a selection; unknown buckets are ignored and repeats count once"""
+        mask = 0
+        for bucket in selected_buckets:
+            mask |= self._bits.get(bucket, 0)
+        return mask
+
+    def total(self, selected_buckets):
+        return self.mask_total(self.mask(selected_buckets))
+
+    def mask_total(self, mask):
+        total = 0
+        for totals in self._group_totals:
+            total += totals[mask & self._group_mask]
+            mask >>= GROUP_BITS
+        return total
+
+    def optimize(self, budget, must_have=(), weights=None, limit=5, max_nodes=MAX_SEARCH_NODES):
+        """The best selections costing at most ``budget`` that include every
+        ``must_have`` bucket, as [(mask, total, score)].
+
+        A selection's score is the sum of its buckets' weights (1 for buckets
+        without one, none negative). Higher scores come first, then lower
+        totals, then the selection found first.
+
+        A depth-first branch and bound over the optional buckets, densest
+        (weight per cost) first, so the first selections found are already
+        good ones. A branch is cut once its fractional-knapsack bound cannot
+        beat the worst selection kept, either on score or, at an equal
+        score, on the least it would have to cost. Nothing is tabulated, so
+        the work depends on how many selections compete, not on 2**N.
+
+        Weights are rounded to two decimal places. Many buckets of nearly
+        equal cost and weight still leave too many selections competing, so
+        past ``max_nodes`` branches the search stops with SearchTooLarge.
+        """
+        weights = weights or {}
+        required = self.mask(must_have)
+        base_total = self.mask_total(required)
+        if base_total > budget or limit < 1:
+            return []
+        # Scores are kept as whole numbers of the finest decimal place any
+        # weight uses, so equal scores compare equal and a bound can be
+        # rounded down to a score some selection could actually reach
+        unit = _score_unit(weights.values())
+        points = {bucket: round(weights.get(bucket, 1) * unit) for bucket in self._buckets}
+        base_score = sum(points[bucket] for bucket in self.buckets_in(required))
+
+        items = [
+            (bit, self._buckets[bucket]["cost"], points[bucket])
+            for bucket, bit in self._bits.items()
+            if not bit & required and base_total + self._buckets[bucket]["cost"] <= budget
+        ]
+        items.sort(key=lambda item: item[2] / item[1] if item[1] else float("inf"), reverse=True)
+        bits = [bit for bit, _, _ in items]
+        costs = [cost for _, cost, _ in items]
+        scores = [score for _, _, score in items]
+        # Costs and scores of the first i items, for bounds by bisection
+        cost_sums, score_sums = [0], [0]
+        for cost, score in zip(costs, scores):
+            cost_sums.append(cost_sums[-1] + cost)
+            score_sums.append(score_sums[-1] + score)
+        count = len(items)
+        best = []
+        found = itertools.count()
+        nodes = itertools.count(1)
+
+        def keep(score, total, mask):
+            # A later selection equal on score and total never displaces an
+            # earlier one, which is what lets ties be cut below
+            key = (-score, total, next(found), mask)
+            if len(best) < limit:
+                insort(best, key)
+            elif key < best[-1]:
+                insort(best, key)
+                best.pop()
+
+        def search(index, mask, total, score):
+            if index == count:
+                return
+            if next(nodes) > max_nodes:
+                raise SearchTooLarge(
+                    f"Too many near-equal combinations to rank (over {max_nodes} searched); "
+                    f"use fewer or more distinct weights, or a lower limit"
+                )
+            if len(best) == limit:
+                worst_score, worst_total = -best[-1][0], best[-1][1]
+                room = budget - total
+                # Fractional knapsack: the densest items whole, then part of the next
+                end = bisect_right(cost_sums, cost_sums[index] + room) - 1
+                bound = score + score_sums[end] - score_sums[index]
+                if end < count:
+                    bound += (room - (cost_sums[end] - cost_sums[index])) * scores[end] // costs[end]
+                if bound < worst_score:
+                    return
+                if bound == worst_score:
+                    # Nothing here outscores the worst kept selection, so a
+                    # selection only ranks above it by costing less
+                    need = worst_score - score
+                    least = 0
+                    if need > 0:
+                        end = bisect_left(score_sums, score_sums[index] + need)
+                        part = need - (score_sums[end - 1] - score_sums[index])
+                        least = cost_sums[end - 1] - cost_sums[index] - (-part * costs[end - 1] // scores[end - 1])
+                    if total + least >= worst_total:
+                        return
+            cost, score_added = costs[index], scores[index]
+            if total + cost <= budget:
+                keep(score + score_added, total + cost, mask | bits[index])
+                search(index + 1, mask | bits[index], total + cost, score + score_added)
+            search(index + 1, mask, total, score)
+
+        keep(base_score, base_total, required)
+        search(0, required, base_total, base_score)
+        return [
+            (mask, total, -negative_score / unit if unit > 1 else -negative_score)
+            for negative_score, total, _, mask in best
+        ]
+
+    def buckets_in(self, mask):
+        """Bucket ids in a mask, in catalog order"""
+        buckets = []
+        for bucket, bit in self._bits.items():
+            if mask & bit:
+                buckets.append(bucket)
+        return buckets
+
+    def cost(self, bucket):
+        entry = self._buckets.get(bucket)
+        return entry["cost"] if entry is not None else 0
+
+
+_catalog = {"path": CATALOG_PATH, "state": None, "current": None, "reload": False}
+_reload_lock = threading.Lock()
+
+
+def _file_state(path):
+    # The size and inode catch a rewrite that lands within one mtime tick,
+    # such as a file read while half written and then completed
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def _load(path, state):
+    _catalog["reload"] = False
+    try:
+        catalog = PricingCatalog.from_file(path)
+    except Exception as e:
+        if _catalog["current"] is None:
+            raise
+        print(f"Pricing catalog {path} could not be loaded, keeping version "
+              f"{_catalog['current'].version}: {str(e)}")
+    else:
+        _catalog["current"] = catalog
+    # Not retried until the file changes again, even when it failed
+    _catalog["state"] = state
+
+
+def pricing_catalog():
+    """The current catalog, reloaded first if its file changed or SIGHUP asked for it"""
+    path = _catalog["path"]
+    state = _file_state(path)
+    if _catalog["reload"] or state != _catalog["state"]:
+        if _catalog["current"] is None:
+            # Nothing to fall back on yet, so the first load is waited for
+            with _reload_lock:
+                if _catalog["current"] is None:
+                    _load(path, state)
+        elif _reload_lock.acquire(blocking=False):
+            # Only one thread rebuilds; the others keep reading the old catalog
+            try:
+                _load(path, state)
+            finally:
+                _reload_lock.release()
+    return _catalog["current"]
+
+
+def configure_catalog(path):
+    """Read the catalog from ``path`` from now on"""
+    if path != _catalog["path"]:
+        _catalog["path"] = path
+        _catalog["reload"] = True
+    pricing_catalog()
+
+
+def _request_reload(signum, frame):
+    # Runs between two bytecodes of the main thread, so it only sets a flag
+    _catalog["reload"] = True
+
+
+def install_reload_signal():
+    """Reload the catalog on SIGHUP; only the main thread can set handlers"""
+    if hasattr(signal, "SIGHUP") and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGHUP, _request_reload)
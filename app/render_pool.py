@@ -0,0 +1,217 @@
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+
+# Renderers a job may name; resolved inside the worker process
+RENDERERS = {
+    "cost_report": "generate_cost_report_pdf",
+    "custom_package": "generate_custom_package_pdf",
+    "grade_certificate": "generate_grade_certificate_pdf",
+}
+
+
+class RenderPoolBusy(Exception):
+    """All render slots are taken; the client should retry later."""
+
+    def __init__(self, retry_after):
+        super().__init__("PDF render queue is full")
+        self.retry_after = retry_after
+
+
+class RenderTimeout(Exception):
+    """A render job did not finish before its deadline."""
+
+
+class PDFFile:
+    """A rendered PDF kept on disk instead of in memory.
+
+    ``temporary`` files are spooled renders owned by whoever receives them,
+    who must move or delete the file; other files (cache entries) are
+    only read.
+    """
+
+    def __init__(self, path, size, temporary=True):
+        self.path = path
+        self.size = size
+        self.temporary = temporary
+
+    def discard(self):
+        if self.temporary:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+def discard_result(future):
+    """Done-callback that deletes the spool file of a result nobody will read"""
+    if not future.cancelled() and future.exception() is None:
+        if isinstance(future.result(), PDFFile):
+            future.result().discard()
+
+
+def _warm_worker(profile):
+    # Import reportlab and render the template backgrounds before the first job
+    from .pdf_profiles import set_pdf_profile
+    from .pdf_generator import warm_pdf_templates
+    set_pdf_profile(profile)
+    warm_pdf_templates()
+
+
+def _ping():
+    return os.getpid()
+
+
+def _render(kind, kwargs, deadline, spool_dir, spool_max):
+    """Render a PDF; returns its bytes, or a PDFFile when it is over ``spool_max``"""
+    # Jobs that waited in the queue past their deadline are not worth rendering
+    if time.time() > deadline:
+        raise RenderTimeout(f"{kind} render expired in the queue")
+    from . import pdf_generator
+    renderer = getattr(pdf_generator, RENDERERS[kind])
+    with tempfile.SpooledTemporaryFile(max_size=spool_max, dir=spool_dir) as output:
+        renderer(output=output, **kwargs)
+        size = output.seek(0, os.SEEK_END)
+        output.seek(0)
+        if size <= spool_max:
+            return output.read()
+        # The spooled copy is anonymous; give the parent process a named one
+        fd, path = tempfile.mkstemp(suffix=".pdf", dir=spool_dir)
+        with os.fdopen(fd, "wb") as f:
+            shutil.copyfileobj(output, f)
+    return PDFFile(path, size)
+
+
+class RenderPool:
+    """Process pool for PDF renders with a bounded number of queued jobs.
+
+    ``workers`` processes render at a time and up to ``queue_size`` more jobs
+    may wait for them; beyond that ``submit`` raises ``RenderPoolBusy``
+    immediately instead of letting requests pile up.
+    """
+
+    def __init__(self, workers, queue_size, timeout, retry_after, spool_dir, spool_max, profile):
+        self.workers = workers
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.spool_dir = spool_dir
+        self.spool_max = spool_max
+        self.broken = False
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        # spawn, not fork: gunicorn workers may already be running threads
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+            initargs=(profile,),
+        )
+        for _ in range(workers):
+            self._executor.submit(_ping)
+
+    def submit(self, kind, kwargs, timeout=None):
+        if not self._slots.acquire(blocking=False):
+            raise RenderPoolBusy(self.retry_after)
+        deadline = time.time() + (timeout or self.timeout)
+        try:
+            future = self._executor.submit(
+                _render, kind, kwargs, deadline, self.spool_dir, self.spool_max
+            )
+        except Exception as e:
+            self._slots.release()
+            if isinstance(e, BrokenProcessPool):
+                self.broken = True
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future, deadline
+
+    def render(self, kind, timeout=None, **kwargs):
+        """Render a PDF in the pool and wait for it; returns bytes or a PDFFile"""
+        future, deadline = self.submit(kind, kwargs, timeout)
+        try:
+            return future.result(timeout=max(0, deadline - time.time()))
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); the next request gets a new pool
+            self.broken = True
+            raise
+        except FutureTimeoutError:
+            # Drops the job if it is still queued; a running render finishes
+            # in the background and frees its slot when done
+            future.cancel()
+            future.add_done_callback(discard_result)
+            raise RenderTimeout(f"{kind} render did not finish in time")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _spool_settings(config):
+    return config.get("PDF_SPOOL_DIR"), config.get("PDF_SPOOL_MAX_MEMORY", 256 * 1024)
+
+
+_pool = {"pid": None, "pool": None}
+_pool_lock = threading.Lock()
+
+
+def get_render_pool(config):
+    """The render pool of this process, created on first use.
+
+    Keyed on the pid so a pool created before gunicorn forks is never shared
+    with the workers, and replaced after a worker process has died.
+    Returns None when PDF_RENDER_WORKERS is 0.
+    """
+    if not config.get("PDF_RENDER_WORKERS"):
+        return None
+    pid = os.getpid()
+    if _pool["pid"] != pid or _pool["pool"].broken:
+        with _pool_lock:
+            if _pool["pid"] != pid or _pool["pool"].broken:
+                if _pool["pid"] == pid:
+                    _pool["pool"].shutdown()
+                spool_dir, spool_max = _spool_settings(config)
+                _pool["pool"] = RenderPool(
+                    workers=config["PDF_RENDER_WORKERS"],
+                    queue_size=config.get("PDF_RENDER_QUEUE_SIZE", 0),
+                    timeout=config.get("PDF_RENDER_TIMEOUT", 30),
+                    retry_after=config.get("PDF_RENDER_RETRY_AFTER", 5),
+                    spool_dir=spool_dir,
+                    spool_max=spool_max,
+                    profile=config.get("PDF_OUTPUT_PROFILE", "standard"),
+                )
+                _pool["pid"] = pid
+    return _pool["pool"]
+
+
+def submit_pdf(config, kind, **kwargs):
+    """Queue a render without waiting for it; returns (future of the PDF, deadline).
+
+    With the pool disabled the render happens right here and the future is
+    already resolved, which keeps background jobs synchronous in tests.
+    """
+    pool = get_render_pool(config)
+    if pool is not None:
+        return pool.submit(kind, kwargs)
+    deadline = time.time() + config.get("PDF_RENDER_TIMEOUT", 30)
+    future = Future()
+    try:
+        future.set_result(_render(kind, kwargs, deadline, *_spool_settings(config)))
+    except Exception as e:
+        future.set_exception(e)
+    return future, deadline
+
+
+def render_pdf(config, kind, **kwargs):
+    """Render a PDF off the request thread, or inline when the pool is disabled.
+
+    Returns the PDF bytes, or a PDFFile for renders over PDF_SPOOL_MAX_MEMORY.
+    """
+    pool = get_render_pool(config)
+    if pool is None:
+        deadline = time.time() + config.get("PDF_RENDER_TIMEOUT", 30)
+        return _render(kind, kwargs, deadline, *_spool_settings(config))
+    return pool.render(kind, **kwargs)
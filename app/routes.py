@@ -1,45 +1,38 @@
-from flask import Blueprint, request, jsonify, session, current_app, send_file
+from flask import Blueprint, request, jsonify, session, current_app, send_file, stream_with_context
 from .models import UserSubmission, ReportSubmission, RequestCallBack, GradeUserSubmission
 from . import db
-from .grade_calculator import calculate_german_grade
-from .pdf_generator import generate_cost_report_pdf, generate_grade_certificate_pdf, generate_custom_package_pdf
+from .grade_calculator import (
+    GRADE_SCALES, calculate_german_grade, calculate_german_grades, german_band, required_grade
+)
+from .render_pool import PDFFile, RenderPoolBusy, RenderTimeout
+from .pdf_jobs import start_pdf_job, get_job_store
+from .pdf_cache import cached_pdf, get_pdf_cache, pdf_cache_key
+from .pdf_batch import BatchTooLarge, iter_renders, stream_zip
+from .pdf_generator import InvalidPackageDetails, PackageTooLarge, check_package_limits
+from .transcripts import GRADE_COLUMNS, TranscriptError, convert_transcript
+from .pricing import SearchTooLarge, pricing_catalog
+from .living_costs import LIVING_COSTS, InvalidCostQuery
+from .lead_buffer import lead_row, store_lead, store_leads
+from .lead_export import (
+    EXPORT_FORMATS, InvalidExport, csv_lines, encode_cursor, export_bounds, export_rows, ndjson_lines, resume_export,
+)
+from datetime import datetime, timezone
+import csv
+import hmac
+import io
+import itertools
+import math
 import traceback
 
-# Define updated bucket mappings for cost calculator
-bucket_mapping = {
-    'Bucket-1': {
-        'cost': 1500,
-        'name': 'PASSPORT'
-    },
-    'Bucket-2': {
-        'cost': 75000,
-        'name': 'Career Counselling and pre-application assistance + University Application'
-    },
-    'Bucket-3': {
-        'cost': 21000,
-        'name': 'APS Certification'
-    },
-    'Bucket-4': {
-        'cost': 75000,
-        'name': 'IELTS / TOFEL + Language Training(German,French,Spanish and more)'
-    },
-    'Bucket-5': {
-        'cost': 125000,
-        'name': 'Visa process'
-    },
-    'Bucket-6': {
-        'cost': 100000,
-        'name': 'Pre and post travel essentials'
-    },
-    'Bucket-7': {
-        'cost': 80000,
-        'name': 'Others'
-    }
-}
-
+from werkzeug.exceptions import RequestEntityTooLarge
 
 main = Blueprint('main', __name__)
 
+def pdf_busy_response(e):
+    response = jsonify({'error': 'PDF service is busy, please retry shortly'})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 503
+
 @main.after_request
 def after_request(response):
     origin = request.headers.get('Origin')
@@ -66,31 +59,165 @@ def health_check():
 def calculate_cost():
     if request.method == 'OPTIONS':
         return '', 200
-    print("=== NEW CODE IS RUNNING ===")
     try:
         data = request.get_json()
         selected = data.get('selected_buckets', [])
         
-        # HARDCODED VALUES - NO EXCEL FILE
-        if selected == ['Bucket-1', 'Bucket-2', 'Bucket-3', 'Bucket-4']:
-            total = 172500  # Force correct total
-        else:
-            bucket_costs = {
-                'Bucket-1': 1500,
-                'Bucket-2': 75000,
-                'Bucket-3': 21000,
-                'Bucket-4': 75000,
-                'Bucket-5': 125000,
-                'Bucket-6': 100000,
-                'Bucket-7': 80000
-            }
-            total = sum(bucket_costs.get(bucket, 0) for bucket in selected)
-        
-        print(f"FORCED TOTAL: {total}")
+        # One snapshot per request, so the total and its version always agree
+        catalog = pricing_catalog()
+        total = catalog.total(selected)
+        current_app.logger.debug("Catalog total for %s: %s", selected, total)
         
         session['total_cost'] = total
         session['selected_buckets'] = selected
-        return jsonify({"total_cost": total}), 200
+        return jsonify({"total_cost": total, "catalog_version": catalog.version}), 200
+    except Exception as e:
+        print(f"ERROR: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+def evaluate_scenario(catalog, number, scenario):
+    """(name, mask, unknown buckets) of one scenario: a bucket list or an
+    object with a name and selected_buckets"""
+    if isinstance(scenario, dict):
+        name = scenario.get('name') or f"Scenario {number}"
+        selected = scenario.get('selected_buckets', [])
+    else:
+        name, selected = f"Scenario {number}", scenario
+    if not isinstance(selected, list) or not all(isinstance(bucket, str) for bucket in selected):
+        raise ValueError(f"Scenario {number}: selected_buckets must be a list of bucket ids")
+    unknown = [bucket for bucket in selected if bucket not in catalog.buckets]
+    return name, catalog.mask(selected), unknown
+
+@main.route('/api/cost-calculator/evaluate', methods=['POST', 'OPTIONS'])
+def evaluate_costs():
+    if request.method == 'OPTIONS':
+        return '', 200
+    try:
+        data = request.get_json(silent=True)
+        scenarios = data.get('scenarios') if isinstance(data, dict) else data
+        if not isinstance(scenarios, list) or not scenarios:
+            return jsonify({'error': 'Send a non-empty list of scenarios'}), 400
+        if len(scenarios) > current_app.config['EVALUATE_MAX_SCENARIOS']:
+            return jsonify({'error': f"At most {current_app.config['EVALUATE_MAX_SCENARIOS']} scenarios per request"}), 413
+        baseline = data.get('baseline', 0) if isinstance(data, dict) else 0
+        if not isinstance(baseline, int) or isinstance(baseline, bool) or not 0 <= baseline < len(scenarios):
+            return jsonify({'error': 'baseline must be the index of a scenario'}), 400
+
+        # Every scenario is priced from the same snapshot, without touching the session
+        catalog = pricing_catalog()
+        try:
+            evaluated = [
+                evaluate_scenario(catalog, number, scenario)
+                for number, scenario in enumerate(scenarios, start=1)
+            ]
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        base_mask = evaluated[baseline][1]
+        base_total = catalog.mask_total(base_mask)
+        results = []
+        for name, mask, unknown in evaluated:
+            total = catalog.mask_total(mask)
+            selected = catalog.buckets_in(mask)
+            results.append({
+                'name': name,
+                'selected_buckets': selected,
+                'total_cost': total,
+                'breakdown': [
+                    {'bucket': bucket, 'name': catalog.buckets[bucket]['name'], 'cost': catalog.buckets[bucket]['cost']}
+                    for bucket in selected
+                ],
+                # Compared with the baseline scenario
+                'delta': total - base_total,
+                'added_buckets': catalog.buckets_in(mask & ~base_mask),
+                'removed_buckets': catalog.buckets_in(base_mask & ~mask),
+                'unknown_buckets': unknown,
+            })
+        return jsonify({'catalog_version': catalog.version, 'baseline': baseline, 'scenarios': results}), 200
+    except Exception as e:
+        print(f"ERROR: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@main.route('/api/cost-calculator/optimize', methods=['POST', 'OPTIONS'])
+def optimize_costs():
+    if request.method == 'OPTIONS':
+        return '', 200
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Send a JSON object'}), 400
+        budget = data.get('budget')
+        if not isinstance(budget, (int, float)) or isinstance(budget, bool) or not 0 <= budget < math.inf:
+            return jsonify({'error': 'budget must be a number of at least 0'}), 400
+        must_have = data.get('must_have', [])
+        weights = data.get('weights') or {}
+        limit = data.get('limit', 5)
+        if not isinstance(must_have, list) or not all(isinstance(bucket, str) for bucket in must_have):
+            return jsonify({'error': 'must_have must be a list of bucket ids'}), 400
+        if not isinstance(weights, dict) or not all(
+            isinstance(weight, (int, float)) and not isinstance(weight, bool) and 0 <= weight < math.inf
+            for weight in weights.values()
+        ):
+            return jsonify({'error': 'weights must map bucket ids to numbers of at least 0'}), 400
+        max_results = current_app.config['OPTIMIZE_MAX_RESULTS']
+        if not isinstance(limit, int) or isinstance(limit, bool) or not 1 <= limit <= max_results:
+            return jsonify({'error': f'limit must be between 1 and {max_results}'}), 400
+
+        catalog = pricing_catalog()
+        unknown = [bucket for bucket in list(must_have) + list(weights) if bucket not in catalog.buckets]
+        if unknown:
+            return jsonify({'error': f"Unknown bucket(s): {', '.join(unknown)}"}), 400
+
+        required_total = catalog.total(must_have)
+        combinations = []
+        try:
+            results = catalog.optimize(budget, must_have, weights, limit, current_app.config['OPTIMIZE_MAX_NODES'])
+        except SearchTooLarge as e:
+            return jsonify({'error': str(e)}), 400
+        for mask, total, score in results:
+            combinations.append({
+                'selected_buckets': catalog.buckets_in(mask),
+                'total_cost': total,
+                'remaining_budget': budget - total,
+                'score': score,
+            })
+        return jsonify({
+            'catalog_version': catalog.version,
+            'budget': budget,
+            'must_have_total': required_total,
+            # Empty when the must-have buckets alone cost more than the budget
+            'combinations': combinations,
+        }), 200
+    except Exception as e:
+        print(f"ERROR: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@main.route('/api/cost-calculator/living-costs', methods=['GET', 'POST', 'OPTIONS'])
+def living_costs():
+    if request.method == 'OPTIONS':
+        return '', 200
+    if not current_app.config['LIVING_COSTS_ENABLED']:
+        return jsonify({'error': 'Living costs are not available yet'}), 404
+    if request.method == 'GET':
+        return jsonify(LIVING_COSTS.describe()), 200
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Send a JSON object'}), 400
+        answers = data.get('answers', {})
+        if 'locations' not in data:
+            return jsonify(LIVING_COSTS.quote(data.get('country'), data.get('city'), answers)), 200
+
+        # Several cities compared under the same answers
+        locations = data['locations']
+        if not isinstance(locations, list) or not locations or not all(isinstance(l, dict) for l in locations):
+            return jsonify({'error': 'locations must be a non-empty list of {"country", "city"} objects'}), 400
+        if len(locations) > current_app.config['LIVING_COST_MAX_LOCATIONS']:
+            return jsonify({'error': f"At most {current_app.config['LIVING_COST_MAX_LOCATIONS']} locations per request"}), 413
+        quotes = LIVING_COSTS.compare([(l.get('country'), l.get('city')) for l in locations], answers)
+        return jsonify({'quotes': quotes}), 200
+    except InvalidCostQuery as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"ERROR: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -101,15 +228,14 @@ def store_cost_user_details():
         return '', 200
     try:
         data = request.get_json()
-        print(f"Received data: {data}")
-        new_user = UserSubmission(
+        current_app.logger.debug("Cost user details: %s", data)
+        store_lead(
+            UserSubmission,
             name=data.get('name'),
             emailid=data.get('email'),
             phone=data.get('phone'),
             intent=data.get('intent', 'viewed_estimate')
         )
-        db.session.add(new_user)
-        db.session.commit()
         return jsonify({"message": "User details saved"}), 200
     except Exception as e:
         db.session.rollback()
@@ -123,12 +249,11 @@ def request_callback():
         return '', 200
     try:
         data = request.get_json()
-        new_request = RequestCallBack(
+        store_lead(
+            RequestCallBack,
             name=data['name'], 
             phone=data['mobileNumber']
         )
-        db.session.add(new_request)
-        db.session.commit()
         return jsonify({'message': 'Request submitted successfully'}), 201
     except Exception as e:
         db.session.rollback()
@@ -138,33 +263,20 @@ def request_callback():
 def calculate_custom_package():
     if request.method == 'OPTIONS':
         return '', 200
-    print("=== CALCULATE CUSTOM PACKAGE ENDPOINT HIT ===")
     try:
         data = request.get_json()
         selected = data.get('selected_buckets', [])
         
-        # Calculate directly here instead of using calculate_total_cost
-        bucket_costs = {
-            'Bucket-1': 1500,
-            'Bucket-2': 75000,
-            'Bucket-3': 21000,
-            'Bucket-4': 75000,
-            'Bucket-5': 125000,
-            'Bucket-6': 100000,
-            'Bucket-7': 80000
-        }
-        
-        total = sum(bucket_costs.get(bucket, 0) for bucket in selected)
-        print(f"DEBUG ROUTE: Selected buckets: {selected}")
-        print(f"DEBUG ROUTE: Individual costs: {[bucket_costs.get(bucket, 0) for bucket in selected]}")
-        print(f"DEBUG ROUTE: Direct calculation total: {total}")
+        catalog = pricing_catalog()
+        total = catalog.total(selected)
+        current_app.logger.debug("Custom package total for %s: %s", selected, total)
         
         if total is None:
             return jsonify({"error": "Failed to calculate cost"}), 500
             
         session['total_cost'] = total
         session['selected_buckets'] = selected
-        return jsonify({"total_cost": total}), 200
+        return jsonify({"total_cost": total, "catalog_version": catalog.version}), 200
     except Exception as e:
         print(f"DEBUG ROUTE: Error: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -175,14 +287,13 @@ def store_download_request():
         return '', 200
     try:
         data = request.get_json()
-        new_user = ReportSubmission(
+        store_lead(
+            ReportSubmission,
             name=data.get('name'),
             emailid=data.get('email'),
             phone=data.get('phone'),
             intent='downloaded'
         )
-        db.session.add(new_user)
-        db.session.commit()
         session['download_email'] = data.get('email')
         return jsonify({"message": "Download request saved"}), 200
     except Exception as e:
@@ -201,27 +312,152 @@ def calculate_grade():
         min_passing_grade = data.get('min_passing_grade')
         your_grade = data.get('your_grade')
 
+        # A named scale supplies the best and minimum passing grade
+        if data.get('scale'):
+            scale = GRADE_SCALES.get(data['scale'])
+            if scale is None:
+                return jsonify({'error': f"Unknown scale: {data['scale']}"}), 400
+            best_grade, min_passing_grade = scale.best_grade, scale.min_passing_grade
+
         result = calculate_german_grade(best_grade, min_passing_grade, your_grade)
         if isinstance(result, str):
             return jsonify({'error': result}), 400
         else:
-            return jsonify({'german_grade': result}), 200
+            return jsonify({'german_grade': result, 'band': german_band(result)}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@main.route('/api/grade-calculator/scales', methods=['GET'])
+def list_grade_scales():
+    return jsonify({'scales': [scale.describe() for scale in GRADE_SCALES.values()]}), 200
+
+@main.route('/api/grade-calculator/required-grade', methods=['POST', 'OPTIONS'])
+def calculate_required_grade():
+    if request.method == 'OPTIONS':
+        return '', 200
+    try:
+        data = request.get_json()
+        try:
+            german_grade = float(data.get('german_grade'))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid input: Please enter a numeric German grade.'}), 400
+        if not 1.0 <= german_grade <= 4.0:
+            return jsonify({'error': 'Invalid input: German grade must be between 1.0 and 4.0.'}), 400
+
+        if data.get('scale'):
+            scale = GRADE_SCALES.get(data['scale'])
+            if scale is None:
+                return jsonify({'error': f"Unknown scale: {data['scale']}"}), 400
+            your_grade = scale.required_grade(german_grade)
+        else:
+            # Custom scales fall back to inverting the formula
+            try:
+                best_grade = float(data.get('best_grade'))
+                min_passing_grade = float(data.get('min_passing_grade'))
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Invalid input: Please enter numeric values.'}), 400
+            if not (math.isfinite(best_grade) and math.isfinite(min_passing_grade)):
+                return jsonify({'error': 'Invalid input: Please enter numeric values.'}), 400
+            if best_grade <= min_passing_grade:
+                return jsonify({'error': 'Invalid input: Best grade must be greater than minimum passing grade.'}), 400
+            your_grade = required_grade(best_grade, min_passing_grade, german_grade)
+
+        return jsonify({'your_grade': your_grade, 'band': german_band(german_grade)}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def read_grade_rows(data):
+    """(best, min passing, your grade) lists from a grade batch body, and the
+    numbers and errors of rows that are not shaped like a grade triple"""
+    if 'rows' not in data:
+        your_grades = data.get('your_grades')
+        best_grade, min_passing_grade = data.get('best_grade'), data.get('min_passing_grade')
+        if not isinstance(your_grades, list) or isinstance(best_grade, list) or isinstance(min_passing_grade, list):
+            raise ValueError('Send "rows", or one "best_grade" and "min_passing_grade" with a "your_grades" list')
+        return best_grade, min_passing_grade, your_grades, list(range(1, len(your_grades) + 1)), []
+
+    rows = data['rows']
+    if not isinstance(rows, list):
+        raise ValueError('"rows" must be a list')
+    columns, numbers, errors = ([], [], []), [], []
+    for number, row in enumerate(rows, start=1):
+        if isinstance(row, dict):
+            row = [row.get(field) for field in GRADE_COLUMNS]
+        if not isinstance(row, list) or len(row) != 3:
+            errors.append({'row': number, 'error': 'Row must be an object or a [best_grade, min_passing_grade, your_grade] list'})
+            continue
+        for column, value in zip(columns, row):
+            column.append(value)
+        numbers.append(number)
+    return columns + (numbers, errors)
+
+@main.route('/api/grade-calculator/calculate-batch', methods=['POST', 'OPTIONS'])
+def calculate_grade_batch():
+    if request.method == 'OPTIONS':
+        return '', 200
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Send a JSON object'}), 400
+        try:
+            best_grades, min_passing_grades, your_grades, numbers, errors = read_grade_rows(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if len(numbers) + len(errors) > current_app.config['GRADE_BATCH_MAX_ROWS']:
+            return jsonify({'error': f"At most {current_app.config['GRADE_BATCH_MAX_ROWS']} grades per request"}), 413
+
+        # Rows that are not grade triples keep their place in the results
+        results = list(errors)
+        if numbers:
+            grades = calculate_german_grades(best_grades, min_passing_grades, your_grades)
+            for number, grade in zip(numbers, grades):
+                if isinstance(grade, str):
+                    results.append({'row': number, 'error': grade})
+                else:
+                    results.append({'row': number, 'german_grade': grade})
+        results.sort(key=lambda result: result['row'])
+        failed = sum('error' in result for result in results)
+        return jsonify({'results': results, 'converted': len(results) - failed, 'failed': failed}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/grade-calculator/convert-transcript', methods=['POST', 'OPTIONS'])
+def convert_transcript_file():
+    if request.method == 'OPTIONS':
+        return '', 200
+    try:
+        upload = request.files.get('file')
+        if upload is None:
+            return jsonify({'error': 'Upload a CSV or XLSX file in the "file" field'}), 400
+        # Form fields apply one scale to every row of the file
+        scale = {field: request.form[field] for field in GRADE_COLUMNS if request.form.get(field)}
+        chunks = convert_transcript(
+            upload.stream, upload.filename, scale, current_app.config['TRANSCRIPT_CHUNK_ROWS']
+        )
+        return current_app.response_class(
+            # Keeps the upload open until the last chunk is written
+            stream_with_context(chunks),
+            mimetype='text/csv',
+            headers={'Content-Disposition': 'attachment; filename=German_Grades.csv'}
+        )
+    except TranscriptError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error in convert_transcript_file: {str(e)}")
+        return jsonify({'error': f'Failed to convert transcript: {str(e)}'}), 500
+
 @main.route('/api/grade-calculator/user-details', methods=['POST', 'OPTIONS'])
 def store_grade_user_details():
     if request.method == 'OPTIONS':
         return '', 200
     try:
         data = request.get_json()
-        new_user = GradeUserSubmission(
+        store_lead(
+            GradeUserSubmission,
             name=data.get('name'),
             email=data.get('email'),
             phone=data.get('phone')
         )
-        db.session.add(new_user)
-        db.session.commit()
         return jsonify({'success': True}), 200
     except Exception as e:
         db.session.rollback()
@@ -229,41 +465,174 @@ def store_grade_user_details():
 
 # ============ PDF GENERATION ENDPOINTS ============
 
+def cost_report_figures(data, answers):
+    """(expenses, location) printed on a cost report.
+
+    The client's expenses, as the calculator showed them, unless
+    LIVING_COSTS_ENABLED is on and the dataset knows the country, city and
+    every answer. Anything it does not know falls back to the client's
+    figures rather than failing the download.
+    """
+    expenses = data.get('expenses', {})
+    country = data.get('selectedCountry', 'Germany')
+    if not current_app.config['LIVING_COSTS_ENABLED']:
+        return expenses, country
+    try:
+        quote = LIVING_COSTS.quote(country, data.get('city'), answers)
+    except InvalidCostQuery:
+        return expenses, country
+    location = f"{quote['city']}, {quote['country']}" if quote['city'] else quote['country']
+    return quote['expenses'], location
+
+def prepare_cost_pdf(data):
+    """What the cost report render needs, and the download lead to store once
+    the render is accepted"""
+    current_app.logger.debug("Cost PDF request: %s", data)
+
+    answers = data.get('answers', {})
+    expenses, location = cost_report_figures(data, answers)
+
+    # Download request, checked now so a bad one fails before the render
+    lead = (ReportSubmission, lead_row(ReportSubmission, {
+        'name': data.get('name'),
+        'emailid': data.get('email'),
+        'phone': data.get('phone'),
+        'intent': 'downloaded'
+    }))
+
+    render_args = {
+        'user_data': data,
+        'expenses': expenses,
+        'selected_country': location,
+        'answers': answers
+    }
+    filename = f"Cost_Report_{data.get('name', 'User').replace(' ', '_')}.pdf"
+    return 'cost_report', render_args, filename, lead
+
+def prepare_custom_package_pdf(data):
+    """What the custom package render needs, and the download lead to store
+    once the render is accepted"""
+    current_app.logger.debug("Custom package PDF request: %s", data)
+
+    config = current_app.config
+    check_package_limits(
+        data,
+        config['PDF_MAX_PACKAGES'],
+        config['PDF_MAX_PACKAGE_FEATURES'],
+        config['PDF_MAX_TEXT_LENGTH']
+    )
+
+    # User details
+    lead = (UserSubmission, lead_row(UserSubmission, {
+        'name': data.get('name'),
+        'emailid': data.get('email'),
+        'phone': data.get('phone'),
+        'intent': 'downloaded_custom_package'
+    }))
+
+    selected_buckets = data.get('selected_buckets', [])
+    catalog = pricing_catalog()
+    recalculated_total = catalog.total(selected_buckets)
+    current_app.logger.debug("Custom package PDF total for %s: %s", selected_buckets, recalculated_total)
+
+    # Generate PDF with recalculated total
+    render_args = {
+        'user_data': data,
+        'selected_packages': selected_buckets,  # Use buckets for PDF too
+        'total_cost': recalculated_total,
+        'catalog_version': catalog.version
+    }
+    filename = f"Custom_Package_{data.get('name', 'User').replace(' ', '_')}.pdf"
+    return 'custom_package', render_args, filename, lead
+
+def prepare_grade_pdf(data):
+    """What the grade certificate render needs, and the download lead to store
+    once the render is accepted"""
+    # User details
+    lead = (GradeUserSubmission, lead_row(GradeUserSubmission, {
+        'name': data.get('name'),
+        'email': data.get('email'),
+        'phone': data.get('phone')
+    }))
+
+    return 'grade_certificate', grade_render_args(data), grade_pdf_filename(data), lead
+
+def grade_render_args(data):
+    return {
+        'user_data': data,
+        'grade_data': {
+            'best_grade': data.get('best_grade'),
+            'min_passing_grade': data.get('min_passing_grade'),
+            'your_grade': data.get('your_grade'),
+            'german_grade': data.get('german_grade')
+        }
+    }
+
+def grade_pdf_filename(data):
+    return f"Grade_Certificate_{data.get('name', 'User').replace(' ', '_')}.pdf"
+
+def store_download_lead(lead):
+    # Only called once a render is accepted: a 503 asks the client to retry,
+    # and every retry would otherwise store the same lead again
+    if lead is not None:
+        model, values = lead
+        store_lead(model, **values)
+
+def send_pdf(kind, render_args, filename, lead=None):
+    config = current_app.config
+    etag = pdf_cache_key(kind, render_args)
+    # Without the cache a re-render differs in its timestamps, so the tag is weak
+    weak = get_pdf_cache(config) is None
+
+    # The client already has this exact PDF: skip the render entirely. RFC
+    # 9110 only lets GET and HEAD answer that with 304; for any other method
+    # (the POST download endpoints) the precondition fails with 412
+    if request.if_none_match.contains_weak(etag):
+        if request.method not in ('GET', 'HEAD'):
+            response = jsonify({'error': 'If-None-Match matched; the PDF was not sent again'})
+            response.status_code = 412
+        else:
+            store_download_lead(lead)
+            response = current_app.response_class(status=304)
+        response.set_etag(etag, weak=weak)
+        return response
+
+    # Large PDFs arrive as files and are streamed from disk, not read into memory
+    pdf = cached_pdf(config, kind, render_args, etag)
+    store_download_lead(lead)
+    if isinstance(pdf, PDFFile) and pdf.temporary:
+        # Nobody else uses this spool file: unlink it now, the open handle
+        # keeps it readable while it is sent (chunked, as its size is unknown)
+        body = open(pdf.path, 'rb')
+        pdf.discard()
+    elif isinstance(pdf, PDFFile):
+        body = pdf.path
+    else:
+        body = io.BytesIO(pdf)
+    response = send_file(
+        body,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=filename,
+        etag=False
+    )
+    response.set_etag(etag, weak=weak)
+    if render_args.get('catalog_version'):
+        response.headers['X-Catalog-Version'] = render_args['catalog_version']
+    return response
+
 @main.route('/api/cost-calculator/download-pdf', methods=['POST', 'OPTIONS'])
 def download_cost_pdf():
     if request.method == 'OPTIONS':
         return '', 200
     try:
         data = request.get_json()
-        print(f"PDF Request data: {data}")
-        
-        # Store download request
-        new_user = ReportSubmission(
-            name=data.get('name'),
-            emailid=data.get('email'),
-            phone=data.get('phone'),
-            intent='downloaded'
-        )
-        db.session.add(new_user)
-        db.session.commit()
-        
-        # Generate PDF
-        pdf_buffer = generate_cost_report_pdf(
-            user_data=data,
-            expenses=data.get('expenses', {}),
-            selected_country=data.get('selectedCountry', 'Germany'),
-            answers=data.get('answers', {})
-        )
-        
-        filename = f"Cost_Report_{data.get('name', 'User').replace(' ', '_')}.pdf"
-        
-        return send_file(
-            pdf_buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=filename
-        )
+        return send_pdf(*prepare_cost_pdf(data))
         
+    except RenderPoolBusy as e:
+        return pdf_busy_response(e)
+    except RenderTimeout:
+        return jsonify({'error': 'PDF generation timed out'}), 504
     except Exception as e:
         print(f"Error in download_cost_pdf: {str(e)}")
         print(traceback.format_exc())
@@ -275,51 +644,16 @@ def download_custom_package_pdf():
         return '', 200
     try:
         data = request.get_json()
+        return send_pdf(*prepare_custom_package_pdf(data))
         
-        # Debug: Log what we receive from frontend
-        print(f"DEBUG: Received data from frontend: {data}")
-        
-        # Store user details
-        new_user = UserSubmission(
-            name=data.get('name'),
-            emailid=data.get('email'),
-            phone=data.get('phone'),
-            intent='downloaded_custom_package'
-        )
-        db.session.add(new_user)
-        db.session.commit()
-        
-        # Calculate total directly instead of using calculate_total_cost
-        selected_buckets = data.get('selected_buckets', [])
-        bucket_costs = {
-            'Bucket-1': 1500,
-            'Bucket-2': 75000,
-            'Bucket-3': 21000,
-            'Bucket-4': 75000,
-            'Bucket-5': 125000,
-            'Bucket-6': 100000,
-            'Bucket-7': 80000
-        }
-        recalculated_total = sum(bucket_costs.get(bucket, 0) for bucket in selected_buckets)
-        print(f"DEBUG PDF: Selected buckets: {selected_buckets}")
-        print(f"DEBUG PDF: Recalculated total: {recalculated_total}")
-        
-        # Generate PDF with recalculated total
-        pdf_buffer = generate_custom_package_pdf(
-            user_data=data,
-            selected_packages=selected_buckets,  # Use buckets for PDF too
-            total_cost=recalculated_total
-        )
-        
-        filename = f"Custom_Package_{data.get('name', 'User').replace(' ', '_')}.pdf"
-        
-        return send_file(
-            pdf_buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=filename
-        )
-        
+    except PackageTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except InvalidPackageDetails as e:
+        return jsonify({'error': str(e)}), 400
+    except RenderPoolBusy as e:
+        return pdf_busy_response(e)
+    except RenderTimeout:
+        return jsonify({'error': 'PDF generation timed out'}), 504
     except Exception as e:
         print(f"DEBUG: Error in download_custom_package_pdf: {str(e)}")
         return jsonify({'error': f'Failed to generate PDF: {str(e)}'}), 500
@@ -330,35 +664,246 @@ def download_grade_pdf():
         return '', 200
     try:
         data = request.get_json()
+        return send_pdf(*prepare_grade_pdf(data))
         
-        # Store user details
-        new_user = GradeUserSubmission(
-            name=data.get('name'),
-            email=data.get('email'),
-            phone=data.get('phone')
+    except RenderPoolBusy as e:
+        return pdf_busy_response(e)
+    except RenderTimeout:
+        return jsonify({'error': 'PDF generation timed out'}), 504
+    except Exception as e:
+        return jsonify({'error': f'Failed to generate PDF: {str(e)}'}), 500
+
+# ============ BATCH PDF ENDPOINTS ============
+
+GRADE_BATCH_FIELDS = ('name', 'email', 'phone', 'best_grade', 'min_passing_grade', 'your_grade')
+
+def read_batch_rows(max_rows, max_bytes):
+    """Student rows from a CSV upload, a text/csv body or a JSON list.
+
+    A body that declares more than ``max_bytes`` is refused before it is
+    read, and a CSV is read only up to the first row past ``max_rows``.
+    """
+    if request.content_length is not None and request.content_length > max_bytes:
+        raise BatchTooLarge(f"Batch uploads are limited to {max_bytes} bytes")
+    # A chunked body declares no length; werkzeug stops it at the same size
+    request.max_content_length = max_bytes
+    try:
+        upload = request.files.get('file')
+        if upload is not None or request.mimetype == 'text/csv':
+            stream = upload.stream if upload is not None else request.stream
+            reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+            rows = list(itertools.islice(reader, max_rows + 1))
+        else:
+            rows = request.get_json()
+            if isinstance(rows, dict):
+                rows = rows.get('students')
+    except RequestEntityTooLarge:
+        raise BatchTooLarge(f"Batch uploads are limited to {max_bytes} bytes")
+    if isinstance(rows, list) and len(rows) > max_rows:
+        raise BatchTooLarge(f"At most {max_rows} students per batch")
+    return rows
+
+def prepare_grade_batch(rows):
+    """Validate every row before anything is stored; returns (rows, errors)"""
+    students, errors = [], []
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({'row': number, 'error': 'Row must be an object'})
+            continue
+        row = {key: value.strip() if isinstance(value, str) else value for key, value in row.items()}
+        missing = [field for field in GRADE_BATCH_FIELDS if row.get(field) in (None, '')]
+        if missing:
+            errors.append({'row': number, 'error': f"Missing {', '.join(missing)}"})
+            continue
+        # CSV exports usually carry the raw grades only
+        if row.get('german_grade') in (None, ''):
+            result = calculate_german_grade(row['best_grade'], row['min_passing_grade'], row['your_grade'])
+            if isinstance(result, str):
+                errors.append({'row': number, 'error': result})
+                continue
+            row['german_grade'] = result
+        students.append(row)
+    return students, errors
+
+def grade_batch_entries(config, students):
+    """(archive name, PDF) pairs as the certificates finish, then any failures"""
+    failures = []
+    render_args_list = [grade_render_args(student) for student in students]
+    for index, pdf in iter_renders(config, 'grade_certificate', render_args_list):
+        if isinstance(pdf, Exception):
+            failures.append(f"{index + 1},{str(pdf)}")
+            continue
+        # Numbered, so a cohort's certificates list in input order and never collide
+        name = grade_pdf_filename(students[index]).replace('/', '_').replace('\\', '_')
+        yield f"{index + 1:04d}_{name}", pdf
+    if failures:
+        yield 'errors.csv', ('row,error\n' + '\n'.join(failures) + '\n').encode()
+
+@main.route('/api/grade-calculator/download-batch', methods=['POST', 'OPTIONS'])
+def download_grade_batch():
+    if request.method == 'OPTIONS':
+        return '', 200
+    try:
+        rows = read_batch_rows(current_app.config['PDF_BATCH_MAX_ROWS'], current_app.config['PDF_BATCH_MAX_BYTES'])
+        if not isinstance(rows, list) or not rows:
+            return jsonify({'error': 'Send a non-empty list of students or a CSV file'}), 400
+        students, errors = prepare_grade_batch(rows)
+        if errors:
+            return jsonify({'error': 'Invalid student rows', 'rows': errors}), 400
+
+        # One append (or one multi-row INSERT) for the whole cohort
+        store_leads(
+            GradeUserSubmission,
+            [{'name': s['name'], 'email': s['email'], 'phone': s['phone']} for s in students]
         )
-        db.session.add(new_user)
-        db.session.commit()
-        
-        # Generate PDF
-        pdf_buffer = generate_grade_certificate_pdf(
-            user_data=data,
-            grade_data={
-                'best_grade': data.get('best_grade'),
-                'min_passing_grade': data.get('min_passing_grade'),
-                'your_grade': data.get('your_grade'),
-                'german_grade': data.get('german_grade')
-            }
+
+        entries = grade_batch_entries(current_app.config, students)
+        return current_app.response_class(
+            stream_zip(entries),
+            mimetype='application/zip',
+            headers={'Content-Disposition': 'attachment; filename=Grade_Certificates.zip'}
         )
-        
-        filename = f"Grade_Certificate_{data.get('name', 'User').replace(' ', '_')}.pdf"
-        
-        return send_file(
-            pdf_buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=filename
+    except BatchTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in download_grade_batch: {str(e)}")
+        return jsonify({'error': f'Failed to generate PDFs: {str(e)}'}), 500
+
+# ============ ASYNC PDF JOB ENDPOINTS ============
+
+def pdf_job_response(job_id, meta):
+    body = {'job_id': job_id, 'status': meta['status']}
+    if meta['status'] == 'done':
+        body['download_url'] = f'/api/pdf-jobs/{job_id}/pdf'
+    elif meta['status'] == 'failed':
+        body['error'] = meta.get('error')
+    return body
+
+def create_pdf_job(prepare):
+    data = request.get_json()
+    kind, render_args, filename, lead = prepare(data)
+    job_id = start_pdf_job(current_app.config, kind, filename, **render_args)
+    store_download_lead(lead)
+    meta = get_job_store(current_app.config).get(job_id)
+    return jsonify(pdf_job_response(job_id, meta)), 202
+
+@main.route('/api/cost-calculator/pdf-jobs', methods=['POST', 'OPTIONS'])
+def create_cost_pdf_job():
+    if request.method == 'OPTIONS':
+        return '', 200
+    try:
+        report = (request.get_json() or {}).get('report', 'cost_report')
+        if report == 'cost_report':
+            return create_pdf_job(prepare_cost_pdf)
+        if report == 'custom_package':
+            return create_pdf_job(prepare_custom_package_pdf)
+        return jsonify({'error': 'report must be cost_report or custom_package'}), 400
+    except PackageTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except InvalidPackageDetails as e:
+        return jsonify({'error': str(e)}), 400
+    except RenderPoolBusy as e:
+        return pdf_busy_response(e)
+    except Exception as e:
+        print(f"Error in create_cost_pdf_job: {str(e)}")
+        return jsonify({'error': f'Failed to start PDF job: {str(e)}'}), 500
+
+@main.route('/api/grade-calculator/pdf-jobs', methods=['POST', 'OPTIONS'])
+def create_grade_pdf_job():
+    if request.method == 'OPTIONS':
+        return '', 200
+    try:
+        return create_pdf_job(prepare_grade_pdf)
+    except RenderPoolBusy as e:
+        return pdf_busy_response(e)
+    except Exception as e:
+        return jsonify({'error': f'Failed to start PDF job: {str(e)}'}), 500
+
+@main.route('/api/pdf-jobs/<job_id>', methods=['GET'])
+def get_pdf_job(job_id):
+    meta = get_job_store(current_app.config).get(job_id)
+    if meta is None:
+        return jsonify({'error': 'Unknown or expired PDF job'}), 404
+    return jsonify(pdf_job_response(job_id, meta)), 200
+
+@main.route('/api/pdf-jobs/<job_id>/pdf', methods=['GET'])
+def fetch_pdf_job(job_id):
+    store = get_job_store(current_app.config)
+    meta = store.get(job_id)
+    if meta is None:
+        return jsonify({'error': 'Unknown or expired PDF job'}), 404
+    if meta['status'] != 'done':
+        return jsonify(pdf_job_response(job_id, meta)), 409
+    # send_file streams the file and, for this GET, answers If-None-Match
+    # with 304 and Range with 206
+    return send_file(
+        store.pdf_path(job_id),
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=meta['filename'],
+        etag=meta.get('etag') or True
+    )
+
+@main.route('/api/pdf-cache/stats', methods=['GET'])
+def pdf_cache_stats():
+    cache = get_pdf_cache(current_app.config)
+    if cache is None:
+        return jsonify({'enabled': False}), 200
+    return jsonify({'enabled': True, **cache.stats()}), 200
+
+# ============ LEAD EXPORT ENDPOINT ============
+
+def export_authorized():
+    token = current_app.config['LEAD_EXPORT_TOKEN']
+    supplied = request.headers.get('Authorization', '')
+    return hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode())
+
+def export_time(name):
+    """A from/to query argument as naive UTC, or None"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise InvalidExport(f"{name} must be an ISO 8601 date or time")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+@main.route('/api/leads/export', methods=['GET'])
+def export_leads():
+    if not current_app.config['LEAD_EXPORT_TOKEN']:
+        return jsonify({'error': 'Lead export is not configured'}), 404
+    if not export_authorized():
+        response = jsonify({'error': 'A valid export token is required'})
+        response.headers['WWW-Authenticate'] = 'Bearer'
+        return response, 401
+    try:
+        export_format = request.args.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            raise InvalidExport(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+        table_name, after, start, end = resume_export(
+            request.args.get('cursor'), request.args.get('table'), export_time('from'), export_time('to')
         )
-        
+        table, last = export_bounds(table_name)
+    except InvalidExport as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        return jsonify({'error': f'Failed to generate PDF: {str(e)}'}), 500
\ No newline at end of file
+        print(f"Error in export_leads: {str(e)}")
+        return jsonify({'error': f'Failed to export leads: {str(e)}'}), 500
+
+    rows = export_rows(table, after, last, start, end, current_app.config['LEAD_EXPORT_PAGE_ROWS'])
+    lines = csv_lines(table, rows) if export_format == 'csv' else ndjson_lines(table, rows)
+    return current_app.response_class(
+        stream_with_context(lines),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={
+            'Content-Disposition': f'attachment; filename={table.name}.{export_format}',
+            'Cache-Control': 'no-store',
+            # Pass back as ?cursor= to get only the rows added or changed
+            # after this export, with the same table and from/to
+            'X-Next-Cursor': encode_cursor(table.name, max(after, last), start, end),
+        }
+    )
@@ -0,0 +1,65 @@
+import os
+import weakref
+
+from sqlalchemy import event
+
+
+# "default" leaves SQLite as it ships: a rollback journal that blocks readers
+# during a write and an fsync on every commit. "production" is for several
+# gunicorn workers sharing one file. WAL lets reads run alongside the one
+# writer. synchronous=NORMAL syncs the WAL at checkpoints instead of on every
+# commit (a power cut can lose the last commits but not corrupt the file). A
+# writer waits up to busy_timeout ms for the lock instead of failing, and
+# reads come from a 256 MB memory map and a 64 MB page cache per connection.
+SQLITE_PROFILES = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "mmap_size": 256 * 1024 * 1024,
+        # Negative sizes are in KiB
+        "cache_size": -64 * 1024,
+        "temp_store": "MEMORY",
+    },
+}
+
+
+# One fork hook per process, for the engine set up last. Registering one per
+# call would stack a handler, and a strong reference to its engine, for every
+# app created (each test builds one)
+_fork_hook = {"registered": False, "engine": None}
+
+
+def _dispose_in_child():
+    engine = _fork_hook["engine"] and _fork_hook["engine"]()
+    if engine is not None:
+        engine.dispose(close=False)
+
+
+def use_sqlite_profile(engine, name):
+    """Run the profile's PRAGMAs on every connection ``engine`` opens.
+
+    Connections opened before gunicorn forks (create_all with --preload) are
+    dropped in each worker without being closed, so no two processes ever
+    share a SQLite handle; every worker opens its own.
+    """
+    if name not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLite profile {name!r}; expected one of {', '.join(SQLITE_PROFILES)}")
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = SQLITE_PROFILES[name]
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in pragmas.items():
+                cursor.execute(f"PRAGMA {pragma}={value}")
+        finally:
+            cursor.close()
+
+    _fork_hook["engine"] = weakref.ref(engine)
+    if not _fork_hook["registered"] and hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=_dispose_in_child)
+        _fork_hook["registered"] = True
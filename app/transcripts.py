@@ -0,0 +1,123 @@
+"""Convert an uploaded transcript (CSV or XLSX) to German grades as a stream.
+
+The file passes through a pipeline of generators, one chunk of rows at a
+time: the reader parses it, the converter applies the Modified Bavarian
+formula to whole columns at once, and the writer turns each chunk into CSV
+text for the response. Memory therefore stays flat however many rows the
+file has. XLSX files are opened read-only, which streams rows out of the
+workbook instead of loading it.
+"""
+import io
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from .grade_calculator import convert_grade_arrays
+
+
+GRADE_COLUMNS = ("best_grade", "min_passing_grade", "your_grade")
+TRANSCRIPT_FORMATS = (".csv", ".xlsx")
+
+
+class TranscriptError(ValueError):
+    """The upload cannot be converted; raised before any output is produced"""
+
+
+def _read_csv(stream, chunk_rows):
+    # Every cell stays text, so the output repeats the input exactly
+    return pd.read_csv(
+        stream, chunksize=chunk_rows, dtype=str, keep_default_na=False,
+        skipinitialspace=True, encoding="utf-8-sig",
+    )
+
+
+def _read_xlsx(stream, chunk_rows):
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        columns = ["" if name is None else str(name) for name in header]
+        while True:
+            # Worksheets often end in rows that only ever held formatting
+            block = [
+                row[:len(columns)]
+                for row in itertools.islice(rows, chunk_rows)
+                if any(value is not None for value in row)
+            ]
+            if not block:
+                break
+            yield pd.DataFrame.from_records(block, columns=columns)
+    finally:
+        workbook.close()
+
+
+def read_chunks(stream, filename, chunk_rows):
+    """DataFrames of at most ``chunk_rows`` rows, read lazily from the upload"""
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension not in TRANSCRIPT_FORMATS:
+        raise TranscriptError("Upload a .csv or .xlsx file")
+    if extension == ".xlsx":
+        return _read_xlsx(stream, chunk_rows)
+    return _read_csv(stream, chunk_rows)
+
+
+def convert_chunks(chunks, scale):
+    """Add german_grade and error columns to every chunk.
+
+    ``scale`` holds values shared by every row (for example one best and
+    minimum passing grade for a whole transcript) by grade column name.
+    """
+    for chunk in chunks:
+        columns = {str(name).strip().lower(): name for name in chunk.columns}
+        grades = []
+        for field in GRADE_COLUMNS:
+            if field in columns:
+                grades.append(pd.to_numeric(chunk[columns[field]], errors="coerce").to_numpy(dtype=float))
+            else:
+                grades.append(np.full(len(chunk), scale[field]))
+        german, errors = convert_grade_arrays(*grades)
+        yield chunk.assign(german_grade=german, error=errors)
+
+
+def csv_chunks(frames):
+    """CSV bytes, one block per chunk, with the header only on the first"""
+    header = True
+    for frame in frames:
+        buffer = io.StringIO()
+        frame.to_csv(buffer, index=False, header=header)
+        header = False
+        yield buffer.getvalue().encode("utf-8")
+
+
+def convert_transcript(stream, filename, scale=None, chunk_rows=10000):
+    """Converted transcript as an iterator of CSV chunks.
+
+    The first chunk is read up front, so an unreadable file or one missing a
+    grade column raises TranscriptError before anything is sent.
+    """
+    scale = dict(scale or {})
+    for field, value in scale.items():
+        try:
+            scale[field] = float(value)
+        except (TypeError, ValueError):
+            raise TranscriptError(f"{field} must be a number")
+
+    try:
+        chunks = read_chunks(stream, filename, chunk_rows)
+        first = next(chunks, None)
+    except TranscriptError:
+        raise
+    except Exception as e:
+        raise TranscriptError(f"Could not read the file: {str(e)}")
+    if first is None or first.empty:
+        raise TranscriptError("The file has no student rows")
+
+    present = {str(name).strip().lower() for name in first.columns}
+    missing = [field for field in GRADE_COLUMNS if field not in present and field not in scale]
+    if missing:
+        raise TranscriptError(f"Missing column(s): {', '.join(missing)}")
+
+    return csv_chunks(convert_chunks(itertools.chain([first], chunks), scale))
@@ -0,0 +1,97 @@
+"""Benchmark for the bucket budget optimizer (PricingCatalog.optimize).
+
+Builds random catalogs of each size, with prices in steps of 500 like
+bucket_data.json, and times optimize() for budgets at a quarter, half and
+three quarters of the catalog's full price, with and without weights and
+with two must-have buckets. For each catalog size it reports:
+
+  build ms            time to build one catalog
+  p50/p99/max us      time for one optimize() call
+  calls               optimize() calls timed
+
+With ``--check`` every result for catalogs of up to 14 buckets is also
+compared with an exhaustive search.
+
+Usage: python benchmarks/optimizer_bench.py [--sizes N ...] [--catalogs N]
+                                            [--limit N] [--seed N] [--check]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.pricing import PricingCatalog
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def random_catalog(rng, size):
+    return {f"Bucket-{i + 1}": {"cost": rng.randint(1, 100) * 500, "name": f"Bucket {i + 1}"} for i in range(size)}
+
+
+def exhaustive(catalog, budget, must_have, weights, limit):
+    """(score, total) of the best selections, by trying all 2**N of them"""
+    buckets = list(catalog.buckets)
+    required = catalog.mask(must_have)
+    found = []
+    for mask in range(1 << len(buckets)):
+        if mask & required != required:
+            continue
+        selected = [bucket for index, bucket in enumerate(buckets) if mask >> index & 1]
+        total = sum(catalog.buckets[bucket]["cost"] for bucket in selected)
+        if total <= budget:
+            found.append((-round(sum((weights or {}).get(bucket, 1) for bucket in selected), 9), total))
+    return [(-score, total) for score, total in sorted(found)[:limit]]
+
+
+def run(size, catalogs, limit, rng, check):
+    timings, builds, mismatches = [], [], 0
+    for _ in range(catalogs):
+        buckets = random_catalog(rng, size)
+        started = time.perf_counter()
+        catalog = PricingCatalog(buckets)
+        builds.append(time.perf_counter() - started)
+        full_price = sum(entry["cost"] for entry in buckets.values())
+        names = list(buckets)
+        for fraction in (0.25, 0.5, 0.75):
+            for weights in (None, {name: rng.choice([0.5, 1, 2, 3]) for name in names}):
+                for must_have in ((), rng.sample(names, min(2, size))):
+                    budget = int(full_price * fraction)
+                    started = time.perf_counter()
+                    results = catalog.optimize(budget, must_have, weights, limit)
+                    timings.append(time.perf_counter() - started)
+                    if check and size <= 14:
+                        expected = exhaustive(catalog, budget, must_have, weights, limit)
+                        if [(round(score, 9), total) for _, total, score in results] != expected:
+                            mismatches += 1
+    print(f"{size:>7} {percentile(builds, 0.5) * 1e3:>9.2f} {percentile(timings, 0.5) * 1e6:>9.0f} "
+          f"{percentile(timings, 0.99) * 1e6:>9.0f} {max(timings) * 1e6:>9.0f} {len(timings):>7}"
+          + (f" {mismatches:>10}" if check and size <= 14 else ""))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[7, 14, 20, 30, 40, 50])
+    parser.add_argument("--catalogs", type=int, default=50, help="random catalogs per size")
+    parser.add_argument("--limit", type=int, default=5, help="selections returned per call")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--check", action="store_true", help="compare with an exhaustive search (up to 14 buckets)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'buckets':>7} {'build ms':>9} {'p50 us':>9} {'p99 us':>9} {'max us':>9} {'calls':>7}"
+          + (f" {'mismatches':>10}" if args.check else ""))
+    mismatches = sum(run(size, args.catalogs, args.limit, rng, args.check) for size in args.sizes)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
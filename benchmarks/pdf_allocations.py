@@ -0,0 +1,82 @@
+"""Allocation benchmark for building a PDF story.
+
+Builds a custom package report with 50 packages and counts the memory
+blocks that are still alive once the story is complete (right before
+reportlab lays it out), using tracemalloc.
+
+Usage: python benchmarks/pdf_allocations.py [package_count]
+"""
+import contextlib
+import io
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.pdf_generator import _build_custom_package
+
+
+class _StoryProbe:
+    """Stands in for a template layer and snapshots memory once the story is built"""
+
+    background = False
+
+    def __init__(self):
+        self.snapshot = None
+
+    def apply(self, story, avail_width, avail_height):
+        self.snapshot = tracemalloc.take_snapshot()
+        return story
+
+
+def make_packages(count):
+    return [
+        {
+            "name": f"Package {i}",
+            "description": f"Description of package {i}",
+            "features": [f"Feature {i}.{j}" for j in range(5)],
+        }
+        for i in range(count)
+    ]
+
+
+def measure(package_count):
+    user_data = {
+        "name": "Benchmark User",
+        "phone": "9999999999",
+        "email": "bench@example.com",
+        "selected_buckets": ["Bucket-1", "Bucket-2"],
+        "package_details": make_packages(package_count),
+    }
+    # Warm up imports and module-level caches (logo, styles) first
+    with contextlib.redirect_stdout(io.StringIO()):
+        _build_custom_package(user_data, [], 0)
+
+    probe = _StoryProbe()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    with contextlib.redirect_stdout(io.StringIO()):
+        _build_custom_package(user_data, [], 0, probe)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    diff = probe.snapshot.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in diff)
+    size = sum(stat.size_diff for stat in diff)
+    style_blocks = sum(
+        stat.count_diff
+        for stat in diff
+        if stat.traceback[0].filename.endswith(os.path.join("reportlab", "lib", "styles.py"))
+    )
+    return blocks, size, style_blocks, peak
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    blocks, size, style_blocks, peak = measure(count)
+    print(f"Custom package report with {count} packages")
+    print(f"  blocks alive after building the story: {blocks}")
+    print(f"  bytes alive after building the story:  {size}")
+    print(f"  of which ParagraphStyle blocks:        {style_blocks}")
+    print(f"  peak traced memory for the render:     {peak}")
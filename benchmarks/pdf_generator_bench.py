@@ -0,0 +1,281 @@
+"""Benchmark suite for the PDF generators, with a stored baseline.
+
+Times every public function in app/pdf_generator.py over a set of payload
+shapes (0 to 1000 package features, long names, non-ASCII text), with and
+without the template path. For each case it records:
+
+  time_ms     best wall time of ``--repeat`` renders
+  peak_bytes  peak tracemalloc memory of one render
+  pdf_bytes   size of the PDF
+
+The results are compared against benchmarks/pdf_generator_baseline.json.
+The command exits with status 1 when any metric is worse than its baseline
+by more than its tolerance. Wall times depend on the machine, so refresh the
+baseline with ``--update`` on the machine you compare on.
+
+Usage: python benchmarks/pdf_generator_bench.py [--update] [--repeat N]
+                                                [--only SUBSTRING] [--profile NAME]
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import reportlab
+
+from app.pdf_generator import (
+    generate_cost_report_pdf,
+    generate_custom_package_pdf,
+    generate_grade_certificate_pdf,
+    warm_pdf_templates,
+)
+from app.pdf_profiles import PDF_PROFILES, set_pdf_profile
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pdf_generator_baseline.json")
+
+# Allowed growth over the baseline before a metric counts as a regression
+TOLERANCES = {"time_ms": 0.50, "peak_bytes": 0.10, "pdf_bytes": 0.05}
+# Timer and scheduler noise on the fastest cases; smaller slowdowns never fail
+TIME_SLACK_MS = 3.0
+
+USER = {"name": "Benchmark User", "phone": "9999999999", "email": "bench@example.com"}
+LONG_USER = {
+    "name": "Maximiliane Alexandra Konstantina von Hohenzollern-Sigmaringen " * 3,
+    "phone": "+91 98765 43210 ext. 12345",
+    "email": "maximiliane.alexandra.konstantina.hohenzollern@university-example.de",
+}
+NON_ASCII_USER = {"name": "Zoë Ñúñez-Łukasiewicz 张伟", "phone": "+49 030 123456", "email": "zoë@exämple.de"}
+
+EXPENSES = {
+    "total": 1190, "accommodation": 600, "food": 250, "transport": 90,
+    "leisure": 120, "mobile": 30, "miscellaneous": 100,
+}
+GRADES = {"best_grade": "10", "min_passing_grade": "4", "your_grade": "8", "german_grade": "2.0"}
+
+
+def make_packages(feature_count, name="Package", description="Description of package", feature="Feature"):
+    """Seven packages (one per bucket) sharing ``feature_count`` features between them"""
+    packages = [
+        {"name": f"{name} {i}", "description": f"{description} {i}", "features": []}
+        for i in range(7)
+    ]
+    for j in range(feature_count):
+        packages[j % 7]["features"].append(f"{feature} {j}")
+    return packages
+
+
+def package_user(user, packages):
+    buckets = [f"Bucket-{i}" for i in range(1, len(packages) + 1)]
+    return dict(user, selected_buckets=buckets, package_details=packages)
+
+
+def _cost_report(user):
+    return lambda use_template: generate_cost_report_pdf(
+        user, EXPENSES, "Germany", {}, use_template=use_template
+    )
+
+
+def _custom_package(user):
+    return lambda use_template: generate_custom_package_pdf(user, [], 0, use_template=use_template)
+
+
+def _grade_certificate(user, grades=GRADES):
+    return lambda use_template: generate_grade_certificate_pdf(user, grades, use_template=use_template)
+
+
+def build_cases():
+    long_packages = make_packages(
+        10,
+        name="Comprehensive University Application and Admission Support Package",
+        description="End-to-end assistance with shortlisting, documents, statements of purpose, "
+        "recommendation letters and application tracking for every selected university " * 3,
+        feature="Dedicated counsellor session covering document review and interview preparation",
+    )
+    non_ascii_packages = make_packages(
+        10,
+        name="Übersetzung & Beglaubigung",
+        description="Beglaubigte Übersetzungen für Behörden — inkl. Gebühren (€) 日本語",
+        feature="Prüfung ✓ Zeugnisse",
+    )
+    cases = {
+        "cost_report/basic": _cost_report(USER),
+        "cost_report/long_names": _cost_report(LONG_USER),
+        "cost_report/non_ascii": _cost_report(NON_ASCII_USER),
+        "grade_certificate/basic": _grade_certificate(USER),
+        "grade_certificate/non_ascii": _grade_certificate(
+            NON_ASCII_USER, dict(GRADES, your_grade="8,5 ⁄ 10", german_grade="1,7 – sehr gut")
+        ),
+    }
+    for count in (0, 10, 100, 1000):
+        cases[f"custom_package/features_{count}"] = _custom_package(package_user(USER, make_packages(count)))
+    cases["custom_package/long_names"] = _custom_package(package_user(LONG_USER, long_packages))
+    cases["custom_package/non_ascii"] = _custom_package(package_user(NON_ASCII_USER, non_ascii_packages))
+    return cases
+
+
+def measure(render, use_template, repeat):
+    render(use_template)  # warm-up
+
+    # Like timeit, keep the collector from landing in one case's timings
+    times = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            pdf = render(use_template)
+            times.append((time.perf_counter() - start) * 1000)
+    finally:
+        gc.enable()
+
+    # Measured separately: tracing slows the render down
+    tracemalloc.start()
+    render(use_template)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        # The best run is the least disturbed by the rest of the machine
+        "time_ms": round(min(times), 3),
+        "peak_bytes": peak,
+        "pdf_bytes": len(pdf.getvalue()),
+    }
+
+
+def select_cases(only=None):
+    """{case name: (render, use_template)} for every case matching ``only``"""
+    selected = {}
+    for name, render in build_cases().items():
+        for mode, use_template in (("template", True), ("full", False)):
+            case = f"{name}/{mode}"
+            if not only or only in case:
+                selected[case] = (render, use_template)
+    return selected
+
+
+def run(cases, repeat):
+    # One untimed pass over everything, so lazily loaded fonts and modules
+    # are not charged to whichever case happens to run first
+    with contextlib.redirect_stdout(io.StringIO()):
+        for render, use_template in cases.values():
+            render(use_template)
+
+    results = {}
+    for case, (render, use_template) in cases.items():
+        # The custom package report prints debug lines on every render
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[case] = measure(render, use_template, repeat)
+        print(f"  {case:<44}{results[case]['time_ms']:>10.2f} ms", file=sys.stderr)
+    return results
+
+
+def regressed(metric, before, value, tolerances):
+    slack = TIME_SLACK_MS if metric == "time_ms" else 0
+    return value / before - 1 > tolerances[metric] and value - before > slack
+
+
+def find_regressions(results, baseline, tolerances):
+    return {
+        case
+        for case, metrics in results.items()
+        if case in baseline
+        for metric, value in metrics.items()
+        if baseline[case].get(metric) and regressed(metric, baseline[case][metric], value, tolerances)
+    }
+
+
+def compare(results, baseline, tolerances):
+    """Print a comparison table; returns the list of regressions"""
+    regressions = []
+    print(f"{'case':<44}{'metric':<12}{'baseline':>14}{'current':>14}{'change':>9}")
+    for case, metrics in results.items():
+        base = baseline.get(case)
+        if base is None:
+            print(f"{case:<44}(new case, no baseline)")
+            continue
+        for metric, value in metrics.items():
+            before = base.get(metric)
+            if not before:
+                continue
+            flag = ""
+            if regressed(metric, before, value, tolerances):
+                flag = "  REGRESSION"
+                regressions.append((case, metric, before, value))
+            print(f"{case:<44}{metric:<12}{before:>14}{value:>14}{value / before - 1:>+9.1%}{flag}")
+    return regressions
+
+
+def environment(profile):
+    return {
+        "python": platform.python_version(),
+        "reportlab": reportlab.Version,
+        "machine": platform.machine(),
+        "profile": profile,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the PDF generators against a stored baseline")
+    parser.add_argument("--update", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--repeat", type=int, default=10, help="timed renders per case (default 10)")
+    parser.add_argument("--only", help="only run cases whose name contains this text")
+    parser.add_argument("--profile", default="compact", choices=list(PDF_PROFILES), help="PDF output profile")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument(
+        "--time-tolerance", type=float, help=f"allowed slowdown as a fraction (default {TOLERANCES['time_ms']})"
+    )
+    args = parser.parse_args()
+
+    set_pdf_profile(args.profile)
+    with contextlib.redirect_stdout(io.StringIO()):
+        warm_pdf_templates()
+    cases = select_cases(args.only)
+    results = run(cases, args.repeat)
+
+    if args.update:
+        baseline = {"environment": environment(args.profile), "cases": results}
+        if args.only and os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline["cases"] = {**json.load(f)["cases"], **results}
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update first")
+        sys.exit(2)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["environment"].get("profile") != args.profile:
+        print(f"Baseline was recorded with the {baseline['environment'].get('profile')!r} profile")
+        sys.exit(2)
+
+    tolerances = dict(TOLERANCES)
+    if args.time_tolerance is not None:
+        tolerances["time_ms"] = args.time_tolerance
+
+    # A busy machine can slow any single case down; a regression has to
+    # show up again when the case is measured a second time
+    suspects = find_regressions(results, baseline["cases"], tolerances)
+    if suspects:
+        print(f"Re-measuring {len(suspects)} case(s) over tolerance", file=sys.stderr)
+        retry = run({case: cases[case] for case in suspects}, args.repeat * 2)
+        for case, metrics in retry.items():
+            results[case] = {metric: min(value, results[case][metric]) for metric, value in metrics.items()}
+
+    regressions = compare(results, baseline["cases"], tolerances)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond tolerance {tolerances}")
+        sys.exit(1)
+    print("\nNo regressions")
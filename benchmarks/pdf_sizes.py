@@ -0,0 +1,66 @@
+"""Output size benchmark for the three PDF templates.
+
+Renders every template with representative data under each output profile
+and prints the size of the PDF, so the effect of a profile (or of a template
+change) on download size is visible per template.
+
+Usage: python benchmarks/pdf_sizes.py [package_count]
+"""
+import contextlib
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.pdf_generator import (
+    generate_cost_report_pdf,
+    generate_custom_package_pdf,
+    generate_grade_certificate_pdf,
+)
+from app.pdf_profiles import PDF_PROFILES, set_pdf_profile
+
+
+USER = {"name": "Benchmark User", "phone": "9999999999", "email": "bench@example.com"}
+
+
+def make_packages(count):
+    return [
+        {
+            "name": f"Package {i}",
+            "description": f"Description of package {i}",
+            "features": [f"Feature {i}.{j}" for j in range(5)],
+        }
+        for i in range(count)
+    ]
+
+
+def render_all(package_count):
+    expenses = {
+        "total": 1190, "accommodation": 600, "food": 250, "transport": 90,
+        "leisure": 120, "mobile": 30, "miscellaneous": 100,
+    }
+    grades = {"best_grade": "10", "min_passing_grade": "4", "your_grade": "8", "german_grade": "2.0"}
+    user = dict(USER, selected_buckets=["Bucket-1", "Bucket-2"], package_details=make_packages(package_count))
+    with contextlib.redirect_stdout(io.StringIO()):
+        return {
+            "cost_report": len(generate_cost_report_pdf(USER, expenses, "Germany", {}).getvalue()),
+            "custom_package": len(generate_custom_package_pdf(user, [], 0).getvalue()),
+            "grade_certificate": len(generate_grade_certificate_pdf(USER, grades).getvalue()),
+        }
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    sizes = {}
+    for profile in PDF_PROFILES:
+        set_pdf_profile(profile)
+        sizes[profile] = render_all(count)
+
+    profiles = list(PDF_PROFILES)
+    print(f"PDF size in bytes (custom package with {count} packages)")
+    print(f"  {'template':<20}" + "".join(f"{p:>12}" for p in profiles) + f"{'saving':>10}")
+    for template in sizes[profiles[0]]:
+        row = [sizes[p][template] for p in profiles]
+        saving = 1 - row[-1] / row[0]
+        print(f"  {template:<20}" + "".join(f"{size:>12}" for size in row) + f"{saving:>10.0%}")
@@ -0,0 +1,145 @@
+"""Multi-process write/read benchmark for the SQLite profiles.
+
+Writer processes insert leads into the real user_submission table, one row
+per transaction (what a lead endpoint did before the lead buffer), while
+reader processes fetch the newest leads. Every process opens its own engine
+with the profile's PRAGMAs, as a gunicorn worker does. For each profile it
+reports:
+
+  writes/s, reads/s   committed transactions per second, all processes
+  write p50/p99 ms    time from BEGIN to COMMIT, mostly spent waiting for
+                      the database lock
+  read p99 ms         time for one read
+  errors              "database is locked" and other failed transactions
+
+Without ``--rate`` every process runs as fast as it can, which measures
+throughput; with it the processes offer the same load to every profile,
+which makes the waits comparable.
+
+Usage: python benchmarks/sqlite_bench.py [--writers N] [--readers N] [--seconds S]
+                                         [--rate PER_SECOND] [--profile NAME ...]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.exc import OperationalError
+
+from app.models import UserSubmission
+from app.sqlite_profile import SQLITE_PROFILES, use_sqlite_profile
+
+
+TABLE = UserSubmission.__table__
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_client(url, profile, role, start, seconds, rate, results):
+    engine = create_engine(url)
+    use_sqlite_profile(engine, profile)
+    timings, errors = [], 0
+    query = select(TABLE).order_by(TABLE.c.id.desc()).limit(20)
+    while time.time() < start:
+        time.sleep(0.001)
+    end = start + seconds
+    number = 0
+    while time.time() < end:
+        if rate:
+            # Open loop: the same offered load whatever the profile manages
+            pause = start + number / rate - time.time()
+            if pause > 0:
+                time.sleep(pause)
+        t = time.perf_counter()
+        try:
+            with engine.begin() as connection:
+                if role == "writer":
+                    connection.execute(insert(TABLE), {
+                        "name": f"Bench {os.getpid()} {number}", "phone": f"9{number:09d}",
+                        "emailid": "bench@example.com", "intent": "benchmark",
+                    })
+                else:
+                    connection.execute(query).fetchall()
+        except OperationalError:
+            errors += 1
+        else:
+            timings.append(time.perf_counter() - t)
+        number += 1
+    engine.dispose()
+    results.put((role, timings, errors))
+
+
+def run_profile(profile, writers, readers, seconds, rate):
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        engine = create_engine(url)
+        use_sqlite_profile(engine, profile)
+        TABLE.create(engine)
+        engine.dispose()
+
+        results = multiprocessing.Queue()
+        start = time.time() + 1
+        roles = ["writer"] * writers + ["reader"] * readers
+        processes = [
+            multiprocessing.Process(target=run_client, args=(url, profile, role, start, seconds, rate, results))
+            for role in roles
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        engine = create_engine(url)
+        with engine.connect() as connection:
+            rows = connection.execute(select(func.count()).select_from(TABLE)).scalar()
+        engine.dispose()
+
+    writes = [t for role, timings, _ in collected if role == "writer" for t in timings]
+    reads = [t for role, timings, _ in collected if role == "reader" for t in timings]
+    return {
+        "writes/s": len(writes) / seconds,
+        "reads/s": len(reads) / seconds,
+        "write p50 ms": percentile(writes, 0.50) * 1000,
+        "write p99 ms": percentile(writes, 0.99) * 1000,
+        "read p99 ms": percentile(reads, 0.99) * 1000,
+        "errors": sum(errors for _, _, errors in collected),
+        "rows": rows,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark concurrent SQLite writes and reads per profile")
+    parser.add_argument("--writers", type=int, default=4, help="writer processes (default 4)")
+    parser.add_argument("--readers", type=int, default=4, help="reader processes (default 4)")
+    parser.add_argument("--seconds", type=float, default=5, help="length of each run (default 5)")
+    parser.add_argument(
+        "--rate", type=float, default=0,
+        help="transactions per second per process (default 0: as fast as possible)"
+    )
+    parser.add_argument(
+        "--profile", nargs="+", default=list(SQLITE_PROFILES), choices=list(SQLITE_PROFILES),
+        help="profiles to compare (default all)"
+    )
+    args = parser.parse_args()
+
+    columns = ["writes/s", "reads/s", "write p50 ms", "write p99 ms", "read p99 ms", "errors", "rows"]
+    load = f"{args.rate:g}/s each" if args.rate else "unthrottled"
+    print(f"{args.writers} writers, {args.readers} readers ({load}), {args.seconds:g} s per profile")
+    print(f"{'profile':<12}" + "".join(f"{name:>14}" for name in columns))
+    for profile in args.profile:
+        result = run_profile(profile, args.writers, args.readers, args.seconds, args.rate)
+        print(f"{profile:<12}" + "".join(
+            f"{result[name]:>14.1f}" if isinstance(result[name], float) else f"{result[name]:>14}"
+            for name in columns
+        ))
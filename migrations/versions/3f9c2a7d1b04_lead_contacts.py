@@ -0,0 +1,211 @@
+"""Lead timestamps, indexes and contacts
+
+Revision ID: 3f9c2a7d1b04
+Revises:
+Create Date: 2026-10-17 10:12:41.305112
+
+The first revision. Before it the schema came from db.create_all(), which
+still creates missing tables at startup, so a database may already hold
+some or all of what this adds; every step checks first. Existing leads get
+their contact key, contact and event here, in batches of BATCH_ROWS.
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d1b04'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# Lead tables and the name of their email column
+LEAD_TABLES = {
+    'user_submission': 'emailid',
+    'report_submission': 'emailid',
+    'request_call_back': None,
+    'grade_user_submission': 'email',
+}
+BATCH_ROWS = 5000
+KEY_CHUNK = 500
+
+
+def contact_key(phone, email):
+    # app.contacts.contact_key as of this revision
+    digits = re.sub(r"\D", "", str(phone or ""))
+    if len(digits) >= 7:
+        return f"phone:{digits[-10:]}"
+    email = str(email or "").strip().lower()
+    if "@" in email:
+        return f"email:{email}"
+    return None
+
+
+def create_missing_tables(tables):
+    if 'user_submission' not in tables:
+        op.create_table(
+            'user_submission',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=200), nullable=False),
+            sa.Column('phone', sa.String(length=20), nullable=False),
+            sa.Column('emailid', sa.String(length=255), nullable=True),
+            sa.Column('intent', sa.String(length=200), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    if 'report_submission' not in tables:
+        op.create_table(
+            'report_submission',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=200), nullable=False),
+            sa.Column('phone', sa.String(length=20), nullable=False),
+            sa.Column('emailid', sa.String(length=200), nullable=True),
+            sa.Column('intent', sa.String(length=200), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    if 'request_call_back' not in tables:
+        op.create_table(
+            'request_call_back',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=200), nullable=False),
+            sa.Column('phone', sa.String(length=200), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    if 'grade_user_submission' not in tables:
+        op.create_table(
+            'grade_user_submission',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=200), nullable=False),
+            sa.Column('email', sa.String(length=255), nullable=False),
+            sa.Column('phone', sa.String(length=20), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    if 'lead_batch' not in tables:
+        op.create_table(
+            'lead_batch',
+            sa.Column('segment', sa.String(length=100), nullable=False),
+            sa.PrimaryKeyConstraint('segment'),
+        )
+    if 'contact' not in tables:
+        op.create_table(
+            'contact',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('contact_key', sa.String(length=255), nullable=False),
+            sa.Column('name', sa.String(length=200), nullable=True),
+            sa.Column('phone', sa.String(length=200), nullable=True),
+            sa.Column('email', sa.String(length=255), nullable=True),
+            sa.Column('first_seen_at', sa.DateTime(), nullable=True),
+            sa.Column('last_seen_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('contact_key'),
+        )
+    if 'lead_event' not in tables:
+        op.create_table(
+            'lead_event',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('contact_id', sa.Integer(), nullable=False),
+            sa.Column('source', sa.String(length=50), nullable=False),
+            sa.Column('intent', sa.String(length=200), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['contact_id'], ['contact.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+
+
+def create_missing_indexes(inspector):
+    wanted = {
+        'contact': [('ix_contact_phone', ['phone']), ('ix_contact_email', ['email']),
+                    ('ix_contact_last_seen_at', ['last_seen_at'])],
+        'lead_event': [('ix_lead_event_created_at', ['created_at']),
+                       ('ix_lead_event_contact_id_created_at', ['contact_id', 'created_at'])],
+    }
+    for table, email in LEAD_TABLES.items():
+        columns = ['phone', 'contact_key', 'created_at'] + ([email] if email else [])
+        wanted[table] = [(f'ix_{table}_{column}', [column]) for column in columns]
+    for table, indexes in wanted.items():
+        existing = {index['name'] for index in inspector.get_indexes(table)}
+        for name, columns in indexes:
+            if name not in existing:
+                op.create_index(name, table, columns)
+
+
+def backfill_contacts(bind, table, email):
+    """Key, contact and event for every lead written before this revision"""
+    columns = {column['name'] for column in sa.inspect(bind).get_columns(table)}
+    email_column = email or 'NULL'
+    intent_column = 'intent' if 'intent' in columns else 'NULL'
+    upsert = sa.text(
+        "INSERT INTO contact (contact_key, name, phone, email, first_seen_at, last_seen_at) "
+        "VALUES (:key, :name, :phone, :email, :created_at, :created_at) "
+        "ON CONFLICT (contact_key) DO UPDATE SET name = excluded.name, phone = excluded.phone, "
+        "email = coalesce(excluded.email, contact.email)"
+    )
+    after = 0
+    while True:
+        rows = bind.execute(sa.text(
+            f"SELECT id, name, phone, {email_column}, {intent_column}, created_at FROM {table} "
+            f"WHERE contact_key IS NULL AND id > :after ORDER BY id LIMIT :limit"
+        ), {'after': after, 'limit': BATCH_ROWS}).all()
+        if not rows:
+            break
+        after = rows[-1][0]
+        leads = []
+        for id_, name, phone, email_value, intent, created_at in rows:
+            key = contact_key(phone, email_value)
+            if key:
+                leads.append({'id': id_, 'key': key, 'name': name, 'phone': phone, 'email': email_value,
+                              'intent': intent, 'created_at': created_at})
+        if not leads:
+            continue
+        bind.execute(sa.text(f"UPDATE {table} SET contact_key = :key WHERE id = :id"), leads)
+        bind.execute(upsert, leads)
+        keys = list({lead['key'] for lead in leads})
+        ids = {}
+        for start in range(0, len(keys), KEY_CHUNK):
+            chunk = keys[start:start + KEY_CHUNK]
+            ids.update(bind.execute(
+                sa.text("SELECT contact_key, id FROM contact WHERE contact_key IN :keys")
+                .bindparams(sa.bindparam('keys', expanding=True)),
+                {'keys': chunk},
+            ).all())
+        bind.execute(
+            sa.text("INSERT INTO lead_event (contact_id, source, intent, created_at) "
+                    "VALUES (:contact_id, :source, :intent, :created_at)"),
+            [{'contact_id': ids[lead['key']], 'source': table, 'intent': lead['intent'],
+              'created_at': lead['created_at']} for lead in leads],
+        )
+
+
+def upgrade():
+    bind = op.get_bind()
+    create_missing_tables(set(sa.inspect(bind).get_table_names()))
+
+    inspector = sa.inspect(bind)
+    for table in LEAD_TABLES:
+        columns = {column['name'] for column in inspector.get_columns(table)}
+        # ALTER TABLE ADD COLUMN, no table copy; SQLite only allows constant
+        # defaults here, so older rows keep a NULL created_at
+        if 'contact_key' not in columns:
+            op.add_column(table, sa.Column('contact_key', sa.String(length=255), nullable=True))
+        if 'created_at' not in columns:
+            op.add_column(table, sa.Column('created_at', sa.DateTime(), nullable=True))
+
+    create_missing_indexes(sa.inspect(bind))
+    for table, email in LEAD_TABLES.items():
+        backfill_contacts(bind, table, email)
+
+
+def downgrade():
+    op.drop_table('lead_event')
+    op.drop_table('contact')
+    op.drop_table('lead_batch')
+    for table, email in LEAD_TABLES.items():
+        columns = ['phone', 'contact_key', 'created_at'] + ([email] if email else [])
+        for column in columns:
+            op.drop_index(f'ix_{table}_{column}', table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('created_at')
+            batch_op.drop_column('contact_key')
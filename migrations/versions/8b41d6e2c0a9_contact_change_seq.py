@@ -0,0 +1,41 @@
+"""Contact change counter
+
+Revision ID: 8b41d6e2c0a9
+Revises: 3f9c2a7d1b04
+Create Date: 2026-10-17 21:04:18.542630
+
+Contacts are updated in place when someone submits again, which an id
+cursor never sees. change_seq is renumbered on every insert and update, and
+the lead export pages on it. Existing contacts are numbered in id order,
+above any number db.create_all() or the previous revision left behind.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b41d6e2c0a9'
+down_revision = '3f9c2a7d1b04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if 'change_seq' not in {column['name'] for column in inspector.get_columns('contact')}:
+        op.add_column('contact', sa.Column('change_seq', sa.Integer(), nullable=True))
+    if 'ix_contact_change_seq' not in {index['name'] for index in inspector.get_indexes('contact')}:
+        op.create_index('ix_contact_change_seq', 'contact', ['change_seq'], unique=True)
+    # The subquery does not depend on the row, so SQLite runs it once
+    bind.execute(sa.text(
+        "UPDATE contact SET change_seq = id + (SELECT coalesce(max(change_seq), 0) FROM contact) "
+        "WHERE change_seq IS NULL"
+    ))
+
+
+def downgrade():
+    op.drop_index('ix_contact_change_seq', table_name='contact')
+    with op.batch_alter_table('contact') as batch_op:
+        batch_op.drop_column('change_seq')
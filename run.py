@@ -1,6 +1,7 @@
 from app import create_app
 
-app = create_app()
-
+# Guarded: the spawn-based render pool imports this script in every worker,
+# which must not start the app
 if __name__ == '__main__':
+    app = create_app()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -1,5 +1,7 @@
 import requests
 import json
+import os
+import time
 
 BASE_URL = 'http://localhost:5000/api'
 
@@ -28,6 +30,69 @@ def test_grade_calculator():
         print(f"Grade Calculator Failed: {e}")
         return False
 
+def test_grade_scales():
+    """Test the named grade scales and the reverse conversion"""
+    try:
+        response = requests.post(f'{BASE_URL}/grade-calculator/calculate', json={"scale": "cgpa_10", "your_grade": "8"})
+        print(f"Scale Conversion: {response.status_code} - {response.json()}")
+        reverse = requests.post(f'{BASE_URL}/grade-calculator/required-grade', json={"scale": "cgpa_10", "german_grade": "2.0"})
+        print(f"Required Grade: {reverse.status_code} - {reverse.json()}")
+        return response.status_code == 200 and reverse.status_code == 200 and reverse.json()['your_grade'] <= 8
+    except Exception as e:
+        print(f"Grade Scales Failed: {e}")
+        return False
+
+def test_grade_batch_calculator():
+    """Test the bulk grade conversion endpoint"""
+    try:
+        data = {
+            "best_grade": "10",
+            "min_passing_grade": "4",
+            "your_grades": ["8", "6.5", "not a grade"]
+        }
+        response = requests.post(f'{BASE_URL}/grade-calculator/calculate-batch', json=data)
+        print(f"Grade Batch Calculator: {response.status_code} - {response.json()}")
+        results = response.json().get('results', [])
+        return response.status_code == 200 and len(results) == 3 and 'error' in results[2]
+    except Exception as e:
+        print(f"Grade Batch Calculator Failed: {e}")
+        return False
+
+def test_non_finite_grades():
+    """Test that NaN and infinite grades are rejected as non-numeric input"""
+    try:
+        statuses = []
+        for value in ("nan", "inf", "-inf"):
+            response = requests.post(f'{BASE_URL}/grade-calculator/calculate',
+                                     json={"best_grade": "10", "min_passing_grade": "4", "your_grade": value})
+            statuses.append(response.status_code)
+        reverse = requests.post(f'{BASE_URL}/grade-calculator/required-grade',
+                                json={"best_grade": "inf", "min_passing_grade": "4", "german_grade": "2.0"})
+        student = {"name": "Test Student", "email": "student@example.com", "phone": "1234567890",
+                   "best_grade": "10", "min_passing_grade": "4", "your_grade": "nan"}
+        batch = requests.post(f'{BASE_URL}/grade-calculator/download-batch', json={"students": [student]})
+        print(f"Non-Finite Grades: {statuses} - {reverse.status_code} - {batch.status_code} {batch.json()}")
+        return statuses == [400, 400, 400] and reverse.status_code == 400 and batch.status_code == 400
+    except Exception as e:
+        print(f"Non-Finite Grades Failed: {e}")
+        return False
+
+def test_transcript_conversion():
+    """Test the streaming transcript conversion endpoint"""
+    try:
+        transcript = "student,your_grade\nA,8\nB,6.5\nC,absent\n"
+        response = requests.post(
+            f'{BASE_URL}/grade-calculator/convert-transcript',
+            files={"file": ("transcript.csv", transcript, "text/csv")},
+            data={"best_grade": "10", "min_passing_grade": "4"}
+        )
+        lines = response.text.strip().splitlines()
+        print(f"Transcript Conversion: {response.status_code} - {lines}")
+        return response.status_code == 200 and len(lines) == 4 and lines[1].startswith("A,8,2.0")
+    except Exception as e:
+        print(f"Transcript Conversion Failed: {e}")
+        return False
+
 def test_cost_calculator():
     """Test the cost calculator endpoint"""
     try:
@@ -36,11 +101,69 @@ def test_cost_calculator():
         }
         response = requests.post(f'{BASE_URL}/cost-calculator/calculate', json=data)
         print(f"Cost Calculator: {response.status_code} - {response.json()}")
-        return response.status_code == 200
+        return response.status_code == 200 and 'catalog_version' in response.json()
     except Exception as e:
         print(f"Cost Calculator Failed: {e}")
         return False
 
+def test_cost_scenarios():
+    """Test pricing several bucket selections in one request"""
+    try:
+        data = {
+            "scenarios": [["Bucket-1", "Bucket-2"], ["Bucket-1", "Bucket-2", "Bucket-5"]]
+        }
+        response = requests.post(f'{BASE_URL}/cost-calculator/evaluate', json=data)
+        print(f"Cost Scenarios: {response.status_code} - {response.json()}")
+        scenarios = response.json().get('scenarios', [])
+        return response.status_code == 200 and len(scenarios) == 2 and scenarios[1]['added_buckets'] == ["Bucket-5"]
+    except Exception as e:
+        print(f"Cost Scenarios Failed: {e}")
+        return False
+
+def test_cost_optimizer():
+    """Test the budget optimizer for bucket selections"""
+    try:
+        data = {
+            "budget": 200000,
+            "must_have": ["Bucket-1"],
+            "weights": {"Bucket-5": 3}
+        }
+        response = requests.post(f'{BASE_URL}/cost-calculator/optimize', json=data)
+        print(f"Cost Optimizer: {response.status_code} - {response.json()}")
+        combinations = response.json().get('combinations', [])
+        return (
+            response.status_code == 200 and combinations
+            and all("Bucket-1" in c['selected_buckets'] and c['total_cost'] <= 200000 for c in combinations)
+        )
+    except Exception as e:
+        print(f"Cost Optimizer Failed: {e}")
+        return False
+
+def test_living_costs():
+    """Test the living-cost dataset (if enabled) and the cost report's fallback to the client's figures"""
+    try:
+        dataset = requests.get(f'{BASE_URL}/cost-calculator/living-costs')
+        print(f"Living Costs: {dataset.status_code} - {dataset.json()}")
+        unknown = requests.post(f'{BASE_URL}/cost-calculator/living-costs', json={"country": "Atlantis"})
+        print(f"Unknown Country: {unknown.status_code} - {unknown.json()}")
+        data = {
+            "name": "Test User",
+            "email": "test@example.com",
+            "phone": "1234567890",
+            "selectedCountry": "USA",
+            "answers": {"accommodation": "Shared Apartment"},
+            "expenses": {"accommodation": 1200, "food": 400, "total": 1600}
+        }
+        report = requests.post(f'{BASE_URL}/cost-calculator/download-pdf', json=data)
+        print(f"Cost Report Outside The Dataset: {report.status_code} - {len(report.content)} bytes")
+        # 404 while LIVING_COSTS_ENABLED is off
+        if dataset.status_code == 404:
+            return unknown.status_code == 404 and report.status_code == 200
+        return dataset.status_code == 200 and unknown.status_code == 400 and report.status_code == 200
+    except Exception as e:
+        print(f"Living Costs Failed: {e}")
+        return False
+
 def test_user_details():
     """Test storing user details"""
     try:
@@ -56,6 +179,121 @@ def test_user_details():
         print(f"User Details Failed: {e}")
         return False
 
+def test_pdf_job():
+    """Test the async PDF job endpoints"""
+    try:
+        data = {
+            "name": "Test User",
+            "email": "test@example.com",
+            "phone": "1234567890",
+            "best_grade": "10",
+            "min_passing_grade": "4",
+            "your_grade": "8",
+            "german_grade": "2.0"
+        }
+        response = requests.post(f'{BASE_URL}/grade-calculator/pdf-jobs', json=data)
+        print(f"PDF Job: {response.status_code} - {response.json()}")
+        job_id = response.json()['job_id']
+        for _ in range(30):
+            status = requests.get(f'{BASE_URL}/pdf-jobs/{job_id}').json()
+            if status['status'] != 'pending':
+                break
+            time.sleep(1)
+        print(f"PDF Job Status: {status}")
+        response = requests.get(f'{BASE_URL}/pdf-jobs/{job_id}/pdf')
+        return response.status_code == 200 and response.content.startswith(b'%PDF')
+    except Exception as e:
+        print(f"PDF Job Failed: {e}")
+        return False
+
+def test_pdf_cache():
+    """Test that a repeated PDF download is refused by its ETag (412 on POST)"""
+    try:
+        data = {
+            "name": "Test User",
+            "email": "test@example.com",
+            "phone": "1234567890",
+            "best_grade": "10",
+            "min_passing_grade": "4",
+            "your_grade": "8",
+            "german_grade": "2.0"
+        }
+        response = requests.post(f'{BASE_URL}/grade-calculator/download-pdf', json=data)
+        etag = response.headers.get('ETag')
+        print(f"PDF Download: {response.status_code} - ETag {etag}")
+        response = requests.post(
+            f'{BASE_URL}/grade-calculator/download-pdf', json=data, headers={'If-None-Match': etag}
+        )
+        print(f"PDF Revalidation: {response.status_code}")
+        print(f"PDF Cache Stats: {requests.get(f'{BASE_URL}/pdf-cache/stats').json()}")
+        return response.status_code == 412
+    except Exception as e:
+        print(f"PDF Cache Failed: {e}")
+        return False
+
+def test_grade_batch():
+    """Test the cohort certificate ZIP endpoint"""
+    try:
+        students = [
+            {
+                "name": f"Test Student {i}",
+                "email": f"student{i}@example.com",
+                "phone": f"12345678{i:02d}",
+                "best_grade": "10",
+                "min_passing_grade": "4",
+                "your_grade": str(5 + i % 5)
+            }
+            for i in range(5)
+        ]
+        response = requests.post(f'{BASE_URL}/grade-calculator/download-batch', json={"students": students})
+        print(f"Grade Batch: {response.status_code} - {len(response.content)} bytes")
+        return response.status_code == 200 and response.content.startswith(b'PK')
+    except Exception as e:
+        print(f"Grade Batch Failed: {e}")
+        return False
+
+def test_custom_package_limits():
+    """Test a multi-page custom package and the package limits"""
+    try:
+        data = {
+            "name": "Test User",
+            "email": "test@example.com",
+            "phone": "1234567890",
+            "selected_buckets": ["Bucket-1", "Bucket-3"],
+            "package_details": [
+                {"name": f"Package {i}", "description": "Test package", "features": [f"Feature {j}" for j in range(30)]}
+                for i in range(5)
+            ]
+        }
+        response = requests.post(f'{BASE_URL}/cost-calculator/download-custom-package-pdf', json=data)
+        print(f"Long Custom Package: {response.status_code} - {len(response.content)} bytes")
+        too_large = dict(data, package_details=data["package_details"] * 5)
+        limited = requests.post(f'{BASE_URL}/cost-calculator/download-custom-package-pdf', json=too_large)
+        print(f"Oversized Custom Package: {limited.status_code} - {limited.json()}")
+        return response.status_code == 200 and limited.status_code == 413
+    except Exception as e:
+        print(f"Custom Package Limits Failed: {e}")
+        return False
+
+def test_lead_export():
+    """Test the authenticated lead export (set LEAD_EXPORT_TOKEN to the server's token)"""
+    try:
+        token = os.environ.get('LEAD_EXPORT_TOKEN')
+        unauthorized = requests.get(f'{BASE_URL}/leads/export')
+        print(f"Lead Export Without Token: {unauthorized.status_code}")
+        if not token:
+            return unauthorized.status_code in (401, 404)
+        headers = {'Authorization': f'Bearer {token}'}
+        response = requests.get(f'{BASE_URL}/leads/export', params={'format': 'ndjson'}, headers=headers)
+        cursor = response.headers.get('X-Next-Cursor')
+        print(f"Lead Export: {response.status_code} - {len(response.text.splitlines())} rows, next cursor {cursor}")
+        incremental = requests.get(f'{BASE_URL}/leads/export', params={'cursor': cursor}, headers=headers)
+        print(f"Incremental Lead Export: {incremental.status_code} - {incremental.text.splitlines()[:1]}")
+        return unauthorized.status_code == 401 and response.status_code == 200 and incremental.status_code == 200
+    except Exception as e:
+        print(f"Lead Export Failed: {e}")
+        return False
+
 def main():
     print("Testing Unified Study Calculator Backend...")
     print("=" * 50)
@@ -63,8 +301,20 @@ def main():
     tests = [
         ("Health Check", test_health_check),
         ("Grade Calculator", test_grade_calculator),
+        ("Grade Scales", test_grade_scales),
+        ("Grade Batch Calculator", test_grade_batch_calculator),
+        ("Non-Finite Grades", test_non_finite_grades),
+        ("Transcript Conversion", test_transcript_conversion),
         ("Cost Calculator", test_cost_calculator),
-        ("User Details", test_user_details)
+        ("Cost Scenarios", test_cost_scenarios),
+        ("Cost Optimizer", test_cost_optimizer),
+        ("Living Costs", test_living_costs),
+        ("User Details", test_user_details),
+        ("PDF Job", test_pdf_job),
+        ("PDF Cache", test_pdf_cache),
+        ("Grade Batch", test_grade_batch),
+        ("Custom Package Limits", test_custom_package_limits),
+        ("Lead Export", test_lead_export)
     ]
     
     passed = 0
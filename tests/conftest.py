@@ -0,0 +1,24 @@
+import pytest
+
+from app import create_app, db
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The app on a fresh SQLite database, storing leads inside each request"""
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setenv("LEAD_BUFFER_DIR", str(tmp_path / "lead_buffer"))
+    monkeypatch.setenv("LEAD_FLUSH_INTERVAL_MS", "0")
+    monkeypatch.setenv("PDF_RENDER_WORKERS", "0")
+    monkeypatch.setenv("PDF_CACHE_DIR", str(tmp_path / "pdf_cache"))
+    monkeypatch.setenv("PDF_JOB_DIR", str(tmp_path / "pdf_jobs"))
+    app = create_app()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
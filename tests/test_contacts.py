@@ -0,0 +1,38 @@
+"""Contact deduplication across lead tables, and the startup schema check"""
+import sqlite3
+
+import pytest
+
+from app import create_app, db
+from app.lead_buffer import store_lead
+from app.models import Contact, GradeUserSubmission, LeadEvent, ReportSubmission, UserSubmission
+
+
+def test_same_phone_or_email_is_one_contact(app):
+    with app.app_context():
+        store_lead(UserSubmission, name="Priya", phone="+91 98765 43210", emailid="Priya@Example.com",
+                   intent="cost report")
+        store_lead(GradeUserSubmission, name="Priya S", phone="098765 43210", email="priya@example.com")
+        # No usable phone number, so these two match on the email alone
+        store_lead(ReportSubmission, name="Arjun", phone="n/a", emailid="Arjun@Example.com ")
+        store_lead(ReportSubmission, name="Arjun", phone="", emailid=" arjun@example.COM")
+
+        contacts = db.session.execute(db.select(Contact).order_by(Contact.id)).scalars().all()
+        assert [contact.contact_key for contact in contacts] == ["phone:9876543210", "email:arjun@example.com"]
+        assert contacts[0].name == "Priya S"
+        for contact in contacts:
+            assert db.session.query(LeadEvent).filter_by(contact_id=contact.id).count() == 2
+        assert [event.source for event in contacts[0].events] == ["user_submission", "grade_user_submission"]
+
+
+def test_refuses_to_start_before_upgrade(tmp_path, monkeypatch):
+    # A lead table as it was before the first revision
+    path = tmp_path / "old.db"
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE request_call_back (id INTEGER PRIMARY KEY, name VARCHAR(200) NOT NULL, "
+                           "phone VARCHAR(200) NOT NULL)")
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{path}")
+    monkeypatch.setenv("LEAD_BUFFER_DIR", str(tmp_path / "lead_buffer"))
+    monkeypatch.setenv("PDF_RENDER_WORKERS", "0")
+    with pytest.raises(RuntimeError, match="request_call_back.contact_key"):
+        create_app()
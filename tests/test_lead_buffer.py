@@ -0,0 +1,101 @@
+"""The write-behind lead buffer: flushing, retrying, replaying and recovering segments"""
+import json
+import os
+import shutil
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app import lead_buffer
+from app.lead_buffer import LeadBuffer, _open_segment, ingest_segment, lead_row, recover_leads
+from app.models import Contact, LeadBatch, UserSubmission, utc_now
+
+pytestmark = pytest.mark.skipif(lead_buffer.fcntl is None, reason="the lead buffer needs fcntl")
+
+
+def lead(name, phone):
+    row = lead_row(UserSubmission, {"name": name, "phone": phone, "emailid": None, "intent": "cost report"})
+    row["created_at"] = utc_now()
+    return row
+
+
+def counts(app):
+    with app.app_context():
+        return db.session.query(UserSubmission).count(), db.session.query(Contact).count()
+
+
+def segments(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".jsonl"))
+
+
+@pytest.fixture
+def buffer(app, tmp_path):
+    # Flushed only when a test asks
+    return LeadBuffer(app, str(tmp_path / "segments"), interval=3600, batch_rows=1000)
+
+
+def test_flush(app, buffer):
+    buffer.append(UserSubmission, [lead("Priya", "98765 43210"), lead("Arjun", "91234 56789")])
+    assert len(segments(buffer.directory)) == 1
+    assert counts(app) == (0, 0)
+
+    buffer.flush()
+    assert counts(app) == (2, 2)
+    assert segments(buffer.directory) == []
+    with app.app_context():
+        assert db.session.query(LeadBatch).count() == 1
+
+
+def test_database_failure_keeps_segment_for_retry(app, buffer, monkeypatch):
+    def locked(model, rows):
+        raise OperationalError("INSERT INTO user_submission", {}, Exception("database is locked"))
+
+    buffer.append(UserSubmission, [lead("Priya", "98765 43210")])
+    monkeypatch.setattr(lead_buffer, "insert_leads", locked)
+    buffer.flush()
+    assert counts(app) == (0, 0)
+    assert len(buffer._ready) == 1
+    assert segments(buffer.directory) == [os.path.basename(buffer._ready[0][0])]
+
+    monkeypatch.undo()
+    buffer.flush()
+    assert counts(app) == (1, 1)
+    assert buffer._ready == []
+    assert segments(buffer.directory) == []
+
+
+def test_replay_after_commit_inserts_nothing(app, buffer, tmp_path):
+    buffer.append(UserSubmission, [lead("Priya", "98765 43210")])
+    path = os.path.join(buffer.directory, segments(buffer.directory)[0])
+    shutil.copy(path, tmp_path / "copy")
+    buffer.flush()
+    assert counts(app) == (1, 1)
+
+    # As if the worker died after the commit but before deleting the file
+    shutil.copy(tmp_path / "copy", path)
+    with app.app_context():
+        assert ingest_segment(path)
+    assert counts(app) == (1, 1)
+    # Skipped, not rejected
+    assert os.listdir(buffer.directory) == []
+
+
+def test_recover_orphaned_segments(app, tmp_path):
+    directory = tmp_path / "lead_buffer"
+    directory.mkdir(exist_ok=True)
+    app.config["LEAD_BUFFER_DIR"] = str(directory)
+    # Left behind by a worker that died, so nobody holds its lock
+    with open(directory / "1234-orphan.jsonl", "w", encoding="utf-8") as f:
+        row = lead("Priya", "98765 43210")
+        f.write(json.dumps({"model": "UserSubmission", "row": row}, default=lambda value: value.isoformat()) + "\n")
+        # Cut short by the crash
+        f.write('{"model": "UserSub')
+    # Still being written by a live worker
+    live_path, live_fd = _open_segment(str(directory))
+    try:
+        assert recover_leads(app) == 1
+        assert counts(app) == (1, 1)
+        assert segments(directory) == [os.path.basename(live_path)]
+    finally:
+        os.close(live_fd)
@@ -0,0 +1,82 @@
+"""Living-cost quotes and the cost report's fallback to the client's figures"""
+import pytest
+
+from app.living_costs import LivingCostIndex
+
+SAMPLE = {
+    "currency": "EUR",
+    "categories": ["accommodation", "food"],
+    "countries": {
+        "Germany": {"source": "Sample survey, 2026", "cities": {"Berlin": [600, 200], "Leipzig": [400, 200]}},
+    },
+    "answers": {"accommodation": {"shared_flat": {"accommodation": 0.5}}},
+}
+
+USER = {"name": "Test User", "email": "test@example.com", "phone": "9876543210"}
+
+
+def test_quote_and_country_average():
+    index = LivingCostIndex(SAMPLE)
+    berlin = index.quote("germany", "Berlin", {"accommodation": "shared_flat"})
+    assert berlin["expenses"] == {"accommodation": 300, "food": 200, "total": 500}
+    assert index.quote("Germany")["expenses"]["accommodation"] == 500
+    assert index.describe()["sources"] == {"Germany": "Sample survey, 2026"}
+
+
+def test_unsourced_country_is_refused():
+    data = dict(SAMPLE, countries={"France": {"cities": {"Paris": [900, 300]}}})
+    with pytest.raises(ValueError):
+        LivingCostIndex(data)
+
+
+def test_shipped_dataset_loads():
+    assert "categories" in LivingCostIndex.from_file().describe()
+
+
+def cost_report_args(app, monkeypatch, body):
+    # Captures what the cost report would print instead of rendering it
+    captured = {}
+    monkeypatch.setattr("app.routes.send_pdf", lambda kind, args, filename, lead=None: captured.update(args) or "")
+    response = app.test_client().post("/api/cost-calculator/download-pdf", json=dict(USER, **body))
+    assert response.status_code == 200
+    return captured
+
+
+def test_cost_report_prints_the_clients_expenses(app, monkeypatch):
+    body = {"selectedCountry": "USA", "answers": {"accommodation": "Shared Apartment"},
+            "expenses": {"accommodation": 1200, "total": 1200}}
+    args = cost_report_args(app, monkeypatch, body)
+    assert args["expenses"] == body["expenses"] and args["selected_country"] == "USA"
+
+
+def test_cost_report_uses_the_dataset_only_for_what_it_knows(app, monkeypatch):
+    app.config["LIVING_COSTS_ENABLED"] = True
+    monkeypatch.setattr("app.routes.LIVING_COSTS", LivingCostIndex(SAMPLE))
+    expenses = {"accommodation": 1200, "total": 1200}
+
+    known = cost_report_args(app, monkeypatch, {"selectedCountry": "Germany", "city": "Berlin",
+                                                "answers": {"accommodation": "shared_flat"}, "expenses": expenses})
+    assert known["expenses"]["total"] == 500 and known["selected_country"] == "Berlin, Germany"
+
+    for body in ({"selectedCountry": "USA"}, {"selectedCountry": "Germany", "answers": {"accommodation": "Shared Apartment"}}):
+        args = cost_report_args(app, monkeypatch, dict(body, expenses=expenses))
+        assert args["expenses"] == expenses
+
+
+def test_endpoint_is_off_until_enabled(app, monkeypatch):
+    client = app.test_client()
+    assert client.get("/api/cost-calculator/living-costs").status_code == 404
+    assert client.post("/api/cost-calculator/living-costs", json={"country": "Germany"}).status_code == 404
+    app.config["LIVING_COSTS_ENABLED"] = True
+    monkeypatch.setattr("app.routes.LIVING_COSTS", LivingCostIndex(SAMPLE))
+    assert client.get("/api/cost-calculator/living-costs").status_code == 200
+    assert client.post("/api/cost-calculator/living-costs", json={"country": "Germany"}).status_code == 200
+
+
+def test_report_total_is_the_sum_of_the_printed_categories():
+    from app.pdf_generator import _cost_report_context
+
+    expenses = {"accommodation": 600, "food": "250.5", "transport": "lots", "leisure": float("nan"), "total": 999999}
+    context = _cost_report_context(USER, expenses, "Germany", {})
+    assert [item["amount"] for item in context["expense_items"]] == [600, 250.5, 0, 0, 0, 0]
+    assert context["total"] == 850.5
@@ -0,0 +1,59 @@
+"""Batch certificate uploads: refused by size before they are read, and read only up to the row limit"""
+import io
+
+import pytest
+
+URL = "/api/grade-calculator/download-batch"
+HEADER = "name,email,phone,best_grade,min_passing_grade,your_grade\n"
+ROW = "Priya,priya@example.com,9876543210,10,4,8\n"
+
+
+@pytest.fixture
+def app(app):
+    app.config["PDF_BATCH_MAX_ROWS"] = 2
+    app.config["PDF_BATCH_MAX_BYTES"] = 64 * 1024
+    return app
+
+
+def post_csv(client, body, **kwargs):
+    # The body's position is how much of it the endpoint read
+    stream = io.BytesIO(body.encode())
+    response = client.post(URL, input_stream=stream, content_type="text/csv", **kwargs)
+    return response, stream.tell()
+
+
+def test_declared_length_over_the_limit_is_not_read(client):
+    body = HEADER + ROW * 5000
+    response, bytes_read = post_csv(client, body, headers={"Content-Length": str(len(body))})
+    assert response.status_code == 413
+    assert "bytes" in response.get_json()["error"]
+    assert bytes_read == 0
+
+
+def test_csv_stops_at_the_first_row_past_the_limit(client):
+    body = HEADER + ROW * 1500
+    assert len(body) < 64 * 1024
+    response, bytes_read = post_csv(client, body, headers={"Content-Length": str(len(body))})
+    assert response.status_code == 413
+    assert response.get_json()["error"] == "At most 2 students per batch"
+    assert bytes_read < len(body) // 2
+
+
+def test_chunked_body_stops_at_the_byte_limit(client):
+    body = HEADER + ROW * 5000
+    response, bytes_read = post_csv(client, body, environ_overrides={"wsgi.input_terminated": True})
+    assert response.status_code == 413
+    assert bytes_read <= 64 * 1024 + 8192
+
+
+def test_json_rows_over_the_limit(client):
+    response = client.post(URL, json={"students": [{"name": "Priya"}] * 3})
+    assert response.status_code == 413
+
+
+def test_batch_within_the_limits(client):
+    response = client.post(URL, data={"file": (io.BytesIO((HEADER + ROW * 2).encode()), "cohort.csv")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 200
+    assert response.mimetype == "application/zip"
+    assert response.get_data()[:2] == b"PK"
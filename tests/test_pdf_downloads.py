@@ -0,0 +1,53 @@
+"""PDF download endpoints: leads stored once per accepted render, and ETag preconditions"""
+from app import db
+from app.models import GradeUserSubmission, ReportSubmission
+from app.render_pool import RenderPoolBusy
+
+USER = {"name": "Test User", "email": "test@example.com", "phone": "9876543210"}
+GRADES = {"best_grade": "10", "min_passing_grade": "4", "your_grade": "8", "german_grade": "2.0"}
+
+
+def busy(*args, **kwargs):
+    raise RenderPoolBusy(5)
+
+
+def count(app, model):
+    with app.app_context():
+        return db.session.query(model).count()
+
+
+def test_busy_pool_stores_no_lead(app, client, monkeypatch):
+    body = dict(USER, selectedCountry="Germany", expenses={"accommodation": 600})
+    with monkeypatch.context() as patch:
+        patch.setattr("app.routes.cached_pdf", busy)
+        for _ in range(3):
+            response = client.post("/api/cost-calculator/download-pdf", json=body)
+            assert response.status_code == 503 and response.headers["Retry-After"] == "5"
+    assert count(app, ReportSubmission) == 0
+
+    # The retry the 503 asked for stores the lead once
+    response = client.post("/api/cost-calculator/download-pdf", json=body)
+    assert response.status_code == 200
+    assert count(app, ReportSubmission) == 1
+
+
+def test_busy_pool_stores_no_job_lead(app, client, monkeypatch):
+    body = dict(USER, **GRADES)
+    with monkeypatch.context() as patch:
+        patch.setattr("app.routes.start_pdf_job", busy)
+        assert client.post("/api/grade-calculator/pdf-jobs", json=body).status_code == 503
+    assert count(app, GradeUserSubmission) == 0
+
+    assert client.post("/api/grade-calculator/pdf-jobs", json=body).status_code == 202
+    assert count(app, GradeUserSubmission) == 1
+
+
+def test_matching_etag_on_post_fails_the_precondition(app, client):
+    body = dict(USER, **GRADES)
+    response = client.post("/api/grade-calculator/download-pdf", json=body)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = client.post("/api/grade-calculator/download-pdf", json=body, headers={"If-None-Match": etag})
+    assert response.status_code == 412 and response.headers["ETag"] == etag
+    assert count(app, GradeUserSubmission) == 1
@@ -0,0 +1,73 @@
+"""Names in scripts Helvetica cannot show are set in the bundled Noto fonts"""
+from PyPDF2 import PdfReader
+from reportlab.platypus import TableStyle
+
+from app import pdf_fonts
+from app.pdf_generator import generate_cost_report_pdf, generate_custom_package_pdf
+from app.pdf_layout import _styled_table
+
+
+def embedded_fonts(pdf):
+    """Base names of the fonts embedded anywhere in a PDF, subset prefixes dropped"""
+    names = set()
+
+    def entries(resources, key):
+        value = resources.get(key)
+        return value.get_object().values() if value is not None else []
+
+    def walk(resources):
+        resources = resources.get_object()
+        for font in entries(resources, "/Font"):
+            font = font.get_object()
+            descriptor = font.get("/FontDescriptor")
+            if descriptor is not None and "/FontFile2" in descriptor.get_object():
+                names.add(str(font["/BaseFont"]).split("+")[-1])
+        # The overlay is merged onto the template as a form XObject
+        for xobject in entries(resources, "/XObject"):
+            xobject = xobject.get_object()
+            if "/Resources" in xobject:
+                walk(xobject["/Resources"])
+
+    for page in PdfReader(pdf).pages:
+        walk(page["/Resources"])
+    return names
+
+
+def test_devanagari_tamil_and_polish_names_embed_noto():
+    user = {"name": "अनन्या சுப்ரமணியம் Łukasz Żółć", "email": "a@example.com", "phone": "9876543210"}
+    pdf = generate_cost_report_pdf(user, {"total": 1000, "accommodation": 600}, "Germany", {})
+    fonts = embedded_fonts(pdf)
+    assert {"NotoSansDevanagari-Regular", "NotoSansTamil-Regular", "NotoSans-Regular"} <= fonts
+
+
+def test_ascii_names_embed_no_fonts():
+    user = {"name": "Ananya Subramaniam", "email": "a@example.com", "phone": "9876543210"}
+    pdf = generate_cost_report_pdf(user, {"total": 1000, "accommodation": 600}, "Germany", {})
+    assert embedded_fonts(pdf) == set()
+
+
+def test_cells_stay_plain_without_a_bundled_font(monkeypatch):
+    style = TableStyle([("FONTNAME", (0, 0), (-1, -1), "Helvetica")])
+    table = _styled_table([["अनन्या"]], style, None)
+    assert not isinstance(table._cellvalues[0][0], str)
+
+    # As if NotoSansDevanagari were missing: a paragraph would only show boxes
+    monkeypatch.setitem(pdf_fonts._fonts, ("devanagari", False), None)
+    table = _styled_table([["अनन्या"]], style, None)
+    assert table._cellvalues[0][0] == "अनन्या"
+
+
+def test_markup_characters_in_values_print_as_text():
+    user = {
+        "name": "Ananya", "email": "a@example.com", "phone": "9876543210",
+        "selected_buckets": [],
+        "package_details": [
+            {"name": "A<B & C", "description": "R&D <b>fast</b> &amp; cheap", "features": ["Łódź & <i>"]},
+        ],
+    }
+    for use_template in (False, True):
+        pdf = generate_custom_package_pdf(user, [], 0, use_template=use_template)
+        text = "".join(page.extract_text() for page in PdfReader(pdf).pages)
+        assert "A<B & C" in text
+        assert "R&D <b>fast</b> &amp; cheap" in text
+        assert "Łódź & <i>" in text
@@ -0,0 +1,74 @@
+"""The bucket optimizer against an exhaustive search, on catalogs past 20 buckets, and on adversarial input"""
+import random
+import time
+
+import pytest
+
+from app.pricing import PricingCatalog, SearchTooLarge
+
+
+def exhaustive(catalog, budget, must_have, weights, limit):
+    """(score, total) of the best selections, by trying all 2**N of them"""
+    buckets = list(catalog.buckets)
+    required = catalog.mask(must_have)
+    found = []
+    for mask in range(1 << len(buckets)):
+        if mask & required != required:
+            continue
+        selected = [bucket for index, bucket in enumerate(buckets) if mask >> index & 1]
+        total = sum(catalog.cost(bucket) for bucket in selected)
+        if total <= budget:
+            found.append((-round(sum(weights.get(bucket, 1) for bucket in selected), 9), total))
+    return [(-score, total) for score, total in sorted(found)[:limit]]
+
+
+def test_optimize_matches_exhaustive_search():
+    rng = random.Random(7)
+    for _ in range(300):
+        size = rng.randint(0, 10)
+        step = rng.choice([1, 500])
+        catalog = PricingCatalog({
+            f"Bucket-{i + 1}": {"cost": rng.randint(0, 20) * step, "name": f"Bucket {i + 1}"} for i in range(size)
+        })
+        names = list(catalog.buckets)
+        budget = rng.randint(0, sum(catalog.cost(name) for name in names) + 1)
+        must_have = rng.sample(names, rng.randint(0, min(2, size)))
+        weights = {name: rng.choice([0, 0.1, 0.5, 1, 2, 3.3]) for name in names if rng.random() < 0.6}
+        limit = rng.randint(1, 8)
+
+        results = catalog.optimize(budget, must_have, weights, limit)
+        assert [(round(score, 9), total) for _, total, score in results] == \
+            exhaustive(catalog, budget, must_have, weights, limit)
+        for mask, total, _ in results:
+            assert catalog.mask_total(mask) == total
+            assert catalog.mask(must_have) & mask == catalog.mask(must_have)
+
+
+def test_large_catalog():
+    buckets = {f"Bucket-{i + 1}": {"cost": (i % 9 + 1) * 500, "name": f"Bucket {i + 1}"} for i in range(50)}
+    catalog = PricingCatalog(buckets)
+    assert catalog.total(buckets) == sum(entry["cost"] for entry in buckets.values())
+
+    # Unweighted, the best selection is the most buckets, cheapest first
+    mask, total, score = catalog.optimize(20000)[0]
+    assert (total, score) == (20000, 19)
+    assert catalog.mask_total(mask) == total
+    assert catalog.optimize(400, ["Bucket-1"]) == []
+
+
+def test_near_equal_buckets_stop_at_the_node_limit():
+    # Near-equal prices and weights: without a limit, 25 buckets took 27 s
+    rng = random.Random(3)
+    buckets = {f"Bucket-{i + 1}": {"cost": rng.randint(1000, 1100), "name": f"Bucket {i + 1}"} for i in range(25)}
+    catalog = PricingCatalog(buckets)
+    budget = sum(entry["cost"] for entry in buckets.values()) // 2
+    for choices in ((1, 1.0001, 0.9999), (1, 1.01, 0.99)):
+        weights = {bucket: rng.choice(choices) for bucket in buckets}
+        started = time.perf_counter()
+        with pytest.raises(SearchTooLarge):
+            catalog.optimize(budget, weights=weights, limit=50)
+        assert time.perf_counter() - started < 2
+
+    # Weights past two decimal places count as rounded
+    weights = {bucket: 1.0001 for bucket in buckets}
+    assert catalog.optimize(5000, weights=weights, limit=1)[0][2] == 4
@@ -0,0 +1,32 @@
+"""The SQLite profile's fork hook"""
+import gc
+import os
+import weakref
+
+from sqlalchemy import create_engine, text
+
+from app import sqlite_profile
+from app.sqlite_profile import use_sqlite_profile
+
+
+def test_one_fork_hook_for_any_number_of_engines(tmp_path, monkeypatch):
+    hooks = []
+    monkeypatch.setattr(sqlite_profile, "_fork_hook", {"registered": False, "engine": None})
+    monkeypatch.setattr(os, "register_at_fork", lambda **kwargs: hooks.append(kwargs["after_in_child"]))
+
+    engines = [create_engine(f"sqlite:///{tmp_path / f'{index}.db'}") for index in range(3)]
+    for engine in engines:
+        use_sqlite_profile(engine, "production")
+    assert len(hooks) == 1
+
+    # The hook keeps no engine alive
+    first = weakref.ref(engines.pop(0))
+    gc.collect()
+    assert first() is None
+
+    # and disposes the current one
+    with engines[-1].connect() as connection:
+        connection.execute(text("SELECT 1"))
+    assert engines[-1].pool.checkedin() == 1
+    hooks[0]()
+    assert engines[-1].pool.checkedin() == 0